@@ -0,0 +1,113 @@
+#Basic Packages
+import os
+import hashlib
+import sqlite3
+import threading
+from functools import lru_cache
+import numpy as np
+
+#Langchain Packages
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings as SentenceTransformerEmbeddings
+
+# Embeddings are cached on disk keyed by model name + SHA-256 of the text, so rebuilding the
+# Chroma index only encodes new or edited FAQs. The model itself is loaded once per process.
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "/tmp/hf_cache/embedding_cache.db")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL_NAME):
+    """The HuggingFace embedding model, loaded on first use and shared by every rebuild"""
+    with _models_lock:
+        if model_name not in _models:
+            _models[model_name] = SentenceTransformerEmbeddings(model_name=model_name)
+        return _models[model_name]
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStore:
+    """SQLite table of float32 embedding blobs keyed by embedding_key()"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings wrapper: disk cache for documents, in-process LRU for queries"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, store: EmbeddingCacheStore = None):
+        self.model_name = model_name
+        self.store = store or EmbeddingCacheStore()
+        self._embed_query_cached = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_query)
+
+    def embed_documents(self, texts):
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        cached = self.store.get_many(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            print(f"Embedding {len(missing)} new or changed texts ({len(texts) - len(missing)} cached)")
+            vectors = get_embedding_model(self.model_name).embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self.store.set_many(fresh)
+            cached.update(fresh)
+        return [list(cached[key]) for key in keys]
+
+    def _embed_query(self, text: str):
+        return tuple(get_embedding_model(self.model_name).embed_query(text))
+
+    def embed_query(self, text: str):
+        return list(self._embed_query_cached(text))
+
+    def query_cache_info(self):
+        return self._embed_query_cached.cache_info()
+
+
+_cached_embeddings = None
+
+def get_cached_embeddings():
+    """Process-wide CachedEmbeddings instance"""
+    global _cached_embeddings
+    with _models_lock:
+        if _cached_embeddings is None:
+            _cached_embeddings = CachedEmbeddings()
+    return _cached_embeddings
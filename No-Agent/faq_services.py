@@ -7,7 +7,9 @@ import uuid
 #Langchain Packages
 from langchain_community.document_loaders import CSVLoader
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings as SentenceTransformerEmbeddings
+
+#Calling Functions from other py files
+from embedding_cache import get_cached_embeddings
 
 #Gen AI Packages
 import google.generativeai as genai
@@ -25,14 +27,32 @@ gemini_model = genai.GenerativeModel(
 )
 faq_path = "faqs.csv"
 
+_current_db = None
+_retired_db = None
+
 # Load FAQ DB
 def load_faqs():
+    """Rebuild the Chroma index; unchanged FAQs reuse their cached embeddings"""
+    global _current_db, _retired_db
     loader = CSVLoader(faq_path, encoding="utf-8")
     docs = loader.load()
-    embeddings = SentenceTransformerEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embeddings = get_cached_embeddings()
+    # Build into a new, uniquely named collection so the live one keeps serving until the swap
+    collection_name = f"faqs_{uuid.uuid4().hex[:12]}"
     if not docs:
-        return Chroma.from_texts(["empty"], embeddings, collection_name="visaverse_empty_db")
-    return Chroma.from_documents(docs, embeddings)
+        new_db = Chroma.from_texts(["empty"], embeddings, collection_name=collection_name)
+    else:
+        new_db = Chroma.from_documents(docs, embeddings, collection_name=collection_name)
+    previous, _current_db = _current_db, new_db
+    # The in-process Chroma client keeps collections alive. Requests already in flight may still
+    # hold the replaced one, so it stays until the next rebuild and the one before it is dropped
+    if _retired_db is not None:
+        try:
+            _retired_db.delete_collection()
+        except Exception as e:
+            print(f"Could not drop retired FAQ collection: {e}")
+    _retired_db = previous
+    return _current_db
 
 db = load_faqs()
 
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Test script for the on-disk embedding cache, with a stub in place of the HuggingFace model
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import embedding_cache
+from embedding_cache import CachedEmbeddings, EmbeddingCacheStore
+
+class StubModel:
+    """Counts texts it is asked to embed; the vector is just (length, word count)"""
+
+    def __init__(self):
+        self.documents = []
+        self.queries = []
+
+    def embed_documents(self, texts):
+        self.documents.extend(texts)
+        return [[float(len(text)), float(len(text.split()))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), float(len(text.split()))]
+
+def test_documents_are_cached_on_disk():
+    print("Testing the document embedding cache...")
+    model = StubModel()
+    embedding_cache._models["stub"] = model
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.db")
+        embeddings = CachedEmbeddings("stub", EmbeddingCacheStore(path))
+        first = embeddings.embed_documents(["What is SEO?", "Do you build apps?", "What is SEO?"])
+        assert first[0] == first[2] == [12.0, 3.0]
+        assert model.documents == ["What is SEO?", "Do you build apps?"]  # duplicates embedded once
+
+        # A new process (new store on the same file) only embeds the new text
+        embeddings = CachedEmbeddings("stub", EmbeddingCacheStore(path))
+        second = embeddings.embed_documents(["Do you build apps?", "How much does it cost?"])
+        assert second[0] == first[1]
+        assert model.documents[2:] == ["How much does it cost?"]
+    print("✅ Document cache: SUCCESS")
+
+def test_queries_use_the_lru():
+    print("Testing the query embedding LRU...")
+    model = StubModel()
+    embedding_cache._models["stub-query"] = model
+    with tempfile.TemporaryDirectory() as directory:
+        embeddings = CachedEmbeddings("stub-query", EmbeddingCacheStore(os.path.join(directory, "cache.db")))
+        assert embeddings.embed_query("seo") == embeddings.embed_query("seo") == [3.0, 1.0]
+        assert model.queries == ["seo"]
+        assert embeddings.query_cache_info().hits == 1
+    print("✅ Query cache: SUCCESS")
+
+if __name__ == "__main__":
+    test_documents_are_cached_on_disk()
+    test_queries_use_the_lru()
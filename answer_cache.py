@@ -0,0 +1,216 @@
+#Basic Packages
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+#Calling Functions from other py files
+from metrics import answer_cache_lookups
+
+# Response cache in front of Gemini. An answer is reusable when the normalized question and the
+# FAQs retrieved for it are the same, so the key is built from both. Any FAQ mutation drops every
+# entry through invalidate().
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity (TF-IDF) above which a differently worded question with the same FAQ context
+# reuses a cached answer. Set to 0 to disable near-duplicate matching.
+ANSWER_CACHE_NEAR_DUP_THRESHOLD = float(os.getenv("ANSWER_CACHE_NEAR_DUP_THRESHOLD", "0.95"))
+NEAR_DUP_CANDIDATES_PER_CONTEXT = 20
+REDIS_KEY_PREFIX = "answer_cache:"
+
+_whitespace_re = re.compile(r"\s+")
+_trailing_punct_re = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    query = _whitespace_re.sub(" ", query.lower()).strip()
+    return _trailing_punct_re.sub("", query)
+
+
+def make_cache_key(query: str, faq_ids, variant: str = "general") -> str:
+    """Build the cache key from the prompt variant, normalized query and retrieved FAQ IDs"""
+    raw = f"{variant}|{normalize_query(query)}|{','.join(sorted(str(i) for i in faq_ids))}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _branch(variant: str) -> str:
+    return "specific-service" if variant.startswith("service:") else variant
+
+
+def _context_key(faq_ids, variant: str) -> str:
+    return f"{variant}|{','.join(sorted(str(i) for i in faq_ids))}"
+
+
+class AnswerCache:
+    """LRU/TTL answer cache with an optional Redis backend shared across workers.
+
+    redis_client is a redis_client.AsyncRedis; while its circuit is open the in-process LRU
+    is used instead.
+    """
+
+    def __init__(self, redis_client=None, ttl: int = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 near_dup_threshold: float = ANSWER_CACHE_NEAR_DUP_THRESHOLD):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.near_dup_threshold = near_dup_threshold
+        self._entries = OrderedDict()  # key -> (answer, latency, stored_at)
+        self._near_dups = defaultdict(lambda: deque(maxlen=NEAR_DUP_CANDIDATES_PER_CONTEXT))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.invalidations = 0
+        # Set to the invalidation whose Redis delete failed; Redis is not read until it is flushed
+        self._pending_flush = None
+
+    def _use_redis(self):
+        return self.redis is not None and self.redis.enabled and self.redis.breaker.state != "open"
+
+    async def _delete_all(self):
+        async def _delete(client):
+            keys = [key async for key in client.scan_iter(match=f"{REDIS_KEY_PREFIX}*", count=500)]
+            if keys:
+                await client.delete(*keys)
+        await self.redis.run(_delete)
+
+    async def _redis_ready(self):
+        """True when Redis may be used: reachable, with any missed invalidation flushed first"""
+        if not self._use_redis():
+            return False
+        pending = self._pending_flush
+        if pending is None:
+            return True
+        try:
+            await self._delete_all()
+        except Exception as e:
+            print(f"Pending answer cache flush failed: {e}")
+            return False
+        # Another invalidate may have failed while this flush ran; it needs its own pass
+        if self._pending_flush == pending:
+            self._pending_flush = None
+        return True
+
+    # Backend access
+    async def _load(self, key):
+        if await self._redis_ready():
+            try:
+                raw = await self.redis.run(lambda client: client.get(f"{REDIS_KEY_PREFIX}{key}"))
+                if raw is None:
+                    return None
+                entry = json.loads(raw)
+                return entry["answer"], entry["latency"]
+            except Exception as e:
+                print(f"Answer cache read failed: {e}")
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            answer, latency, stored_at = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer, latency
+
+    async def _store(self, key, answer, latency):
+        if await self._redis_ready():
+            try:
+                payload = json.dumps({"answer": answer, "latency": latency})
+                await self.redis.run(lambda client: client.set(f"{REDIS_KEY_PREFIX}{key}", payload, ex=self.ttl))
+                return
+            except Exception as e:
+                print(f"Answer cache write failed: {e}")
+
+        with self._lock:
+            self._entries[key] = (answer, latency, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Public API
+    async def get(self, key, faq_ids=None, variant="general", query_vector=None, index_version=None):
+        """Return a cached answer for key, falling back to a near-duplicate question"""
+        found = await self._load(key)
+        result = "hit"
+        if found is None and query_vector is not None and self.near_dup_threshold > 0:
+            similar_key = self._find_near_dup(_context_key(faq_ids or [], variant), query_vector, index_version)
+            if similar_key:
+                found = await self._load(similar_key)
+                if found is not None:
+                    self.near_hits += 1
+                    result = "near_hit"
+
+        if found is None:
+            self.misses += 1
+            answer_cache_lookups.inc(branch=_branch(variant), result="miss")
+            return None
+
+        answer_cache_lookups.inc(branch=_branch(variant), result=result)
+
+        answer, latency = found
+        self.hits += 1
+        self.saved_seconds += latency
+        return answer
+
+    async def peek(self, key):
+        """Cached answer for an exact key without touching the hit/miss statistics"""
+        found = await self._load(key)
+        return found[0] if found is not None else None
+
+    async def set(self, key, answer, latency, faq_ids=None, variant="general", query_vector=None,
+                  index_version=None):
+        """Store a generated answer together with how long it took to generate"""
+        await self._store(key, answer, latency)
+        if query_vector is not None and self.near_dup_threshold > 0:
+            with self._lock:
+                self._near_dups[_context_key(faq_ids or [], variant)].append((query_vector, key, index_version))
+
+    def _find_near_dup(self, context_key, query_vector, index_version=None):
+        with self._lock:
+            candidates = list(self._near_dups.get(context_key, ()))
+        best_key, best_score = None, self.near_dup_threshold
+        for vector, key, version in candidates:
+            # A refit changes the vocabulary, so vectors from another index version are not comparable
+            if version != index_version or vector.shape != query_vector.shape:
+                continue
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+            score = float(query_vector.multiply(vector).sum())
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    async def invalidate(self):
+        """Drop every cached answer (called whenever the FAQ set changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._near_dups.clear()
+        self.invalidations += 1
+        if self.redis is not None and self.redis.enabled:
+            try:
+                await self._delete_all()
+            except Exception as e:
+                # Typically the circuit is open: flush before Redis is read again
+                self._pending_flush = self.invalidations
+                print(f"Answer cache invalidation failed, flush deferred: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self._use_redis() else "memory",
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_seconds, 3),
+            "invalidations": self.invalidations,
+            "pending_flush": self._pending_flush is not None,
+        }
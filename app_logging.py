@@ -0,0 +1,65 @@
+#Basic Packages
+import os
+import sys
+import queue
+import atexit
+import random
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+# Non-blocking logging for hot paths. Handlers only put records on an in-memory queue; a
+# QueueListener thread formats them and writes to stdout, so neither message formatting nor a
+# slow terminal or log pipe holds up the event loop. Info records can be sampled per
+# logger; warnings and errors are always kept. When the queue is full records are dropped.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = 10000
+
+_queue = queue.Queue(LOG_QUEUE_SIZE)
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every WARNING+ record and a `rate` fraction of the others"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Same process, so the record can cross threads as-is; the listener formats it
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _start_listener():
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    _listener = QueueListener(_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush what is still queued on exit
+
+
+def get_logger(name: str, sample_rate: float = 1.0) -> logging.Logger:
+    """Logger writing through the shared queue, keeping `sample_rate` of its info/debug records"""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        _start_listener()
+        handler = _NonBlockingQueueHandler(_queue)
+        handler.addFilter(SamplingFilter(sample_rate))
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
@@ -0,0 +1,179 @@
+#Basic Packages
+import os
+import time
+import threading
+import pytz
+from datetime import datetime, date, timedelta
+
+#Calling Functions from other py files
+from calendar_client import calendar_client
+
+# Server-side availability for the scheduling widget. Busy intervals from Google's freebusy
+# API are cached per calendar day for FREEBUSY_TTL_SECONDS; the days that are missing or stale
+# in a request are fetched with a single freebusy query spanning them. Free 30-minute slots
+# are computed from the merged busy intervals within business hours (Asia/Dhaka), and a day
+# is invalidated as soon as a meeting is booked into it.
+TIMEZONE = "Asia/Dhaka"
+SLOT_MINUTES = 30
+FREEBUSY_TTL_SECONDS = int(os.getenv("FREEBUSY_TTL_SECONDS", "60"))
+BUSINESS_START_HOUR = int(os.getenv("BUSINESS_START_HOUR", "10"))
+BUSINESS_END_HOUR = int(os.getenv("BUSINESS_END_HOUR", "18"))
+# Weekdays with business hours (Monday=0); the default is Sunday to Thursday
+BUSINESS_DAYS = {int(d) for d in os.getenv("BUSINESS_DAYS", "6,0,1,2,3").split(",")}
+MAX_DAYS = 14
+
+_tz = pytz.timezone(TIMEZONE)
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching (start, end) intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def free_slots(day: date, busy, now: datetime = None, slot_minutes: int = SLOT_MINUTES):
+    """Slot-aligned free (start, end) pairs in business hours on day, given merged busy intervals"""
+    if day.weekday() not in BUSINESS_DAYS:
+        return []
+    opening = _tz.localize(datetime.combine(day, datetime.min.time()).replace(hour=BUSINESS_START_HOUR))
+    closing = _tz.localize(datetime.combine(day, datetime.min.time()).replace(hour=BUSINESS_END_HOUR))
+    step = timedelta(minutes=slot_minutes)
+    slots = []
+    i = 0
+    start = opening
+    # One pass over slots and busy intervals together (both sorted)
+    while start + step <= closing:
+        end = start + step
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        overlaps = i < len(busy) and busy[i][0] < end
+        if not overlaps and (now is None or start >= now):
+            slots.append((start, end))
+        start = end
+    return slots
+
+
+def _day_bounds(day: date):
+    start = _tz.localize(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+class AvailabilityCache:
+    def __init__(self, client, ttl_seconds: int = FREEBUSY_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._days = {}  # date -> (merged busy intervals, fetched_at)
+        self._generations = {}  # date -> bumped by invalidate(), so in-flight fetches can tell
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    @staticmethod
+    def _range(first: date, last: date):
+        return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+    def _fresh(self, day: date):
+        entry = self._days.get(day)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl_seconds:
+            return None
+        return entry[0]
+
+    def _fetch(self, first: date, last: date):
+        """One freebusy query covering first..last; caches merged busy intervals for every day"""
+        with self._lock:
+            started = {day: self._generations.get(day, 0) for day in self._range(first, last)}
+        time_min, _ = _day_bounds(first)
+        _, time_max = _day_bounds(last)
+        body = {
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "timeZone": TIMEZONE,
+            "items": [{"id": "primary"}],
+        }
+        response = self.client.execute(lambda service: service.freebusy().query(body=body))
+        self.queries += 1
+        busy = merge_intervals(
+            (datetime.fromisoformat(item["start"]).astimezone(_tz), datetime.fromisoformat(item["end"]).astimezone(_tz))
+            for item in response["calendars"]["primary"]["busy"]
+        )
+
+        # Split per day, clipping intervals that cross midnight
+        per_day = {}
+        fetched_at = time.monotonic()
+        day = first
+        i = 0
+        while day <= last:
+            day_start, day_end = _day_bounds(day)
+            while i < len(busy) and busy[i][1] <= day_start:
+                i += 1
+            j = i
+            clipped = []
+            while j < len(busy) and busy[j][0] < day_end:
+                clipped.append((max(busy[j][0], day_start), min(busy[j][1], day_end)))
+                j += 1
+            per_day[day] = clipped
+            day += timedelta(days=1)
+        today = datetime.now(_tz).date()
+        with self._lock:
+            for entries in (self._days, self._generations):
+                for day in [day for day in entries if day < today]:
+                    del entries[day]
+            for day, intervals in per_day.items():
+                # A booking invalidated this day while the query was in flight: the answer may
+                # predate it, so the caller gets it but the cache does not
+                if day >= today and self._generations.get(day, 0) == started[day]:
+                    self._days[day] = (intervals, fetched_at)
+        return per_day
+
+    def busy(self, days):
+        """Merged busy intervals for each requested day, fetching stale days in one query"""
+        result = {}
+        with self._lock:
+            for day in days:
+                cached = self._fresh(day)
+                if cached is not None:
+                    result[day] = cached
+        missing = [day for day in days if day not in result]
+        self.hits += len(result)
+        self.misses += len(missing)
+        if missing:
+            fetched = self._fetch(min(missing), max(missing))
+            for day in missing:
+                result[day] = fetched[day]
+        return result
+
+    def availability(self, start: date, days: int):
+        """Free slots for `days` consecutive days from start; past slots are left out"""
+        wanted = [start + timedelta(days=n) for n in range(days)]
+        # Weekends have no slots, so they never cost a query
+        busy = self.busy([day for day in wanted if day.weekday() in BUSINESS_DAYS])
+        now = datetime.now(_tz)
+        return [
+            {
+                "date": day.isoformat(),
+                "slots": [
+                    {"start": slot_start.isoformat(), "end": slot_end.isoformat()}
+                    for slot_start, slot_end in free_slots(day, busy.get(day, []), now)
+                ],
+            }
+            for day in wanted
+        ]
+
+    def invalidate(self, day: date):
+        """Drop a day after something was booked into it"""
+        with self._lock:
+            self._days.pop(day, None)
+            self._generations[day] = self._generations.get(day, 0) + 1
+
+    def stats(self) -> dict:
+        return {"cached_days": len(self._days), "hits": self.hits, "misses": self.misses, "queries": self.queries}
+
+
+availability = AvailabilityCache(calendar_client)
@@ -0,0 +1,143 @@
+#Basic Packages
+import os
+import asyncio
+import threading
+import requests
+import httplib2
+import google_auth_httplib2
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+#Google API Packages
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request as GoogleRequest
+from googleapiclient.discovery import build
+
+load_dotenv()
+
+# Process-wide Google Calendar client. The service object is built once from the discovery
+# document bundled with google-api-python-client (no fetch or re-parse per request), and the
+# access token is refreshed in the background shortly before it expires. Refreshes are
+# serialized by a lock, so concurrent requests never stampede the token endpoint; requests
+# that find the token stale wait for the one refresh in progress.
+CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+ACCESS_TOKEN = os.getenv("GOOGLE_ACCESS_TOKEN")
+REFRESH_TOKEN = os.getenv("GOOGLE_REFRESH_TOKEN")
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+TOKEN_RETRY_SECONDS = 60
+
+
+class CalendarClient:
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN_SECONDS):
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._creds = Credentials(
+            token=ACCESS_TOKEN,
+            refresh_token=REFRESH_TOKEN,
+            token_uri=TOKEN_URI,
+            client_id=CLIENT_ID,
+            client_secret=CLIENT_SECRET,
+            scopes=SCOPES,
+        )
+        self._refresh_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._token_request = GoogleRequest(session=requests.Session())  # keep-alive to the token endpoint
+        self._service = None
+        self._local = threading.local()
+        self._refresher = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _needs_refresh(self) -> bool:
+        creds = self._creds
+        if not creds.refresh_token:
+            return False
+        # Without a known expiry (token from the environment) refresh once to learn it
+        if not creds.token or creds.expiry is None:
+            return True
+        return datetime.utcnow() >= creds.expiry - self.refresh_margin
+
+    def refresh_if_needed(self, force: bool = False) -> bool:
+        """Refresh the access token if it is missing or close to expiry; one refresh at a time"""
+        if not force and not self._needs_refresh():
+            return False
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited
+            if not force and not self._needs_refresh():
+                return False
+            try:
+                self._creds.refresh(self._token_request)
+            except Exception:
+                self.refresh_failures += 1
+                raise
+            self.refreshes += 1
+            return True
+
+    def service(self):
+        """The shared Calendar v3 service, with a token that is valid for at least the margin"""
+        self.refresh_if_needed()
+        if self._service is None:
+            with self._build_lock:
+                if self._service is None:
+                    self._service = build(
+                        "calendar", "v3", credentials=self._creds, static_discovery=True, cache_discovery=False
+                    )
+        return self._service
+
+    def _http(self):
+        # httplib2 connections are not thread-safe; each worker thread gets its own
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = google_auth_httplib2.AuthorizedHttp(self._creds, http=httplib2.Http())
+        return http
+
+    def execute(self, make_request):
+        """Build a request from the shared service (e.g. `lambda s: s.freebusy().query(body=...)`) and run it"""
+        return make_request(self.service()).execute(http=self._http())
+
+    # Background refresh
+    def _seconds_until_refresh(self) -> float:
+        expiry = self._creds.expiry
+        if expiry is None:
+            return TOKEN_RETRY_SECONDS
+        return max((expiry - self.refresh_margin - datetime.utcnow()).total_seconds(), 0)
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                if await asyncio.to_thread(self.refresh_if_needed):
+                    print(f"Google token refreshed; expires {self._creds.expiry.isoformat()}Z")
+                delay = self._seconds_until_refresh()
+            except Exception as e:
+                print(f"Google token refresh failed: {e}")
+                delay = TOKEN_RETRY_SECONDS
+            await asyncio.sleep(max(delay, 1))
+
+    def start(self):
+        """Start proactive token refresh (idempotent; no-op without a refresh token)"""
+        if not self._creds.refresh_token or (self._refresher is not None and not self._refresher.done()):
+            return
+        self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    def stats(self) -> dict:
+        expiry = self._creds.expiry
+        return {
+            "service_built": self._service is not None,
+            "token_expiry": expiry.isoformat() + "Z" if expiry else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+calendar_client = CalendarClient()
@@ -0,0 +1,224 @@
+#Basic Packages
+import os
+import json
+import uuid
+import asyncio
+from redis.exceptions import WatchError
+
+#Calling Functions from other py files
+from llm_client import generate_text
+from redis_client import redis_store, RedisUnavailable
+from session_store import session_store, MAX_HISTORY, SESSION_TTL_SECONDS
+
+# Conversation memory for the prompt. Recent turns are included verbatim up to
+# HISTORY_TOKEN_BUDGET (the latest exchange always, clipped if it alone is over); once the stored
+# history grows past it, the oldest turns are folded into a short running summary by a background
+# Gemini call and trimmed away. Until that summary lands, the turns it will cover are shown
+# clipped, so nothing drops out of the prompt. The summary is stored with the session, so each
+# turn only pays for reading it, never for regenerating it.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "400"))
+LATEST_EXCHANGE_MESSAGES = 2  # the last user message and reply
+PENDING_MESSAGE_TOKENS = 40  # per-message clip for turns waiting to be summarized
+SUMMARY_WRITE_RETRIES = 3
+SUMMARY_MAX_WORDS = int(os.getenv("SUMMARY_MAX_WORDS", "80"))
+SUMMARY_TIMEOUT_SECONDS = 10
+HISTORY_TTL_SECONDS = SESSION_TTL_SECONDS
+REDIS_KEY_PREFIX = "chat_session:"
+SUMMARY_KEY_PREFIX = "chat_summary:"
+
+_summarizing = set()  # user_ids with a summary update in flight
+_background_tasks = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def _message_tokens(message) -> int:
+    return estimate_tokens(f"{message['role']}: {message['content']}")
+
+
+def clip_message(message, tokens: int):
+    """Message with its content cut to roughly `tokens` tokens"""
+    limit = max(tokens - estimate_tokens(f"{message['role']}: "), 1) * 4
+    if len(message["content"]) <= limit:
+        return message
+    return {**message, "content": message["content"][:limit].rstrip() + "…"}
+
+
+def window_history(history, budget: int = HISTORY_TOKEN_BUDGET):
+    """Split history into (older, recent) where recent is the newest suffix within budget.
+    The latest exchange is always in recent, clipped to share the budget if it is too long."""
+    latest = history[-LATEST_EXCHANGE_MESSAGES:]
+    if sum(_message_tokens(message) for message in latest) > budget:
+        share = budget // len(latest)
+        return history[:-len(latest)], [clip_message(message, share) for message in latest]
+    used = 0
+    start = len(history)
+    while start > 0:
+        cost = _message_tokens(history[start - 1])
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return history[:start], history[start:]
+
+
+def format_history(summary: str, recent, pending=()) -> str:
+    lines = []
+    if summary:
+        lines.append(f"Summary of earlier conversation: {summary}")
+    if pending:
+        lines.append("Earlier messages:")
+        lines.extend(
+            f"{message['role']}: {clip_message(message, PENDING_MESSAGE_TOKENS)['content']}" for message in pending
+        )
+        if recent:
+            lines.append("Recent messages:")
+    lines.extend(f"{message['role']}: {message['content']}" for message in recent)
+    return "\n".join(lines)
+
+
+async def get_history(user_id):
+    key = f"{REDIS_KEY_PREFIX}{user_id}"
+    try:
+        items = await redis_store.run(lambda client: client.lrange(key, -MAX_HISTORY, -1))
+        return [json.loads(x) for x in items]
+    except RedisUnavailable:
+        pass
+    except Exception as e:
+        print(f"Redis read failed: {e}; using fallback")
+    return session_store.history(user_id)
+
+
+async def _get_history_and_summary(user_id):
+    key = f"{REDIS_KEY_PREFIX}{user_id}"
+
+    async def _read(client):
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.lrange(key, -MAX_HISTORY, -1)
+            pipe.get(f"{SUMMARY_KEY_PREFIX}{user_id}")
+            return await pipe.execute()
+
+    try:
+        items, summary = await redis_store.run(_read)
+        return [json.loads(x) for x in items], summary or ""
+    except RedisUnavailable:
+        pass
+    except Exception as e:
+        print(f"Redis read failed: {e}; using fallback")
+    return session_store.history(user_id), session_store.summary(user_id)
+
+
+async def update_history(user_id, *turns):
+    """Append (role, content) turns in one round-trip, e.g. the user message and the bot reply"""
+    # The id makes every stored message unique, so a summary can trim up to an exact message
+    items = [{"role": role, "content": content, "id": uuid.uuid4().hex[:12]} for role, content in turns]
+    key = f"{REDIS_KEY_PREFIX}{user_id}"
+
+    async def _append(client):
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *[json.dumps(item) for item in items])
+            pipe.ltrim(key, -MAX_HISTORY, -1)
+            pipe.expire(key, HISTORY_TTL_SECONDS)
+            pipe.expire(f"{SUMMARY_KEY_PREFIX}{user_id}", HISTORY_TTL_SECONDS)
+            return await pipe.execute()
+
+    try:
+        await redis_store.run(_append)
+        return
+    except RedisUnavailable:
+        pass
+    except Exception as e:
+        print(f"Redis write failed: {e}; using fallback")
+    session_store.append_history(user_id, *items)
+
+
+async def clear_history(user_id):
+    keys = [f"{REDIS_KEY_PREFIX}{user_id}", f"{SUMMARY_KEY_PREFIX}{user_id}"]
+    try:
+        await redis_store.run(lambda client: client.delete(*keys))
+    except RedisUnavailable:
+        pass
+    except Exception as e:
+        print(f"Redis delete failed: {e}")
+    session_store.clear_history(user_id)
+
+
+async def _store_summary(user_id, summary: str, last):
+    """Save the new summary and drop the messages it now covers, up to and including `last`"""
+    key = f"{REDIS_KEY_PREFIX}{user_id}"
+
+    async def _write(client):
+        # WATCH the list: an append (and its MAX_HISTORY trim) in between shifts the head, so
+        # the position of `last` is re-read and the transaction retried
+        async with client.pipeline(transaction=True) as pipe:
+            for _ in range(SUMMARY_WRITE_RETRIES):
+                try:
+                    await pipe.watch(key)
+                    items = [json.loads(x) for x in await pipe.lrange(key, 0, -1)]
+                    covered = items.index(last) + 1 if last in items else 0
+                    pipe.multi()
+                    pipe.set(f"{SUMMARY_KEY_PREFIX}{user_id}", summary, ex=HISTORY_TTL_SECONDS)
+                    if covered:
+                        pipe.ltrim(key, covered, -1)
+                    return await pipe.execute()
+                except WatchError:
+                    continue
+            raise WatchError(f"history for {user_id} kept changing")
+
+    try:
+        await redis_store.run(_write)
+        return
+    except RedisUnavailable:
+        pass
+    except Exception as e:
+        print(f"Redis summary write failed: {e}; using fallback")
+    session_store.set_summary(user_id, summary)
+    session_store.drop_through(user_id, last)
+
+
+def summary_prompt(summary: str, older) -> str:
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in older)
+    return f"""Update the running summary of a chat between a visitor and Notionhive's assistant.
+Keep what the visitor wants, services and budgets discussed, names and contact details they shared, and anything promised.
+Write at most {SUMMARY_MAX_WORDS} words of plain text.
+
+Current summary: {summary or "(none)"}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+
+
+async def _summarize(user_id, summary: str, older):
+    try:
+        new_summary = await generate_text(
+            summary_prompt(summary, older), timeout=SUMMARY_TIMEOUT_SECONDS, branch="summary"
+        )
+        await _store_summary(user_id, new_summary, older[-1])
+    except Exception as e:
+        print(f"History summary failed for {user_id}: {e}")
+    finally:
+        _summarizing.discard(user_id)
+
+
+def schedule_summary(user_id, summary: str, older):
+    """Fold older messages into the summary in the background (one update per user at a time)"""
+    if not older or user_id in _summarizing:
+        return
+    _summarizing.add(user_id)
+    task = asyncio.get_running_loop().create_task(_summarize(user_id, summary, list(older)))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def conversation_context(user_id) -> str:
+    """Summary plus the most recent turns that fit HISTORY_TOKEN_BUDGET, formatted for the prompt"""
+    history, summary = await _get_history_and_summary(user_id)
+    older, recent = window_history(history)
+    # Turns past the budget are folded into the summary for the next prompt; this one shows them clipped
+    schedule_summary(user_id, summary, older)
+    return format_history(summary, recent, older)
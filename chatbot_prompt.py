@@ -1,41 +1,25 @@
-from faq_services import gemini_model
+import os
+import time
+import asyncio
+from datetime import timedelta
+from functools import lru_cache
 
-# Greeting status tracking
-greeted_users = set()  # Track users who have been greeted
-GREETING_KEYWORDS = ['who are you?', 'what is your name']
-
-def is_greeting(user_input: str) -> bool:
-    """Check if user input is a greeting"""
-    input_lower = user_input.lower().strip()
-    return any(greeting in input_lower for greeting in GREETING_KEYWORDS)
-
-def should_greet_user(user_id: str, user_input: str) -> bool:
-    """Determine if user should be greeted"""
-    # If user hasn't been greeted and is saying hello
-    if user_id not in greeted_users and is_greeting(user_input):
-        greeted_users.add(user_id)
-        return True
-    return False
+#Gen AI Packages
+import google.generativeai as genai
+from google.generativeai import caching
 
+from faq_services import GEMINI_MODEL_NAME, GENERATION_CONFIG
+from llm_client import generate_text
+from intent_matcher import IntentMatcher
+from intent_classifier import intent_classifier, INTENT_CONFIDENCE_THRESHOLD
+from session_store import session_store
 
-def enhanced_generate_prompt(context: str, query: str, user_id: str) -> str:
-    """Generate prompt with greeting logic"""
-    has_been_greeted = user_id in greeted_users
-    
-    if not has_been_greeted and is_greeting(query):
-        greeting_instruction = "When responding to this greeting, introduce yourself once as NH Buddy, Notionhive's virtual assistant, then answer their question helpfully."
-        greeted_users.add(user_id)  # Mark as greeted
-    elif has_been_greeted:
-        greeting_instruction = "CRITICAL: You have already introduced yourself to this user. NEVER say 'NH Buddy here', 'I am NH Buddy', 'I'm NH Buddy', or 'Notionhive's virtual assistant' again. Simply answer their questions directly and helpfully."
-    else:
-        greeting_instruction = "CRITICAL: Answer the user's question directly without introducing yourself. Do NOT say 'NH Buddy here', 'I am NH Buddy', or introduce yourself unless they specifically ask who you are."
-    
-    return f"""
-You are NH Buddy, a smart, witty, and helpful virtual assistant proudly representing Notionhive. You are designed to be the best FAQ chatbot — charming, fast-thinking, and always on-brand.
+# Static persona and rules, sent as the model's system instruction so every request shares the
+# same prefix (and can be served from a Gemini context cache). Only the small per-request part
+# built by enhanced_generate_prompt changes between calls.
+SYSTEM_INSTRUCTION = """You are NH Buddy, a smart, witty, and helpful virtual assistant proudly representing Notionhive. You are designed to be the best FAQ chatbot — charming, fast-thinking, and always on-brand.
 Your primary mission is to assist users by answering their questions with clarity, accuracy, and a touch of clever personality, based on the official Notionhive FAQs and website: [https://notionhive.com](https://notionhive.com).
 
-{greeting_instruction}
-
 Your tone is:
 Helpful, but never robotic
 Confident, but not cocky
@@ -76,8 +60,89 @@ Avoid add "bot:" in front of any of your responses.
 CRITICAL: Do NOT start responses with "NH Buddy here," or "I am NH Buddy" or any form of self-identification unless specifically asked who you are.
 
 You're NH Buddy — the face of Notionhive's brilliance and creativity. Show it.
-Format your responses using markdown when it improves readability (bullet points, bold text, etc.).
-Use the following context to answer the user's question:
+Format your responses using markdown when it improves readability (bullet points, bold text, etc.)."""
+
+chat_model = genai.GenerativeModel(
+    model_name=GEMINI_MODEL_NAME,
+    system_instruction=SYSTEM_INSTRUCTION,
+    generation_config=GENERATION_CONFIG,
+)
+
+# Optional explicit context caching of SYSTEM_INSTRUCTION. Gemini only caches prompts above a
+# model-specific minimum token count and needs a versioned model name (e.g. gemini-2.0-flash-001),
+# so this is off by default; any failure falls back to sending the system instruction inline.
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true"
+GEMINI_CACHE_MODEL_NAME = os.getenv("GEMINI_CACHE_MODEL_NAME", f"models/{GEMINI_MODEL_NAME}-001")
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+_context_cache = {"model": None, "expires_at": 0.0, "disabled": not GEMINI_CONTEXT_CACHE}
+_context_cache_lock = asyncio.Lock()
+
+def _create_cached_model():
+    cached = caching.CachedContent.create(
+        model=GEMINI_CACHE_MODEL_NAME,
+        display_name="nh-buddy-system-instruction",
+        system_instruction=SYSTEM_INSTRUCTION,
+        ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS),
+    )
+    return genai.GenerativeModel.from_cached_content(cached, generation_config=GENERATION_CONFIG)
+
+async def get_chat_model():
+    """The answering model: backed by a context cache when enabled, else chat_model"""
+    if _context_cache["disabled"]:
+        return chat_model
+    if _context_cache["model"] is not None and time.time() < _context_cache["expires_at"]:
+        return _context_cache["model"]
+    async with _context_cache_lock:
+        if _context_cache["model"] is None or time.time() >= _context_cache["expires_at"]:
+            try:
+                _context_cache["model"] = await asyncio.to_thread(_create_cached_model)
+                # Renew a minute before the server-side cache expires
+                _context_cache["expires_at"] = time.time() + CONTEXT_CACHE_TTL_SECONDS - 60
+                print("Created Gemini context cache for the system instruction")
+            except Exception as e:
+                print(f"Gemini context caching unavailable ({e}); sending the system instruction inline")
+                _context_cache["disabled"] = True
+                return chat_model
+    return _context_cache["model"]
+
+# Greeting status is tracked per session in session_store
+GREETING_KEYWORDS = ['who are you?', 'what is your name']
+
+def is_greeting(user_input: str) -> bool:
+    """Check if user input is a greeting"""
+    input_lower = user_input.lower().strip()
+    return any(greeting in input_lower for greeting in GREETING_KEYWORDS)
+
+def should_greet_user(user_id: str, user_input: str) -> bool:
+    """Determine if user should be greeted"""
+    # If user hasn't been greeted and is saying hello
+    if not session_store.is_greeted(user_id) and is_greeting(user_input):
+        session_store.mark_greeted(user_id)
+        return True
+    return False
+
+
+def enhanced_generate_prompt(context: str, query: str, user_id: str, history: str = "") -> str:
+    """Per-request part of the prompt (greeting rule, conversation so far, FAQ context, question);
+    send it to get_chat_model(), which carries SYSTEM_INSTRUCTION"""
+    has_been_greeted = session_store.is_greeted(user_id)
+    
+    if not has_been_greeted and is_greeting(query):
+        greeting_instruction = "When responding to this greeting, introduce yourself once as NH Buddy, Notionhive's virtual assistant, then answer their question helpfully."
+        session_store.mark_greeted(user_id)  # Mark as greeted
+    elif has_been_greeted:
+        greeting_instruction = "CRITICAL: You have already introduced yourself to this user. NEVER say 'NH Buddy here', 'I am NH Buddy', 'I'm NH Buddy', or 'Notionhive's virtual assistant' again. Simply answer their questions directly and helpfully."
+    else:
+        greeting_instruction = "CRITICAL: Answer the user's question directly without introducing yourself. Do NOT say 'NH Buddy here', 'I am NH Buddy', or introduce yourself unless they specifically ask who you are."
+
+    history_block = ""
+    if history:
+        history_block = f"Conversation so far (use it to resolve follow-up questions; don't repeat earlier answers):\n{history}\n\n"
+    
+    return f"""{greeting_instruction}
+
+{history_block}Use the following context to answer the user's question:
 
 {context}
 
@@ -85,29 +150,133 @@ User Question: {query}
 Answer:"""
 
 
-def detect_schedule_intent(user_input: str) -> bool:
-    """Detect if user wants to schedule a meeting - keyword-based for efficiency"""
-    schedule_keywords = [
-        "schedule", "book", "appointment", "meeting", "call", "session",
-        "book a meeting", "schedule a call", "set up a meeting", "arrange",
-        "when can we meet", "available time", "calendar", "book time"
-    ]
+SCHEDULE_KEYWORDS = [
+    "schedule", "book", "appointment", "meeting", "call", "session",
+    "book a meeting", "schedule a call", "set up a meeting", "arrange",
+    "when can we meet", "available time", "calendar", "book time"
+]
+
+AGENT_KEYWORDS = [
+    "talk to agent", "speak to agent", "human agent", "live agent",
+    "contact agent", "connect me to agent", "agent please", "need agent",
+    "talk to human", "speak to human", "human support", "live support",
+    "customer support", "help me", "need help", "support team",
+    "representative", "talk to someone", "speak to someone", "real person",
+    "human help", "live chat", "customer service", "technical support"
+]
+
+# Keyword -> service name; earlier entries win when several keywords match
+SPECIFIC_SERVICES = {
+    "web development": "Web & App Development",
+    "app development": "Web & App Development", 
+    "mobile development": "Web & App Development",
+    "website development": "Web & App Development",
+    "web design": "Web & App Development",
+    "mobile app": "Web & App Development",
     
-    input_lower = user_input.lower().strip()
+    "ui design": "User Experience Design",
+    "ux design": "User Experience Design", 
+    "user experience": "User Experience Design",
+    "user interface": "User Experience Design",
+    "design": "User Experience Design",
+    
+    "digital marketing": "Strategy & Digital Marketing",
+    "marketing": "Strategy & Digital Marketing",
+    "strategy": "Strategy & Digital Marketing",
+    "social media": "Strategy & Digital Marketing",
+    
+    "video production": "Video Production & Photography",
+    "photography": "Video Production & Photography",
+    "video": "Video Production & Photography",
+    "content creation": "Video Production & Photography",
+    
+    "branding": "Branding & Communication",
+    "brand identity": "Branding & Communication",
+    "logo design": "Branding & Communication",
+    "communication": "Branding & Communication",
+    
+    "seo": "Search Engine Optimization",
+    "search engine": "Search Engine Optimization",
+    "google ranking": "Search Engine Optimization",
+    
+    "resource augmentation": "Resource Augmentation",
+    "team extension": "Resource Augmentation",
+    "staff augmentation": "Resource Augmentation",
+    "developers": "Resource Augmentation",
     
+    "ai": "AI Solutions",
+    "artificial intelligence": "AI Solutions",
+    "ai solutions": "AI Solutions",
+    "ai development": "AI Solutions",
+    "machine learning": "AI Solutions",
+    "ml": "AI Solutions",
+    "chatbot": "AI Solutions",
+    "ai integration": "AI Solutions",
+    "ai applications": "AI Solutions",
+    "intelligent systems": "AI Solutions",
+    "automation": "AI Solutions",
+    "ai consulting": "AI Solutions",
+    "data science": "AI Solutions",
+    "predictive analytics": "AI Solutions",
+    "ai strategy": "AI Solutions"
+}
+
+GENERAL_SERVICE_KEYWORDS = [
+    "what services", "list services", "what do you offer", "what do you do",
+    "service list", "what can you help", "capabilities", "offerings",
+    "what do you provide", "what are your services", "services you offer", 
+    "what kind of services", "services available", "service offerings", 
+    "what services do you have", "show me services", "tell me about your services",
+    "list your services", "show services", "services of yours", "view our services",
+    "view services", "view your services", "see services", "see your services",
+    "see our services", "explore services", "browse services"
+]
+
+CONTACT_KEYWORDS = [
+    "contact", "phone", "email", "call", "reach", "get in touch",
+    "contact information", "contact details", "phone number", "email address",
+    "how to contact", "how can i contact", "reach out", "get hold of", "connect",
+    "get in contact", "contacting", "call me", "email me", "want to connect",
+    "contact you", "contact us", "touch with you", "your phone", "your email",
+    "office number", "business phone", "company email", "support email",
+    "customer service", "help desk", "contact support"
+]
+
+# Built once at import; every detector below reads from the same single-pass classification
+intent_matcher = IntentMatcher({
+    "schedule": SCHEDULE_KEYWORDS,
+    "agent": AGENT_KEYWORDS,
+    "contact": CONTACT_KEYWORDS,
+    "services": GENERAL_SERVICE_KEYWORDS,
+    "specific_service": list(SPECIFIC_SERVICES),
+})
+
+@lru_cache(maxsize=1024)
+def classify_intents(user_input: str) -> dict:
+    """Match a message against every intent at once: {intent: (keyword, ...)}"""
+    return intent_matcher.match(user_input)
+
+
+async def detect_schedule_intent(user_input: str) -> bool:
+    """Detect if user wants to schedule a meeting - keyword-based for efficiency"""
     # Direct keyword match (no AI needed for most cases)
-    if any(keyword in input_lower for keyword in schedule_keywords):
+    if "schedule" in classify_intents(user_input):
         return True
     
-    # Only use AI for edge cases (reduces API calls by ~80%)
+    # Only classify edge cases (reduces API calls by ~80%)
     if len(user_input.split()) > 10 or "?" in user_input:
+        # Local model first; Gemini only when it isn't confident
+        if intent_classifier is not None:
+            intent, confidence = intent_classifier.predict(user_input)
+            if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+                return intent == "schedule"
         try:
             prompt = f"""
 Does this message express intent to schedule a meeting? Reply only "yes" or "no".
 Message: "{user_input}"
 """
-            result = gemini_model.generate_content(prompt)
-            return "yes" in result.text.strip().lower()
+            result = await generate_text(prompt, timeout=5, branch="intent-check")
+            return "yes" in result.lower()
         except:
             return False
     
@@ -115,121 +284,25 @@ Message: "{user_input}"
     
 def detect_agent_intent(user_input: str) -> bool:
     """Detect if user wants to talk to an agent - mostly keyword-based"""
-    agent_keywords = [
-        "talk to agent", "speak to agent", "human agent", "live agent",
-        "contact agent", "connect me to agent", "agent please", "need agent",
-        "talk to human", "speak to human", "human support", "live support",
-        "customer support", "help me", "need help", "support team",
-        "representative", "talk to someone", "speak to someone", "real person",
-        "human help", "live chat", "customer service", "technical support"
-    ]
-    
-    input_lower = user_input.lower().strip()
-    
-    # Direct keyword match (covers most cases, no API call needed)
-    return any(keyword in input_lower for keyword in agent_keywords)
+    return "agent" in classify_intents(user_input)
 
 def detect_specific_service_inquiry(user_input: str) -> tuple:
     """Detect if user is asking about a specific service and return the enhanced query"""
-    specific_services = {
-        "web development": "Web & App Development",
-        "app development": "Web & App Development", 
-        "mobile development": "Web & App Development",
-        "website development": "Web & App Development",
-        "web design": "Web & App Development",
-        "mobile app": "Web & App Development",
-        
-        "ui design": "User Experience Design",
-        "ux design": "User Experience Design", 
-        "user experience": "User Experience Design",
-        "user interface": "User Experience Design",
-        "design": "User Experience Design",
-        
-        "digital marketing": "Strategy & Digital Marketing",
-        "marketing": "Strategy & Digital Marketing",
-        "strategy": "Strategy & Digital Marketing",
-        "social media": "Strategy & Digital Marketing",
-        
-        "video production": "Video Production & Photography",
-        "photography": "Video Production & Photography",
-        "video": "Video Production & Photography",
-        "content creation": "Video Production & Photography",
-        
-        "branding": "Branding & Communication",
-        "brand identity": "Branding & Communication",
-        "logo design": "Branding & Communication",
-        "communication": "Branding & Communication",
-        
-        "seo": "Search Engine Optimization",
-        "search engine": "Search Engine Optimization",
-        "google ranking": "Search Engine Optimization",
-        
-        "resource augmentation": "Resource Augmentation",
-        "team extension": "Resource Augmentation",
-        "staff augmentation": "Resource Augmentation",
-        "developers": "Resource Augmentation",
-        
-        "ai": "AI Solutions",
-        "artificial intelligence": "AI Solutions",
-        "ai solutions": "AI Solutions",
-        "ai development": "AI Solutions",
-        "machine learning": "AI Solutions",
-        "ml": "AI Solutions",
-        "chatbot": "AI Solutions",
-        "ai integration": "AI Solutions",
-        "ai applications": "AI Solutions",
-        "intelligent systems": "AI Solutions",
-        "automation": "AI Solutions",
-        "ai consulting": "AI Solutions",
-        "data science": "AI Solutions",
-        "predictive analytics": "AI Solutions",
-        "ai strategy": "AI Solutions"
-    }
-    
-    input_lower = user_input.lower().strip()
-    
-    for keyword, service_name in specific_services.items():
-        if keyword in input_lower:
-            # Create an enhanced query for better FAQ searching
-            enhanced_query = f"Tell me about {service_name} services of yours. What does Notionhive offer for {service_name}?"
-            return True, enhanced_query, service_name
+    keywords = classify_intents(user_input).get("specific_service")
+    if keywords:
+        service_name = SPECIFIC_SERVICES[keywords[0]]
+        # Create an enhanced query for better FAQ searching
+        enhanced_query = f"Tell me about {service_name} services of yours. What does Notionhive offer for {service_name}?"
+        return True, enhanced_query, service_name
     
     return False, None, None
 
 def detect_services_intent(user_input: str) -> bool:
     """Detect if user is asking about general services list - mostly keyword-based"""
-    general_service_keywords = [
-        "what services", "list services", "what do you offer", "what do you do",
-        "service list", "what can you help", "capabilities", "offerings",
-        "what do you provide", "what are your services", "services you offer", 
-        "what kind of services", "services available", "service offerings", 
-        "what services do you have", "show me services", "tell me about your services",
-        "list your services", "show services", "services of yours", "view our services",
-        "view services", "view your services", "see services", "see your services",
-        "see our services", "explore services", "browse services"
-    ]
-    
-    input_lower = user_input.lower().strip()
-    
-    # Check if it's a specific service inquiry first
-    is_specific, _, _ = detect_specific_service_inquiry(user_input)
-    if is_specific:
-        return False  # Don't treat specific service inquiries as general service requests
-    
-    # Check for general service list requests
-    return any(keyword in input_lower for keyword in general_service_keywords)
+    intents = classify_intents(user_input)
+    # Don't treat specific service inquiries as general service requests
+    return "services" in intents and "specific_service" not in intents
 
 def detect_contact_intent(user_input: str) -> bool:
     """Detect if user is asking for contact information"""
-    contact_keywords = [
-        "contact", "phone", "email", "call", "reach", "get in touch",
-        "contact information", "contact details", "phone number", "email address",
-        "how to contact", "how can I contact", "reach out", "get hold of", "Connect",
-        "get in contact", "contacting", "call me", "email me", "Want to connect"
-        "contact you", "contact us", "touch with you", "your phone", "your email",
-        "office number", "business phone", "company email", "support email",
-        "customer service", "help desk", "contact support"
-    ]
-    
-    input_lower = user_input.lower().strip()
-    return any(keyword in input_lower for keyword in contact_keywords)
\ No newline at end of file
+    return "contact" in classify_intents(user_input)
@@ -1,81 +1,62 @@
 #Basic Packages
 import io
-import os
 import uuid
+import hashlib
 import traceback
-import requests
 import pytz
 import json
 import time
 import asyncio
-import redis
-import pandas as pd
 from dotenv import load_dotenv
 from typing import List, Optional
 from datetime import datetime, timedelta
-from collections import deque
-from urllib.parse import urlparse
-from collections import defaultdict, deque
-
-#Google API Packages
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request as GoogleRequest
-from googleapiclient.discovery import build
 
 #API Packages
-from fastapi import APIRouter, UploadFile, File, HTTPException, Body, Path, Query
+from fastapi import APIRouter, Request, UploadFile, File, HTTPException, Body, Path, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
 #FAQ CSV Validator Package
 from pydantic import BaseModel, EmailStr
 
 #Calling Functions from other py files
-from faq_services import gemini_model, db, load_faqs, add_faq_to_csv, faq_path
-from chatbot_prompt import detect_schedule_intent, detect_agent_intent, detect_services_intent, detect_specific_service_inquiry, detect_contact_intent, enhanced_generate_prompt
-from telegram import send_to_telegram, send_callback_to_telegram, pending_requests
+from faq_services import index_manager
+from faq_store import faq_store, FAQCSVFormatError
+from llm_client import generate_text, stream_text
+from chatbot_prompt import detect_schedule_intent, detect_agent_intent, detect_services_intent, detect_specific_service_inquiry, detect_contact_intent, enhanced_generate_prompt, is_greeting, get_chat_model
+from answer_cache import AnswerCache, make_cache_key
+from redis_client import redis_store
+from singleflight import SingleFlight
+from session_store import session_store
+from chat_history import update_history, clear_history, conversation_context
+import metrics
+from metrics import chat_requests
+from telegram import send_to_telegram, send_callback_to_telegram
+from calendar_client import calendar_client
+from availability import availability, MAX_DAYS, SLOT_MINUTES
 
 router = APIRouter()
 
 load_dotenv()
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-REDIRECT_URI = os.getenv("REDIRECT_URI")
-ACCESS_TOKEN = os.getenv("GOOGLE_ACCESS_TOKEN")
-REFRESH_TOKEN = os.getenv("GOOGLE_REFRESH_TOKEN")
-redis_url = os.getenv("REDIS_URL")
 TIMEZONE = "Asia/Dhaka"
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-r = None
-try:
-    if redis_url:
-        # Upstash often needs TLS (rediss://). from_url handles it.
-        r = redis.from_url(
-            redis_url,
-            decode_responses=True,
-            socket_connect_timeout=2,
-            socket_timeout=2,
-            retry_on_timeout=True,
-        )
-        r.ping()  # fail fast if unreachable
-        print("Redis connected")
-    else:
-        print("REDIS_URL not set, using in-memory history")
-except Exception as e:
-    print(f"Redis unavailable ({e}), using in-memory history")
-    r = None
-
-agent_active_users = set()
-user_sessions = {}
-REDIS_KEY_PREFIX = "chat_session:"
-MAX_HISTORY = 7
-
-# Greeting status tracking
-greeted_users = set()  # Track users who have been greeted
-GREETING_KEYWORDS = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings', 'who are you?', 'what is your name']
 
-_fallback_histories = defaultdict(lambda: deque(maxlen=MAX_HISTORY))
-HISTORY_TTL_SECONDS = 1800
-_last_seen = {}
+answer_cache = AnswerCache(redis_store)
+single_flight = SingleFlight(redis_store)
+
+@router.on_event("startup")
+async def startup():
+    await redis_store.ping()
+    session_store.start_sweeper()
+    calendar_client.start()
+    index_manager.start()
+
+@router.on_event("shutdown")
+async def shutdown():
+    await session_store.stop_sweeper()
+    await calendar_client.stop()
+    await index_manager.stop()
+    await redis_store.close()
+
+GREETING_KEYWORDS = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings', 'who are you?', 'what is your name']
 
 # Data validation classes
 class QuestionRequest(BaseModel):
@@ -103,83 +84,40 @@ class CallbackRequest(BaseModel):
     email: Optional[EmailStr] = None
     message: Optional[str] = None
     
-def get_history(user_id):
-    key = f"{REDIS_KEY_PREFIX}{user_id}"
-    history = r.lrange(key, 0, -1)
-    return [json.loads(x) for x in history]
-
-def update_history(user_id, role, content):
-    key = f"{REDIS_KEY_PREFIX}{user_id}"
-    r.rpush(key, json.dumps({"role": role, "content": content}))
-    r.ltrim(key, -MAX_HISTORY, -1)
-    r.expire(key, 1800)
-
-def _fallback_update(user_id, item):
-    dq = _fallback_histories[user_id]
-    dq.append(item)
-    _last_seen[user_id] = time.time()
-
-def _fallback_get(user_id):
-    # optional TTL pruning
-    ts = _last_seen.get(user_id)
-    if ts and (time.time() - ts) > HISTORY_TTL_SECONDS:
-        _fallback_histories.pop(user_id, None)
-        _last_seen.pop(user_id, None)
-        return []
-    return list(_fallback_histories.get(user_id, []))
-
-def get_history(user_id):
-    key = f"{REDIS_KEY_PREFIX}{user_id}"
-    if r:
-        try:
-            items = r.lrange(key, -MAX_HISTORY, -1)
-            return [json.loads(x) for x in items]
-        except Exception as e:
-            print(f"Redis read failed: {e}; using fallback")
-    return _fallback_get(user_id)
-
-def update_history(user_id, role, content):
-    item = {"role": role, "content": content}
-    key = f"{REDIS_KEY_PREFIX}{user_id}"
-    if r:
-        try:
-            pipe = r.pipeline()
-            pipe.rpush(key, json.dumps(item))
-            pipe.ltrim(key, -MAX_HISTORY, -1)
-            pipe.expire(key, HISTORY_TTL_SECONDS)
-            pipe.execute()
-            return
-        except Exception as e:
-            print(f"Redis write failed: {e}; using fallback")
-    _fallback_update(user_id, item)
-
-def clear_history(user_id):
-    key = f"{REDIS_KEY_PREFIX}{user_id}"
-    if r:
-        try:
-            r.delete(key)
-        except Exception as e:
-            print(f"Redis delete failed: {e}")
-    _fallback_histories.pop(user_id, None)
-    _last_seen.pop(user_id, None)
-
-
-    
-def build_prompt_from_history(history):
-    return "\n".join(f"{msg['role']}: {msg['content']}" for msg in history) + "\nuser:"
-
 @router.get("/")
 def greet_json():
     return {"Hello": "It is working!"}
 
-# Chat endpoint API
-@router.post("/ask")
-async def ask_faq(request: QuestionRequest):
-    query = request.query.strip()
-    user_id = request.user_id or f"user_{int(time.time()*1000)}"
+# Answer cache parameters for a generated reply; greetings are never cached because
+# their answer depends on whether the user has already been introduced to the bot.
+def _cache_params(snapshot, query: str, docs, variant: str, conversation: str = ""):
+    # Follow-up questions depend on the conversation, so only first-turn answers are shared
+    if is_greeting(query) or conversation:
+        return None
+    faq_ids = [doc.metadata.get("id") for doc in docs]
+    try:
+        query_vector = snapshot.db.query_vector(query)
+    except Exception:
+        query_vector = None
+    return {
+        "key": make_cache_key(query, faq_ids, variant),
+        "faq_ids": faq_ids,
+        "variant": variant,
+        "query_vector": query_vector,
+        # Query vectors are only comparable within the index version that produced them
+        "index_version": snapshot.version,
+    }
+
+# Shared intent routing for /ask and /ask/stream.
+# Returns (reply, None) when the answer is canned, or (None, pending) when Gemini has to
+# generate it; pending carries the prompt and the extra response fields.
+async def _route_query(query: str, user_id: str):
+    # One index snapshot for the whole request, even if a rebuild is published meanwhile
+    snapshot = index_manager.current()
+    db = snapshot.db
 
     # Detect agent intent
-    # if user_id in agent_active_users:
+    # if session_store.is_agent_active(user_id):
     #     send_to_telegram(query, user_id=user_id)
     #     return {
     #         "from_agent": True,
@@ -187,7 +125,7 @@ async def ask_faq(request: QuestionRequest):
     #     }
 
     # if detect_agent_intent(query):
-    #     agent_active_users.add(user_id)
+    #     session_store.set_agent_active(user_id)
 
     #     history = get_history(user_id)
     #     history_text = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[-5:])
@@ -206,11 +144,11 @@ async def ask_faq(request: QuestionRequest):
     #     }
 
     # Detect scheduling
-    if detect_schedule_intent(query):
+    if await detect_schedule_intent(query):
         return {
             "action": "schedule_meeting",
             "answer": "Sure! Let's schedule your meeting. Please choose a date and time."
-        }
+        }, None
 
     # Detect contact requests
     if detect_contact_intent(query):
@@ -224,35 +162,30 @@ async def ask_faq(request: QuestionRequest):
             },
             "answer": "Here's how you can reach us:\n\n**Phone:** [+880 140 447 4990](tel:+8801404474990) 📞\n\n**Email:** [hello@notionhive.com](mailto:hello@notionhive.com) 📧\n\nWould you like us to call you back? We'd be happy to reach out to you directly! Just say **'yes'** and I'll get your details to arrange a callback!",
             "callback_offer": True
-        }
+        }, None
 
     # Check for specific service inquiries first
     is_specific_service, enhanced_query, service_name = detect_specific_service_inquiry(query)
     if is_specific_service:
         # Use the enhanced query to search FAQs for specific service information
         try:
-            docs = db.similarity_search(enhanced_query, k=3)
+            docs = await asyncio.to_thread(db.similarity_search, enhanced_query, 3)
             context = "\n".join([doc.page_content for doc in docs])
         except Exception as e:
             print(f"FAQ search failed for specific service: {e}")
+            docs = []
             context = "No specific FAQ context available."
         
         # Prepare prompt for specific service inquiry
-        update_history(user_id, "user", query)
-        prompt = enhanced_generate_prompt(context, f"Tell me about {service_name} services that Notionhive offers. {query}", user_id)
+        conversation = await conversation_context(user_id)
+        prompt = enhanced_generate_prompt(context, f"Tell me about {service_name} services that Notionhive offers. {query}", user_id, conversation)
         
-        # Call Gemini LLM
-        try:
-            response = gemini_model.generate_content(prompt)
-            answer = response.text.strip()
-            update_history(user_id, "bot", answer)
-            return {
-                "action": "specific_service_inquiry", 
-                "service": service_name,
-                "answer": answer
-            }
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return None, {
+            "prompt": prompt,
+            "fields": {"action": "specific_service_inquiry", "service": service_name},
+            "branch": "specific-service",
+            "cache": _cache_params(snapshot, query, docs, f"service:{service_name}", conversation),
+        }
 
     # Detect general services inquiry (show service list)
     if detect_services_intent(query):
@@ -295,40 +228,161 @@ async def ask_faq(request: QuestionRequest):
             "action": "services_inquiry",
             "services": services_list,
             "answer": "Here are our comprehensive services. Ready to transform your digital presence?"
-        }
+        }, None
 
     # Search FAQ database for relevant context
     try:
         # Get relevant FAQ content from vector database
-        docs = db.similarity_search(query, k=3)  # Get top 3 most relevant FAQs
+        docs = await asyncio.to_thread(db.similarity_search, query, 3)  # Get top 3 most relevant FAQs
         context = "\n".join([doc.page_content for doc in docs])
     except Exception as e:
         print(f"FAQ search failed: {e}")
+        docs = []
         context = "No specific FAQ context available."
 
-    # Prepare prompt with history and FAQ context
-    update_history(user_id, "user", query)
-    history = get_history(user_id)
-    
-    # Generate prompt using FAQ context and greeting logic
-    prompt = enhanced_generate_prompt(context, query, user_id)
+    # Generate prompt using FAQ context, conversation history and greeting logic
+    conversation = await conversation_context(user_id)
+    prompt = enhanced_generate_prompt(context, query, user_id, conversation)
+
+    return None, {
+        "prompt": prompt,
+        "fields": {},
+        "branch": "general",
+        "cache": _cache_params(snapshot, query, docs, "general", conversation),
+    }
+
+# Chat endpoint API
+@router.post("/ask")
+async def ask_faq(request: QuestionRequest):
+    query = request.query.strip()
+    user_id = request.user_id or f"user_{int(time.time()*1000)}"
+    request_started = time.perf_counter()
+
+    reply, pending = await _route_query(query, user_id)
+    if reply is not None:
+        chat_requests.observe(time.perf_counter() - request_started, endpoint="ask", route=reply.get("action", "canned"))
+        return reply
+
+    cache = pending["cache"]
+
+    async def generate():
+        started = time.perf_counter()
+        answer = await generate_text(pending["prompt"], model=await get_chat_model(), branch=pending["branch"])
+        if cache:
+            await answer_cache.set(answer=answer, latency=time.perf_counter() - started, **cache)
+        return answer
 
-    # Call Gemini LLM
     try:
-        response = gemini_model.generate_content(prompt)
-        answer = response.text.strip()
+        if cache:
+            cached = await answer_cache.get(**cache)
+            if cached is not None:
+                await update_history(user_id, ("user", query), ("bot", cached))
+                chat_requests.observe(time.perf_counter() - request_started, endpoint="ask", route=f"{pending['branch']}-cached")
+                return {**pending["fields"], "answer": cached}
+
+        # Call Gemini LLM; identical questions arriving together share one generation
+        if cache:
+            answer, shared = await single_flight.do(
+                cache["key"], generate, lookup=lambda: answer_cache.peek(cache["key"])
+            )
+        else:
+            answer, shared = await generate(), False
 
-        update_history(user_id, "bot", answer) 
+        # The user message and the reply are written together in one round-trip
+        await update_history(user_id, ("user", query), ("bot", answer))
 
-        return {"answer": answer}
+        route = f"{pending['branch']}-shared" if shared else pending["branch"]
+        chat_requests.observe(time.perf_counter() - request_started, endpoint="ask", route=route)
+        return {**pending["fields"], "answer": answer}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Streaming chat endpoint API (Server-Sent Events)
+# Emits "token" events as Gemini streams, then a "done" event carrying the same payload /ask returns.
+@router.post("/ask/stream")
+async def ask_faq_stream(request: QuestionRequest):
+    query = request.query.strip()
+    user_id = request.user_id or f"user_{int(time.time()*1000)}"
+
+    request_started = time.perf_counter()
+    reply, pending = await _route_query(query, user_id)
+
+    async def event_stream():
+        if reply is not None:
+            chat_requests.observe(time.perf_counter() - request_started, endpoint="ask_stream", route=reply.get("action", "canned"))
+            yield _sse_event("done", reply)
+            return
+
+        cache = pending["cache"]
+        if cache:
+            try:
+                cached = await answer_cache.get(**cache)
+            except Exception as e:
+                print(f"Answer cache lookup failed: {e}")
+                cached = None
+            if cached is not None:
+                await update_history(user_id, ("user", query), ("bot", cached))
+                chat_requests.observe(time.perf_counter() - request_started, endpoint="ask_stream", route=f"{pending['branch']}-cached")
+                yield _sse_event("token", {"delta": cached})
+                yield _sse_event("done", {**pending["fields"], "answer": cached})
+                return
+
+        # Another request is already generating this answer: wait for it instead of streaming a copy.
+        # If that request goes away mid-generation, the first waiter to notice takes over.
+        flight = None
+        while cache:
+            try:
+                answer = await single_flight.wait(cache["key"])
+            except Exception as e:
+                yield _sse_event("error", {"detail": str(e)})
+                return
+            if answer is not None:
+                await update_history(user_id, ("user", query), ("bot", answer))
+                chat_requests.observe(time.perf_counter() - request_started, endpoint="ask_stream", route=f"{pending['branch']}-shared")
+                yield _sse_event("token", {"delta": answer})
+                yield _sse_event("done", {**pending["fields"], "answer": answer})
+                return
+            flight = single_flight.begin(cache["key"])
+            if flight is not None:
+                break
+
+        parts = []
+        started = time.perf_counter()
+        try:
+            async for chunk in stream_text(pending["prompt"], model=await get_chat_model(), branch=pending["branch"]):
+                parts.append(chunk)
+                yield _sse_event("token", {"delta": chunk})
+        except BaseException as e:
+            if flight is not None:
+                single_flight.end(cache["key"], flight, error=e)
+            if not isinstance(e, Exception):
+                raise  # client disconnected
+            yield _sse_event("error", {"detail": str(e)})
+            return
+
+        answer = "".join(parts).strip()
+        if cache:
+            try:
+                await answer_cache.set(answer=answer, latency=time.perf_counter() - started, **cache)
+            finally:
+                single_flight.end(cache["key"], flight, answer)
+        await update_history(user_id, ("user", query), ("bot", answer))
+        chat_requests.observe(time.perf_counter() - request_started, endpoint="ask_stream", route=pending["branch"])
+        yield _sse_event("done", {**pending["fields"], "answer": answer})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/end-agent-session/{user_id}")
-def end_agent_session(user_id: str):
-    agent_active_users.discard(user_id)
-    greeted_users.discard(user_id)  # Clear greeting status
-    clear_history(user_id)
+async def end_agent_session(user_id: str):
+    await clear_history(user_id)
+    session_store.end(user_id)  # Clears the agent and greeting flags too
     return {"message": f"Agent session ended and memory cleared for {user_id}"}
 
 # Callback request API
@@ -358,12 +412,9 @@ async def request_callback(request: CallbackRequest):
         # Log the callback request (you can replace this with actual database storage)
         print(f"New callback request: {callback_data}")
         
-        # Send callback request to Telegram
-        telegram_sent = send_callback_to_telegram(callback_data)
-        if telegram_sent:
-            print("Callback request sent to Telegram successfully!")
-        else:
-            print("Failed to send callback request to Telegram")
+        # Queue the callback request for Telegram; delivery happens in the background
+        if not send_callback_to_telegram(callback_data):
+            print("Failed to queue callback request for Telegram")
         
         return {
             "message": "Thank you! We've received your callback request and will reach out to you soon.",
@@ -377,15 +428,14 @@ async def request_callback(request: CallbackRequest):
 @router.post("/add_faq")
 async def add_faq(faq: FAQItem):
     try:
-        df = pd.read_csv(faq_path, encoding="utf-8")
-        if ((df["prompt"] == faq.question) & (df["response"] == faq.answer)).any():
+        row = await asyncio.to_thread(faq_store.add, faq.question, faq.answer)
+        if row is None:
             raise HTTPException(status_code=400, detail="FAQ already exists.")
-        new_df = pd.DataFrame([{"id": str(uuid.uuid4()), "prompt": faq.question, "response": faq.answer}])
-        updated_df = pd.concat([df, new_df], ignore_index=True)
-        updated_df.to_csv(faq_path, index=False, encoding="utf-8")
-        global db
-        db = load_faqs()
+        await index_manager.add_faqs([row])
+        await answer_cache.invalidate()
         return {"message": "FAQ added successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -400,30 +450,25 @@ async def upload_faqs_csv(file: UploadFile = File(...)):
         }
 
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-
-        if "question" not in df.columns or "answer" not in df.columns:
-            return {
-                "status": "error",
-                "message": "Invalid CSV structure",
-                "error": "CSV must contain 'question' and 'answer' columns."
-            }
-
-        for _, row in df.iterrows():
-            question = str(row["question"]).strip()
-            answer = str(row["answer"]).strip()
-            if question and answer:
-                add_faq_to_csv(question, answer)
+        # Starlette spools large uploads to disk; parse them in chunks off the event loop
+        new_rows, counts = await asyncio.to_thread(faq_store.import_csv, file.file)
 
-        global db
-        db = load_faqs()
+        await index_manager.add_faqs(new_rows)
+        if new_rows:
+            await answer_cache.invalidate()
 
         return {
             "status": "success",
-            "message": "FAQs uploaded and added successfully."
+            "message": "FAQs uploaded and added successfully.",
+            **counts
         }
 
+    except FAQCSVFormatError as e:
+        return {
+            "status": "error",
+            "message": "Invalid CSV structure",
+            "error": str(e)
+        }
     except Exception as e:
         traceback.print_exc()
         return {
@@ -436,32 +481,27 @@ async def upload_faqs_csv(file: UploadFile = File(...)):
 @router.delete("/delete_faq")
 async def delete_faq(faq: FAQItem = Body(...)):
     try:
-        df = pd.read_csv(faq_path, encoding="utf-8")
-        filtered_df = df[~((df["prompt"] == faq.question) & (df["response"] == faq.answer))]
-        if len(df) == len(filtered_df):
+        removed_ids = await asyncio.to_thread(faq_store.delete_by_content, faq.question, faq.answer)
+        if not removed_ids:
             raise HTTPException(status_code=404, detail="FAQ not found.")
-        filtered_df.to_csv(faq_path, index=False, encoding="utf-8")
-        global db
-        db = load_faqs()
+        await index_manager.remove_faqs(removed_ids)
+        await answer_cache.invalidate()
         return {"message": "FAQ deleted successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/deleted/{faq_id}")
 async def delete_faq_by_id(faq_id: str = Path(...)):
     try:
-        df = pd.read_csv(faq_path, encoding="utf-8")
-        if "id" not in df.columns:
-            raise HTTPException(status_code=500, detail="CSV does not contain 'id' column.")
-
-        filtered_df = df[df["id"] != faq_id]
-        if len(filtered_df) == len(df):
+        if not await asyncio.to_thread(faq_store.delete, faq_id):
             raise HTTPException(status_code=404, detail="FAQ with given ID not found.")
-
-        filtered_df.to_csv(faq_path, index=False, encoding="utf-8")
-        global db
-        db = load_faqs()
+        await index_manager.remove_faqs([faq_id])
+        await answer_cache.invalidate()
         return {"message": f"FAQ with ID {faq_id} deleted successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -469,40 +509,101 @@ async def delete_faq_by_id(faq_id: str = Path(...)):
 @router.delete("/delete/deleteall")
 async def delete_all_faqs():
     try:
-        pd.DataFrame(columns=["id", "prompt", "response"]).to_csv(faq_path, index=False, encoding="utf-8")
-        global db
-        db = load_faqs()
+        await asyncio.to_thread(faq_store.delete_all)
+        await index_manager.clear()
+        await answer_cache.invalidate()
         return {"message": "All FAQs deleted successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Show All FAQs API
+# Supports cursor pagination (limit/cursor), a text filter (q) and field projection (fields=id,question).
+# Responses carry an ETag derived from the FAQ-set version, so unchanged polls get a 304.
+# SQLite calls run in worker threads, off the event loop.
+FAQ_FIELDS = {"id": "id", "question": "prompt", "answer": "response"}
+
 @router.get("/get_faqs")
-async def get_faqs():
+async def get_faqs(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    q: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, example="id,question"),
+):
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(FAQ_FIELDS)
+    unknown = [f for f in selected if f not in FAQ_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
     try:
-        df = pd.read_csv(faq_path, encoding="utf-8")
-        df = df.astype(str)
-        result = df.rename(columns={"prompt": "question", "response": "answer"}).to_dict(orient="records")
-        return result
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="FAQ CSV file not found.")
-    except pd.errors.ParserError as e:
-        raise HTTPException(status_code=500, detail=f"CSV Parsing Error: {str(e)}")
-    except UnicodeDecodeError as e:
-        raise HTTPException(status_code=500, detail=f"Encoding Error: {str(e)}")
+        params = f"{limit}|{cursor}|{q}|{','.join(selected)}"
+        version = await asyncio.to_thread(faq_store.version)
+        etag = f'"faqs-{version}-{hashlib.sha1(params.encode("utf-8")).hexdigest()[:12]}"'
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        rows, next_cursor = await asyncio.to_thread(faq_store.page, limit, cursor, q)
+        result = [{field: row[FAQ_FIELDS[field]] for field in selected} for row in rows]
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return JSONResponse(content=result, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected Error: {str(e)}")
 
+# Export FAQs in the legacy faqs.csv layout
+@router.get("/export_faqs_csv")
+async def export_faqs_csv():
+    try:
+        buffer = io.StringIO()
+        await asyncio.to_thread(faq_store.export_csv, buffer)
+        return Response(
+            content=buffer.getvalue(),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=faqs.csv"},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Retrain DB
 @router.post("/retrain")
 async def retrain_db():
     try:
-        global db
-        db = load_faqs()
-        return {"message": "Chatbot retrained successfully."}
+        # Full rebuild from the FAQ store in a worker thread (incremental edits don't need this)
+        snapshot = await index_manager.rebuild_async()
+        await answer_cache.invalidate()
+        return {"message": "Chatbot retrained successfully.", "index_version": snapshot.version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Prometheus metrics: Gemini calls, tokens and latency per branch, cache lookups, sessions
+metrics.Gauge("chat_sessions", "In-memory chat sessions", fn=lambda: len(session_store))
+metrics.Gauge("faq_index_documents", "Documents in the live retrieval index", fn=lambda: index_manager.current().doc_count)
+metrics.Gauge("faq_index_version", "Version of the live retrieval index", fn=lambda: index_manager.current().version)
+metrics.Gauge("redis_circuit_open", "1 while the Redis circuit breaker is open", fn=lambda: int(redis_store.breaker.state == "open"))
+
+@router.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# In-memory session counts (Redis-fallback history, greeting/agent flags)
+@router.get("/sessions/stats")
+def sessions_stats():
+    return session_store.stats()
+
+# Live index version, size and last build time
+@router.get("/index/status")
+def index_status():
+    return index_manager.current().status()
+
+# Answer cache hit rate and saved Gemini latency
+@router.get("/cache/stats")
+def cache_stats():
+    return {**answer_cache.stats(), "single_flight": single_flight.stats(), "redis": redis_store.stats()}
+
 # Google Calendar API routes
 @router.get("/google-calendar/freebusy")
 def get_busy_slots(
@@ -510,20 +611,6 @@ def get_busy_slots(
     end_date: str = Query(..., example="2025-07-21")
 ):
     try:
-        # Use stored credentials
-        creds = Credentials(
-            token=ACCESS_TOKEN,
-            refresh_token=REFRESH_TOKEN,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=CLIENT_ID,
-            client_secret=CLIENT_SECRET,
-            scopes=SCOPES,
-        )
-        if creds.expired and creds.refresh_token:
-            creds.refresh(GoogleRequest())
-
-        service = build("calendar", "v3", credentials=creds)
-
         body = {
             "timeMin": start_date,
             "timeMax": end_date,
@@ -531,7 +618,8 @@ def get_busy_slots(
             "items": [{"id": "primary"}]
         }
 
-        response = service.freebusy().query(body=body).execute()
+        # Shared service and token (see calendar_client.py)
+        response = calendar_client.execute(lambda service: service.freebusy().query(body=body))
         busy_slots = response["calendars"]["primary"]["busy"]
 
         return {"busy": busy_slots}
@@ -539,27 +627,35 @@ def get_busy_slots(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Free 30-minute slots in business hours, from cached per-day freebusy windows
+@router.get("/google-calendar/availability")
+def get_availability(
+    start_date: str = Query(..., example="2025-07-20"),
+    days: int = Query(7, ge=1, le=MAX_DAYS)
+):
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date must be YYYY-MM-DD")
+    try:
+        return {
+            "timezone": TIMEZONE,
+            "slot_minutes": SLOT_MINUTES,
+            "days": availability.availability(start, days),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Calendar client state: token expiry and refresh counts
+@router.get("/google-calendar/status")
+def calendar_status():
+    return {**calendar_client.stats(), "availability": availability.stats()}
+
 # Schedule Meeting API
 @router.post("/google-calendar/schedule")
 def schedule_meeting(req: MeetingRequest):
     try:
         print("Received meeting data:", req.dict())
-        # Build credentials using stored tokens
-        creds = Credentials(
-            token=ACCESS_TOKEN,
-            refresh_token=REFRESH_TOKEN,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=CLIENT_ID,
-            client_secret=CLIENT_SECRET,
-            scopes=SCOPES,
-        )
-
-        # Refresh token if expired
-        if creds.expired and creds.refresh_token:
-            creds.refresh(GoogleRequest())
-
-        service = build("calendar", "v3", credentials=creds)
-
         # Parse time
         start = datetime.strptime(f"{req.date} {req.time.upper()}", "%Y-%m-%d %I:%M %p")
         start = pytz.timezone(TIMEZONE).localize(start)
@@ -582,12 +678,14 @@ def schedule_meeting(req: MeetingRequest):
                 }
             },
         }
-        event_result = service.events().insert(
+        event_result = calendar_client.execute(lambda service: service.events().insert(
             calendarId="primary",
             body=event,
             conferenceDataVersion=1,
             sendUpdates="all",
-        ).execute()
+        ))
+        # The booked day's cached free/busy window is now out of date
+        availability.invalidate(start.date())
         return {
             "message": "Meeting scheduled successfully!",
             "event_link": event_result.get("htmlLink"),
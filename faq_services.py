@@ -1,93 +1,466 @@
 #Basic Packages
 import os
+import copy
+import time
+import asyncio
 import pandas as pd
 from dotenv import load_dotenv
-import uuid
+import threading
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import scipy.sparse as sp
 
 #Gen AI Packages
 import google.generativeai as genai
 
+#Calling Functions from other py files
+from faq_store import faq_store, faq_path
+from retrieval import FAQDocument, HybridFAQDB, embedding_model_available
+
 # Environment setup
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=api_key)
 
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash-lite")  # Uses free tier quotas efficiently
+GENERATION_CONFIG = {"temperature": 0.4}
+
 gemini_model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash-lite",  # Uses free tier quotas efficiently
-    generation_config={"temperature": 0.4}
+    model_name=GEMINI_MODEL_NAME,
+    generation_config=GENERATION_CONFIG
 )
-faq_path = "faqs.csv"
+
+# Incremental index tuning: refit the vectorizer in the background once this share of the
+# tokens added since the last fit is out of vocabulary (counted only after VOCAB_DRIFT_MIN_TOKENS
+# have been added, so one unusual FAQ does not trigger a refit), or this share of rows is tombstoned.
+VOCAB_DRIFT_THRESHOLD = float(os.getenv("VOCAB_DRIFT_THRESHOLD", "0.2"))
+VOCAB_DRIFT_MIN_TOKENS = int(os.getenv("VOCAB_DRIFT_MIN_TOKENS", "100"))
+TOMBSTONE_THRESHOLD = float(os.getenv("TOMBSTONE_THRESHOLD", "0.25"))
+
+def _combined_text(df):
+    # Combine prompt and response for better semantic search
+    return df['prompt'].astype(str) + ' ' + df['response'].astype(str)
+
+def _page_contents(df):
+    return [f"Q: {prompt}\nA: {response}" for prompt, response in zip(df['prompt'], df['response'])]
+
+MIN_SIMILARITY = 0.1  # Minimum similarity threshold for a FAQ to count as a hit
+
+class _IndexState:
+    """Immutable snapshot of the TF-IDF index; replaced wholesale, never mutated"""
+    __slots__ = ("vectorizer", "faq_data", "faq_vectors", "alive", "id_to_row",
+                 "added_tokens", "oov_tokens", "page_contents", "ids")
+
+    def __init__(self, vectorizer, faq_data, faq_vectors, alive, id_to_row, added_tokens=0, oov_tokens=0,
+                 page_contents=None, ids=None):
+        self.vectorizer = vectorizer
+        self.faq_data = faq_data
+        # TfidfVectorizer L2-normalizes rows, so a sparse dot product is the cosine similarity
+        self.faq_vectors = faq_vectors
+        self.alive = alive
+        self.id_to_row = id_to_row
+        self.added_tokens = added_tokens
+        self.oov_tokens = oov_tokens
+        # Precomputed per-row result payloads, so searches never touch the DataFrame
+        self.page_contents = page_contents if page_contents is not None else _page_contents(faq_data)
+        self.ids = ids if ids is not None else (faq_data['id'].tolist() if 'id' in faq_data.columns else [None] * len(faq_data))
+
+    @property
+    def live_count(self):
+        return int(self.alive.sum()) if self.alive is not None else 0
+
+    @property
+    def vocab_drift(self):
+        if self.added_tokens < VOCAB_DRIFT_MIN_TOKENS:
+            return 0.0
+        return self.oov_tokens / self.added_tokens
+
+    @property
+    def tombstone_ratio(self):
+        total = len(self.alive) if self.alive is not None else 0
+        return (total - self.live_count) / total if total else 0.0
+
+def _fit_state(df):
+    """Fit a fresh vectorizer over df and return the resulting index state"""
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
+    if df is None or df.empty:
+        empty = pd.DataFrame(columns=['id', 'prompt', 'response'])
+        return _IndexState(vectorizer, empty, None, None, {})
+    df = df.reset_index(drop=True)
+    faq_vectors = vectorizer.fit_transform(_combined_text(df))
+    id_to_row = {str(faq_id): row for row, faq_id in enumerate(df['id'])} if 'id' in df.columns else {}
+    return _IndexState(vectorizer, df, faq_vectors, np.ones(len(df), dtype=bool), id_to_row)
 
 class SimpleFAQDB:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-        self.faq_data = None
-        self.faq_vectors = None
+        self._state = _fit_state(None)
+        self._write_lock = threading.Lock()
+        self._compacting = False
+        # Called as on_compacted(db, compacted_db, unchanged) to publish a compaction, where
+        # unchanged() tells whether db still holds the state that was compacted; returns whether
+        # it was applied. Without it the compacted state is swapped into this engine.
+        self.on_compacted = None
         self.load_faqs()
-    
+
+    def fork(self, state=None):
+        """New engine on `state` (default: this one's); edits to either leave the other untouched"""
+        db = copy.copy(self)
+        db._write_lock = threading.Lock()
+        db._compacting = False
+        if state is not None:
+            db._state = state
+        return db
+
+    # Read-only views of the current snapshot
+    @property
+    def vectorizer(self):
+        return self._state.vectorizer
+
+    @property
+    def faq_data(self):
+        return self._state.faq_data
+
+    @property
+    def faq_vectors(self):
+        return self._state.faq_vectors
+
+    @property
+    def doc_count(self):
+        return self._state.live_count
+
+    def _publish(self, state):
+        # Single reference assignment: readers see either the old or the new snapshot
+        self._state = state
+
     def load_faqs(self):
-        """Load FAQs from CSV and create TF-IDF vectors"""
+        """Load FAQs from the FAQ store and create TF-IDF vectors"""
         try:
-            df = pd.read_csv(faq_path, encoding="utf-8")
+            df = faq_store.dataframe()
             if df.empty:
-                print("Warning: FAQ CSV is empty")
-                return
-                
-            self.faq_data = df
-            # Combine prompt and response for better semantic search
-            combined_text = df['prompt'] + ' ' + df['response']
-            self.faq_vectors = self.vectorizer.fit_transform(combined_text)
+                print("Warning: FAQ store is empty")
+            state = _fit_state(df)
+            with self._write_lock:
+                self._publish(state)
             print(f"Loaded {len(df)} FAQs into database")
         except Exception as e:
             print(f"Error loading FAQs: {e}")
-            self.faq_data = pd.DataFrame(columns=['prompt', 'response', 'id'])
-            self.faq_vectors = None
-    
+            with self._write_lock:
+                self._publish(_fit_state(None))
+
+    def add_faqs(self, rows):
+        """Append FAQ rows ({id, prompt, response}) using the existing vocabulary"""
+        if not rows:
+            return
+        new_df = pd.DataFrame(rows, columns=['id', 'prompt', 'response'])
+        with self._write_lock:
+            state = self._state
+            if state.faq_vectors is None:
+                # Nothing fitted yet, so there is no vocabulary to reuse
+                self._publish(_fit_state(new_df))
+                return
+
+            texts = _combined_text(new_df)
+            analyzer = state.vectorizer.build_analyzer()
+            vocabulary = state.vectorizer.vocabulary_
+            added_tokens = oov_tokens = 0
+            for text in texts:
+                tokens = analyzer(text)
+                added_tokens += len(tokens)
+                oov_tokens += sum(1 for token in tokens if token not in vocabulary)
+
+            offset = len(state.faq_data)
+            id_to_row = dict(state.id_to_row)
+            for i, faq_id in enumerate(new_df['id']):
+                id_to_row[str(faq_id)] = offset + i
+
+            new_state = _IndexState(
+                state.vectorizer,
+                pd.concat([state.faq_data, new_df], ignore_index=True),
+                sp.vstack([state.faq_vectors, state.vectorizer.transform(texts)], format='csr'),
+                np.concatenate([state.alive, np.ones(len(new_df), dtype=bool)]),
+                id_to_row,
+                state.added_tokens + added_tokens,
+                state.oov_tokens + oov_tokens,
+                state.page_contents + _page_contents(new_df),
+                state.ids + new_df['id'].tolist(),
+            )
+            self._publish(new_state)
+        self._maybe_compact(new_state)
+
+    def remove_faqs(self, faq_ids):
+        """Tombstone FAQ rows by id; returns how many rows were removed"""
+        with self._write_lock:
+            state = self._state
+            rows = [state.id_to_row[str(faq_id)] for faq_id in faq_ids if str(faq_id) in state.id_to_row]
+            if not rows:
+                return 0
+            alive = state.alive.copy()
+            alive[rows] = False
+            id_to_row = {faq_id: row for faq_id, row in state.id_to_row.items() if alive[row]}
+            new_state = _IndexState(state.vectorizer, state.faq_data, state.faq_vectors, alive,
+                                    id_to_row, state.added_tokens, state.oov_tokens,
+                                    state.page_contents, state.ids)
+            self._publish(new_state)
+        self._maybe_compact(new_state)
+        return len(rows)
+
+    def clear(self):
+        """Drop every FAQ from the index"""
+        with self._write_lock:
+            self._publish(_fit_state(None))
+
+    def _maybe_compact(self, state):
+        if state.vocab_drift < VOCAB_DRIFT_THRESHOLD and state.tombstone_ratio < TOMBSTONE_THRESHOLD:
+            return
+        with self._write_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, args=(state,), name="faq-index-compaction", daemon=True).start()
+
+    def _compact(self, state):
+        """Refit over the live rows of `state` off the request path and swap the result in.
+        If an edit replaced `state` meanwhile the refit is dropped and retried on the new state."""
+        applied = False
+        try:
+            live = state.faq_data[state.alive].reset_index(drop=True) if state.alive is not None else None
+            new_state = _fit_state(live)
+            if self.on_compacted is not None:
+                applied = self.on_compacted(self, self.fork(new_state), lambda: self._state is state)
+            else:
+                with self._write_lock:
+                    applied = self._state is state
+                    if applied:
+                        self._publish(new_state)
+            if applied:
+                print(f"Compacted FAQ index to {new_state.live_count} rows")
+        except Exception as e:
+            print(f"FAQ index compaction failed: {e}")
+        finally:
+            with self._write_lock:
+                self._compacting = False
+        if not applied and self._state is not state:
+            self._maybe_compact(self._state)
+
+    def query_vector(self, query):
+        """TF-IDF vector for a query, or None when the index is empty"""
+        state = self._state
+        if state.faq_vectors is None:
+            return None
+        return state.vectorizer.transform([query])
+
+    def _documents(self, state, scores, k):
+        """Top-k rows of a score vector as FAQDocuments, best first"""
+        scores = np.where(state.alive, scores, -1.0)  # tombstoned rows never match
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        # argpartition selects the k best in O(N); only those k are sorted
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [
+            FAQDocument(state.page_contents[idx], {'similarity': float(scores[idx]), 'id': state.ids[idx]})
+            for idx in top
+            if scores[idx] > MIN_SIMILARITY
+        ]
+
     def similarity_search(self, query, k=3):
         """Search for similar FAQs"""
-        if self.faq_vectors is None or self.faq_data is None or self.faq_data.empty:
+        state = self._state
+        if state.faq_vectors is None or state.live_count == 0:
             return []
         
         try:
-            query_vector = self.vectorizer.transform([query])
-            similarities = cosine_similarity(query_vector, self.faq_vectors).flatten()
-            
-            # Get top k results
-            top_indices = similarities.argsort()[-k:][::-1]
-            
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum similarity threshold
-                    faq_row = self.faq_data.iloc[idx]
-                    # Create document-like object
-                    doc = type('Document', (), {
-                        'page_content': f"Q: {faq_row['prompt']}\nA: {faq_row['response']}",
-                        'metadata': {'similarity': similarities[idx]}
-                    })()
-                    results.append(doc)
-            
-            return results
+            query_vector = state.vectorizer.transform([query])
+            scores = (state.faq_vectors @ query_vector.T).toarray().ravel()
+            return self._documents(state, scores, k)
         except Exception as e:
             print(f"Error in similarity search: {e}")
             return []
 
-# Create global database instance
-db = SimpleFAQDB()
+    def similarity_search_many(self, queries, k=3):
+        """Search for many queries with a single sparse matrix multiply; one result list per query"""
+        state = self._state
+        if state.faq_vectors is None or state.live_count == 0 or not queries:
+            return [[] for _ in queries]
+
+        try:
+            query_vectors = state.vectorizer.transform(queries)
+            scores = (query_vectors @ state.faq_vectors.T).toarray()
+            return [self._documents(state, row, k) for row in scores]
+        except Exception as e:
+            print(f"Error in similarity search: {e}")
+            return [[] for _ in queries]
+
+# Retrieval engine: "hybrid" (BM25 + dense embeddings, see retrieval.py), "tfidf" (SimpleFAQDB)
+# or "auto": hybrid when the embedding model is already on disk, so startup never blocks on a
+# model download, and tfidf otherwise
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "auto").lower()
+INDEX_SYNC_SECONDS = float(os.getenv("INDEX_SYNC_SECONDS", "5"))
+
+def create_faq_db():
+    if RETRIEVAL_ENGINE == "tfidf" or (RETRIEVAL_ENGINE == "auto" and not embedding_model_available()):
+        return SimpleFAQDB()
+    return HybridFAQDB()
+
+class IndexSnapshot:
+    """Immutable, versioned view of the live retrieval index"""
+    __slots__ = ("version", "db", "built_at", "build_seconds", "doc_count", "store_version")
+
+    def __init__(self, version, db, built_at, build_seconds, doc_count, store_version=None):
+        self.version = version
+        self.db = db
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+        self.doc_count = doc_count
+        self.store_version = store_version  # FAQ store version the index reflects
+
+    def status(self):
+        return {
+            "version": self.version,
+            "engine": type(self.db).__name__,
+            "doc_count": self.doc_count,
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 4),
+            "store_version": self.store_version,
+        }
+
+class IndexManager:
+    """Owns the live FAQ index.
+
+    Readers call current() and keep using that snapshot for the whole request; they never
+    take a lock. Writers are serialized, run in a worker thread when called from async code,
+    and publish a new snapshot with a single reference assignment. Full rebuilds construct a
+    fresh engine and incremental edits run against a fork of the live one, so the engine of a
+    published snapshot never changes and in-flight searches finish on the version they started.
+
+    Each worker process has its own index. The snapshot records the FAQ store version it
+    reflects, and the sync loop rebuilds once the store has moved on (an edit made through
+    another worker), so every worker converges within INDEX_SYNC_SECONDS.
+    """
+
+    def __init__(self, factory, store=None, sync_seconds: float = INDEX_SYNC_SECONDS):
+        self._factory = factory
+        self._store = store
+        self.sync_seconds = sync_seconds
+        self._write_lock = threading.Lock()
+        self._snapshot = None
+        self._syncer = None
+        self.rebuild()
+
+    def current(self) -> IndexSnapshot:
+        return self._snapshot
+
+    def _store_version(self):
+        return self._store.version() if self._store is not None else None
+
+    def _publish(self, db, build_seconds, store_version=None):
+        previous = self._snapshot
+        if hasattr(db, "on_compacted"):
+            db.on_compacted = self._compacted
+        if store_version is None and previous is not None:
+            store_version = previous.store_version
+        self._snapshot = IndexSnapshot(
+            previous.version + 1 if previous else 1, db, time.time(), build_seconds, db.doc_count, store_version
+        )
+        return self._snapshot
+
+    def _compacted(self, db, compacted, unchanged):
+        """Publish a background compaction of db as a new version, unless db was edited or replaced meanwhile"""
+        with self._write_lock:
+            if self._snapshot.db is not db or not unchanged():
+                return False
+            self._publish(compacted, 0.0)
+            return True
+
+    def rebuild(self):
+        """Build a new engine from the FAQ store and swap it in"""
+        with self._write_lock:
+            started = time.perf_counter()
+            # Read the version first: a change that lands during the build is picked up next sync
+            store_version = self._store_version()
+            db = self._factory()
+            return self._publish(db, time.perf_counter() - started, store_version)
+
+    def apply(self, change):
+        """Run change(db) against a fork of the live engine and publish the fork as a new version.
+
+        Called after one write to the FAQ store, which bumps its version by one; if it moved
+        further, another worker changed it too and the next sync rebuilds from the store.
+        """
+        with self._write_lock:
+            started = time.perf_counter()
+            previous = self._snapshot
+            db = previous.db.fork()
+            result = change(db)
+            store_version = self._store_version()
+            if previous.store_version is None or store_version != previous.store_version + 1:
+                store_version = previous.store_version
+            self._publish(db, time.perf_counter() - started, store_version)
+            return result
+
+    async def rebuild_async(self):
+        return await asyncio.to_thread(self.rebuild)
+
+    async def add_faqs(self, rows):
+        return await asyncio.to_thread(self.apply, lambda db: db.add_faqs(rows))
+
+    async def remove_faqs(self, faq_ids):
+        return await asyncio.to_thread(self.apply, lambda db: db.remove_faqs(faq_ids))
+
+    async def clear(self):
+        return await asyncio.to_thread(self.apply, lambda db: db.clear())
+
+    # Cross-worker sync
+    async def sync(self):
+        """Rebuild if the FAQ store changed since the live snapshot was built; returns whether it did"""
+        if self._store is None:
+            return False
+        store_version = await asyncio.to_thread(self._store.version)
+        if store_version == self._snapshot.store_version:
+            return False
+        snapshot = await self.rebuild_async()
+        print(f"FAQ store changed elsewhere; index rebuilt as version {snapshot.version}")
+        return True
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"FAQ index sync failed: {e}")
+
+    def start(self):
+        """Start the store sync loop (idempotent)"""
+        if self._store is None or (self._syncer is not None and not self._syncer.done()):
+            return
+        self._syncer = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._syncer is not None:
+            self._syncer.cancel()
+            try:
+                await self._syncer
+            except asyncio.CancelledError:
+                pass
+            self._syncer = None
+
+# Create global index manager
+index_manager = IndexManager(create_faq_db, faq_store)
+
+def __getattr__(name):
+    # faq_services.db always resolves to the live engine
+    if name == "db":
+        return index_manager.current().db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Load FAQ DB
 def load_faqs():
-    """Reload FAQs into the database"""
-    global db
-    db = SimpleFAQDB()
-    return db
+    """Rebuild the index from the FAQ store and return the new engine"""
+    return index_manager.rebuild().db
 
-# Add FAQ entry to CSV
+# Add FAQ entry to the store (kept under its old name for existing scripts);
+# returns the new row, or None if it already existed
 def add_faq_to_csv(question: str, answer: str):
-    df = pd.read_csv(faq_path, encoding="utf-8")
-    if not ((df["prompt"] == question) & (df["response"] == answer)).any():
-        new_row = pd.DataFrame([{"id": str(uuid.uuid4()), "prompt": question, "response": answer}])
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(faq_path, index=False, encoding="utf-8")
+    return faq_store.add(question, answer)
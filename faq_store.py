@@ -0,0 +1,228 @@
+#Basic Packages
+import os
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+faq_path = "faqs.csv"  # legacy CSV; imported into an empty store and available as an export format
+FAQ_DB_PATH = os.getenv("FAQ_DB_PATH", "faqs.db")
+CSV_CHUNK_ROWS = 1000
+
+
+class FAQCSVFormatError(ValueError):
+    """Raised when an uploaded CSV lacks the question/answer columns"""
+
+
+class FAQStore(ABC):
+    """Storage backend for FAQ rows ({id, prompt, response})"""
+
+    @abstractmethod
+    def all(self):
+        """Return every FAQ row in insertion order"""
+
+    @abstractmethod
+    def get(self, faq_id: str):
+        """Return one FAQ row by id, or None"""
+
+    @abstractmethod
+    def add(self, question: str, answer: str):
+        """Insert a FAQ; returns the new row, or None if the (prompt, response) pair exists"""
+
+    @abstractmethod
+    def add_many(self, pairs):
+        """Insert many (question, answer) pairs; returns (new_rows, duplicate_count)"""
+
+    @abstractmethod
+    def delete(self, faq_id: str) -> bool:
+        """Delete a FAQ by id; returns whether a row was removed"""
+
+    @abstractmethod
+    def delete_by_content(self, question: str, answer: str):
+        """Delete FAQs matching a (prompt, response) pair; returns the removed ids"""
+
+    @abstractmethod
+    def delete_all(self):
+        """Delete every FAQ"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored FAQs"""
+
+    @abstractmethod
+    def page(self, limit=None, after=None, text_filter=None):
+        """Rows after cursor `after` (optionally filtered by text); returns (rows, next_cursor)"""
+
+    @abstractmethod
+    def version(self) -> int:
+        """Counter bumped on every change to the FAQ set"""
+
+    def dataframe(self):
+        """Every FAQ row as a DataFrame with id/prompt/response columns"""
+        return pd.DataFrame(self.all(), columns=["id", "prompt", "response"])
+
+    # CSV compatibility
+    def import_csv(self, fileobj, chunk_rows: int = CSV_CHUNK_ROWS):
+        """Bulk-import question/answer rows from a CSV file object.
+
+        The file is read in chunks and rows are inserted in one transaction; duplicates of
+        existing (prompt, response) pairs are skipped. Returns (new_rows, counts).
+        """
+        counts = {"accepted": 0, "duplicate": 0, "invalid": 0}
+        pairs = []
+        reader = pd.read_csv(fileobj, chunksize=chunk_rows, dtype=str, keep_default_na=False, encoding="utf-8")
+        for chunk in reader:
+            if "question" not in chunk.columns or "answer" not in chunk.columns:
+                raise FAQCSVFormatError("CSV must contain 'question' and 'answer' columns.")
+            for question, answer in zip(chunk["question"], chunk["answer"]):
+                question, answer = question.strip(), answer.strip()
+                if not question or not answer:
+                    counts["invalid"] += 1
+                    continue
+                pairs.append((question, answer))
+
+        new_rows, duplicates = self.add_many(pairs)
+        counts["accepted"] = len(new_rows)
+        counts["duplicate"] = duplicates
+        return new_rows, counts
+
+    def export_csv(self, path_or_buffer):
+        """Write every FAQ in the legacy faqs.csv layout (id, prompt, response)"""
+        self.dataframe().to_csv(path_or_buffer, index=False, encoding="utf-8")
+
+
+class SQLiteFAQStore(FAQStore):
+    """FAQ store on SQLite: primary key on id, unique (prompt, response), WAL journal"""
+
+    def __init__(self, db_path: str = FAQ_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS faqs ("
+                " id TEXT PRIMARY KEY,"
+                " prompt TEXT NOT NULL,"
+                " response TEXT NOT NULL)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS faqs_prompt_response ON faqs (prompt, response)")
+            conn.execute("CREATE TABLE IF NOT EXISTS faq_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO faq_meta (key, value) VALUES ('version', 0)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers proceed while a writer commits
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bump_version(conn):
+        conn.execute("UPDATE faq_meta SET value = value + 1 WHERE key = 'version'")
+
+    def all(self):
+        rows = self._connect().execute("SELECT id, prompt, response FROM faqs ORDER BY rowid").fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, faq_id: str):
+        row = self._connect().execute("SELECT id, prompt, response FROM faqs WHERE id = ?", (faq_id,)).fetchone()
+        return dict(row) if row else None
+
+    def add(self, question: str, answer: str):
+        new_rows, _ = self.add_many([(question, answer)])
+        return new_rows[0] if new_rows else None
+
+    def add_many(self, pairs):
+        new_rows, duplicates = [], 0
+        with self._connect() as conn:
+            for question, answer in pairs:
+                row = {"id": str(uuid.uuid4()), "prompt": question, "response": answer}
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO faqs (id, prompt, response) VALUES (:id, :prompt, :response)", row
+                )
+                if cursor.rowcount:
+                    new_rows.append(row)
+                else:
+                    duplicates += 1
+            if new_rows:
+                self._bump_version(conn)
+        return new_rows, duplicates
+
+    def delete(self, faq_id: str) -> bool:
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM faqs WHERE id = ?", (faq_id,)).rowcount > 0
+            if deleted:
+                self._bump_version(conn)
+        return deleted
+
+    def delete_by_content(self, question: str, answer: str):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM faqs WHERE prompt = ? AND response = ?", (question, answer)
+            ).fetchall()
+            ids = [row["id"] for row in rows]
+            conn.executemany("DELETE FROM faqs WHERE id = ?", [(faq_id,) for faq_id in ids])
+            if ids:
+                self._bump_version(conn)
+        return ids
+
+    def delete_all(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM faqs")
+            self._bump_version(conn)
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM faqs").fetchone()[0]
+
+    def page(self, limit=None, after=None, text_filter=None):
+        sql = "SELECT rowid, id, prompt, response FROM faqs WHERE rowid > ?"
+        params = [int(after) if after else 0]
+        if text_filter:
+            pattern = "%" + text_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql += " AND (prompt LIKE ? ESCAPE '\\' OR response LIKE ? ESCAPE '\\')"
+            params += [pattern, pattern]
+        sql += " ORDER BY rowid"
+        if limit:
+            # Fetch one extra row to know whether another page exists
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self._connect().execute(sql, params).fetchall()
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1]["rowid"])
+        return [{"id": row["id"], "prompt": row["prompt"], "response": row["response"]} for row in rows], next_cursor
+
+    def version(self) -> int:
+        return self._connect().execute("SELECT value FROM faq_meta WHERE key = 'version'").fetchone()[0]
+
+    def import_legacy_csv(self, path: str = faq_path):
+        """Seed an empty store from faqs.csv, keeping the existing ids"""
+        if self.count() or not os.path.exists(path):
+            return 0
+        df = pd.read_csv(path, encoding="utf-8", dtype=str, keep_default_na=False)
+        if "id" not in df.columns:
+            df["id"] = [str(uuid.uuid4()) for _ in range(len(df))]
+        rows = df[["id", "prompt", "response"]].to_dict(orient="records")
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO faqs (id, prompt, response) VALUES (:id, :prompt, :response)", rows
+            )
+            self._bump_version(conn)
+        print(f"Imported {len(rows)} FAQs from {path} into {self.db_path}")
+        return len(rows)
+
+
+def create_faq_store() -> FAQStore:
+    store = SQLiteFAQStore(FAQ_DB_PATH)
+    store.import_legacy_csv(faq_path)
+    return store
+
+
+faq_store = create_faq_store()
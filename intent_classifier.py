@@ -0,0 +1,50 @@
+#Basic Packages
+import os
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline, make_union
+
+# Local intent model trained from labelled examples (text,intent). It answers the questions the
+# keyword matcher misses without a Gemini round-trip; the LLM is only asked when the model's
+# confidence is below INTENT_CONFIDENCE_THRESHOLD.
+INTENT_EXAMPLES_PATH = os.getenv("INTENT_EXAMPLES_PATH", "intent_examples.csv")
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.55"))
+INTENT_LABELS = ("schedule", "agent", "contact", "services", "specific_service", "other")
+
+
+def build_intent_pipeline():
+    """Word and character n-gram TF-IDF features feeding a logistic regression"""
+    features = make_union(
+        TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True),
+    )
+    return make_pipeline(features, LogisticRegression(max_iter=1000, C=10.0))
+
+
+def load_intent_examples(path: str = INTENT_EXAMPLES_PATH):
+    df = pd.read_csv(path, encoding="utf-8", dtype=str, keep_default_na=False)
+    df = df[df["text"].str.strip().astype(bool) & df["intent"].isin(INTENT_LABELS)]
+    return df["text"].tolist(), df["intent"].tolist()
+
+
+class IntentClassifier:
+    def __init__(self, examples_path: str = INTENT_EXAMPLES_PATH):
+        texts, labels = load_intent_examples(examples_path)
+        self.pipeline = build_intent_pipeline()
+        self.pipeline.fit(texts, labels)
+        self.labels = list(self.pipeline.classes_)
+        print(f"Trained intent classifier on {len(texts)} examples")
+
+    def predict(self, text: str):
+        """Return (intent, confidence) for a single message"""
+        probabilities = self.pipeline.predict_proba([text])[0]
+        best = probabilities.argmax()
+        return self.labels[best], float(probabilities[best])
+
+
+try:
+    intent_classifier = IntentClassifier()
+except Exception as e:
+    print(f"Intent classifier unavailable ({e}); falling back to Gemini for edge cases")
+    intent_classifier = None
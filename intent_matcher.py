@@ -0,0 +1,81 @@
+#Basic Packages
+import re
+
+# Keywords of at least this length also match simple inflections ("book" -> "booking",
+# "schedule" -> "scheduled"); short ones like "ai" or "ml" must match as whole words.
+INFLECTION_MIN_LENGTH = 4
+INFLECTION_SUFFIXES = ("ing", "ed", "es", "s", "d")
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def _trie_pattern(node) -> str:
+    """Regex for a keyword trie; "" marks a keyword end (True if it may be inflected)"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in node.items() if char != ""]
+    if "" in node:
+        branches.append("(?:" + "|".join(INFLECTION_SUFFIXES) + ")?" if node[""] else "")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class IntentMatcher:
+    """Precompiled multi-keyword matcher that classifies text against every intent in one pass.
+
+    All keywords are folded into one regex of word-bounded alternatives wrapped in a lookahead,
+    so overlapping keywords ("schedule a call" and "call") are all reported.
+    """
+
+    def __init__(self, intents: dict):
+        # keyword -> [(intent, priority)]; priority is the keyword's position in its intent list
+        self._owners = {}
+        for intent, keywords in intents.items():
+            for priority, keyword in enumerate(keywords):
+                keyword = _whitespace_re.sub(" ", keyword.lower().strip())
+                owners = self._owners.setdefault(keyword, [])
+                if all(owner != intent for owner, _ in owners):
+                    owners.append((intent, priority))
+        self.intents = tuple(intents)
+
+        # The alternation is factored into a character trie so each word start is checked in
+        # one walk instead of one attempt per keyword. Longer continuations are tried first, so
+        # the lookahead prefers "call me" over "call"; shorter keywords sharing that start are
+        # recovered through _prefixes.
+        ordered = sorted(self._owners, key=len, reverse=True)
+        trie = {}
+        for keyword in ordered:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = len(keyword) >= INFLECTION_MIN_LENGTH
+        self._pattern = re.compile(r"(?=\b(" + _trie_pattern(trie) + r")\b)")
+
+        self._prefixes = {
+            keyword: [other for other in ordered
+                      if other != keyword and keyword.startswith(other) and not keyword[len(other)].isalnum()]
+            for keyword in ordered
+        }
+
+    def _keyword_for(self, matched: str):
+        if matched in self._owners:
+            return matched
+        for suffix in INFLECTION_SUFFIXES:
+            if matched.endswith(suffix) and matched[:-len(suffix)] in self._owners:
+                return matched[:-len(suffix)]
+        return None
+
+    def match(self, text: str) -> dict:
+        """Return {intent: (keyword, ...)} for every intent with a hit, keywords in priority order"""
+        normalized = _whitespace_re.sub(" ", text.lower().strip())
+        found = {}
+        for m in self._pattern.finditer(normalized):
+            keyword = self._keyword_for(m.group(1))
+            if keyword is None:
+                continue
+            for hit in [keyword, *self._prefixes[keyword]]:
+                for intent, priority in self._owners[hit]:
+                    found.setdefault(intent, {})[hit] = priority
+        return {
+            intent: tuple(sorted(hits, key=hits.get))
+            for intent, hits in found.items()
+        }
@@ -0,0 +1,92 @@
+#Basic Packages
+import os
+import time
+import asyncio
+
+#Calling Functions from other py files
+from faq_services import gemini_model
+from metrics import llm_requests, llm_latency, llm_prompt_tokens, llm_output_tokens, llm_cached_tokens
+
+# Every Gemini call in the app goes through this module so that the event loop
+# never blocks on the network and a burst of chats can't flood the API quota.
+# Calls are tagged with the branch that made them for the /metrics accounting.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "25"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a Gemini call does not finish within its timeout"""
+
+
+def _record(branch: str, status: str, started: float, usage=None):
+    llm_requests.inc(branch=branch, status=status)
+    llm_latency.observe(time.perf_counter() - started, branch=branch)
+    if usage is None:
+        return
+    llm_prompt_tokens.observe(getattr(usage, "prompt_token_count", 0) or 0, branch=branch)
+    llm_output_tokens.observe(getattr(usage, "candidates_token_count", 0) or 0, branch=branch)
+    cached = getattr(usage, "cached_content_token_count", 0) or 0
+    if cached:
+        llm_cached_tokens.inc(cached, branch=branch)
+
+
+async def generate_content(prompt, model=None, timeout: float | None = None, branch: str = "general"):
+    """Call Gemini asynchronously with a concurrency limit and a per-call timeout"""
+    model = model or gemini_model
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    async with _llm_semaphore:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(model.generate_content_async(prompt), timeout)
+        except asyncio.TimeoutError:
+            _record(branch, "timeout", started)
+            raise LLMTimeoutError(f"Gemini call timed out after {timeout}s")
+        except Exception:
+            _record(branch, "error", started)
+            raise
+        _record(branch, "ok", started, getattr(response, "usage_metadata", None))
+        return response
+
+
+async def generate_text(prompt, model=None, timeout: float | None = None, branch: str = "general") -> str:
+    """Convenience wrapper returning the stripped response text"""
+    response = await generate_content(prompt, model=model, timeout=timeout, branch=branch)
+    return response.text.strip()
+
+
+async def stream_text(prompt, model=None, timeout: float | None = None, branch: str = "general"):
+    """Yield response text chunks as Gemini streams them; the timeout applies per chunk"""
+    model = model or gemini_model
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    async with _llm_semaphore:
+        started = time.perf_counter()
+        usage = None
+        status = "error"
+        try:
+            response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), timeout)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                # Token counts arrive with the stream (complete on the last chunk)
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. the final safety/usage chunk)
+                    continue
+                if text:
+                    yield text
+            status = "ok"
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise LLMTimeoutError(f"Gemini stream stalled for more than {timeout}s")
+        except GeneratorExit:
+            status = "cancelled"  # client disconnected mid-stream
+            raise
+        finally:
+            _record(branch, status, started, usage)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Input tokens per /ask request before and after splitting the prompt into SYSTEM_INSTRUCTION
+# plus a per-request suffix. Uses Gemini's count_tokens when GOOGLE_API_KEY works, otherwise
+# the ~4 characters/token estimate from chat_history.
+#
+#   python measure_prompt_tokens.py
+import sys
+import time
+sys.path.append('.')
+
+from chatbot_prompt import SYSTEM_INSTRUCTION, enhanced_generate_prompt, chat_model
+from chat_history import estimate_tokens
+from faq_services import gemini_model, index_manager
+
+QUERIES = [
+    "How long does it take to build an e-commerce website?",
+    "Do you offer SEO services for small businesses?",
+    "What does your UI/UX design process look like?",
+]
+
+_api = {"available": True}
+
+def _count(model, text):
+    if _api["available"]:
+        try:
+            return model.count_tokens(text, request_options={"timeout": 5}).total_tokens, "count_tokens"
+        except Exception as e:
+            print(f"count_tokens unavailable ({type(e).__name__}); estimating instead")
+            _api["available"] = False
+    # The estimate can't see the system instruction attached to a model, so add it explicitly
+    extra = SYSTEM_INSTRUCTION if model is chat_model else ""
+    return estimate_tokens(extra + text), "estimate"
+
+def measure():
+    db = index_manager.current().db
+    system_tokens, method = _count(gemini_model, SYSTEM_INSTRUCTION)
+    print(f"System instruction: {len(SYSTEM_INSTRUCTION)} chars, {system_tokens} tokens ({method})\n")
+
+    for query in QUERIES:
+        context = "\n".join(doc.page_content for doc in db.similarity_search(query, k=3))
+        suffix = enhanced_generate_prompt(context, query, "measure-user")
+        # Before: persona and rules re-rendered into every prompt
+        legacy_tokens, _ = _count(gemini_model, f"{SYSTEM_INSTRUCTION}\n\n{suffix}")
+        # After: the same tokens reach the model, but only the suffix changes per request
+        inline_tokens, _ = _count(chat_model, suffix)
+        suffix_tokens, _ = _count(gemini_model, suffix)
+        print(f"Query: {query}")
+        print(f"  before (single prompt):             {legacy_tokens} input tokens")
+        print(f"  after, system_instruction inline:   {inline_tokens} input tokens")
+        print(f"  after, with context cache:          {suffix_tokens} uncached + {system_tokens} cached tokens")
+
+    iterations = 10000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        enhanced_generate_prompt("context", "question", "measure-user")
+    elapsed = (time.perf_counter() - started) / iterations * 1e6
+    print(f"\nPer-request prompt rendering: {elapsed:.1f} µs for {len(suffix)} chars")
+
+if __name__ == "__main__":
+    measure()
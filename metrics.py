@@ -0,0 +1,149 @@
+#Basic Packages
+import math
+import threading
+
+# Minimal Prometheus-compatible metrics (counters, gauges, histograms with labels) rendered in
+# the text exposition format by render(); served on GET /metrics.
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+WEBHOOK_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown labels {sorted(unknown)}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time by `fn` (returning a value or {labels: value})"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.fn is None:
+            return super()._samples()
+        try:
+            result = self.fn()
+        except Exception as e:
+            print(f"Metric {self.name} failed: {e}")
+            return []
+        if isinstance(result, dict):
+            return [(self.name, key if isinstance(key, tuple) else (key,), (), value) for key, value in result.items()]
+        return [(self.name, (), (), result)]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, (("le", _number(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), state["sum"]))
+                samples.append((f"{self.name}_count", key, (), state["count"]))
+        return samples
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# LLM accounting, labelled by the code path that made the call
+# (intent-check, specific-service, general, summary)
+llm_requests = Counter("llm_requests_total", "Gemini calls by branch and outcome", ("branch", "status"))
+llm_latency = Histogram("llm_request_seconds", "Gemini call latency", ("branch",))
+llm_prompt_tokens = Histogram("llm_prompt_tokens", "Prompt tokens per Gemini call", ("branch",), TOKEN_BUCKETS)
+llm_output_tokens = Histogram("llm_output_tokens", "Output tokens per Gemini call", ("branch",), TOKEN_BUCKETS)
+llm_cached_tokens = Counter("llm_cached_prompt_tokens_total", "Prompt tokens served from a context cache", ("branch",))
+
+answer_cache_lookups = Counter("answer_cache_lookups_total", "Answer cache lookups", ("branch", "result"))
+singleflight_shared = Counter("singleflight_shared_total", "Requests answered by another request's generation", ("scope",))
+telegram_messages = Counter("telegram_messages_total", "Outgoing Telegram messages by outcome", ("status",))
+telegram_webhook_seconds = Histogram("telegram_webhook_seconds", "Telegram webhook processing time", ("via",), WEBHOOK_BUCKETS)
+chat_requests = Histogram("chat_request_seconds", "End-to-end chat request latency", ("endpoint", "route"))
@@ -0,0 +1,145 @@
+#Basic Packages
+import os
+import time
+import asyncio
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+
+# Shared async Redis access: one connection pool per process, with a circuit breaker so an
+# outage fails over to the in-memory fallbacks immediately instead of waiting out a socket
+# timeout on every request.
+load_dotenv()
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", "3"))
+REDIS_BREAKER_RESET_SECONDS = float(os.getenv("REDIS_BREAKER_RESET_SECONDS", "30"))
+
+
+class RedisUnavailable(Exception):
+    """Raised instead of calling Redis while it is not configured or the circuit is open"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; once `reset_seconds` have passed a
+    single probe is let through (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self, failure_threshold: int = REDIS_BREAKER_FAILURES,
+                 reset_seconds: float = REDIS_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        # A failed half-open probe re-opens the circuit straight away
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give up a half-open probe without an outcome (the call was cancelled)"""
+        self._probing = False
+
+    def trip(self):
+        self.failures = max(self.failures, self.failure_threshold)
+        self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class AsyncRedis:
+    """redis.asyncio client on a shared connection pool, guarded by a CircuitBreaker"""
+
+    def __init__(self, url: str = REDIS_URL, max_connections: int = REDIS_MAX_CONNECTIONS,
+                 socket_timeout: float = REDIS_SOCKET_TIMEOUT, breaker: CircuitBreaker = None):
+        self.breaker = breaker or CircuitBreaker()
+        self.client = None
+        if url:
+            # Upstash often needs TLS (rediss://). from_url handles it.
+            pool = aioredis.ConnectionPool.from_url(
+                url,
+                decode_responses=True,
+                max_connections=max_connections,
+                socket_connect_timeout=socket_timeout,
+                socket_timeout=socket_timeout,
+                retry_on_timeout=True,
+                health_check_interval=30,
+            )
+            self.client = aioredis.Redis(connection_pool=pool)
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    async def run(self, operation):
+        """Return await operation(client); raises RedisUnavailable while the circuit is open"""
+        if self.client is None:
+            raise RedisUnavailable("REDIS_URL not set")
+        if not self.breaker.allow():
+            raise RedisUnavailable("Redis circuit open")
+        try:
+            result = await operation(self.client)
+        except asyncio.CancelledError:
+            # The caller went away (client disconnect, waiter.cancel()); that says nothing about
+            # Redis, so only a half-open probe is released for the next call to take
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def ping(self) -> bool:
+        """Startup check; an unreachable server opens the circuit right away"""
+        if self.client is None:
+            print("REDIS_URL not set, using in-memory history")
+            return False
+        if self.breaker.state == "open":
+            return False  # already reported
+        try:
+            await self.run(lambda client: client.ping())
+            print("Redis connected")
+            return True
+        except Exception as e:
+            print(f"Redis unavailable ({e}), using in-memory history")
+            self.breaker.trip()
+            return False
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+redis_store = AsyncRedis()
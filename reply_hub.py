@@ -0,0 +1,251 @@
+#Basic Packages
+import os
+import json
+import time
+import asyncio
+from collections import defaultdict, deque, OrderedDict
+
+#Calling Functions from other py files
+from redis_client import redis_store, RedisUnavailable
+
+# Agent relay state, shared by every worker through Redis:
+#   telegram_msg:{message_id}   -> user_id a Telegram message was sent for (expires unanswered)
+#   telegram_replies:{user_id}  -> list of agent replies waiting for the widget
+# A push publishes the user_id on REPLY_CHANNEL; each worker's subscriber wakes its local
+# waiters for that user (SSE stream, WebSocket or long-poll), so a webhook handled by one
+# worker reaches a client connected to another. Without Redis the same state lives in memory.
+REPLY_QUEUE_SIZE = 50
+REPLY_TTL_SECONDS = int(os.getenv("REPLY_TTL_SECONDS", str(24 * 3600)))
+MESSAGE_MAP_TTL_SECONDS = int(os.getenv("MESSAGE_MAP_TTL_SECONDS", str(2 * 24 * 3600)))
+MESSAGE_MAP_MAX_ENTRIES = 10000
+REPLY_POLL_SECONDS = 1.0  # re-check Redis this often while the subscriber is down
+REPLY_CHANNEL = "telegram_replies"
+REPLY_KEY_PREFIX = "telegram_replies:"
+MESSAGE_KEY_PREFIX = "telegram_msg:"
+
+
+class ReplyHub:
+    def __init__(self, redis_client=None, queue_size: int = REPLY_QUEUE_SIZE):
+        self.redis = redis_client
+        self.queue_size = queue_size
+        self.replies = defaultdict(lambda: deque(maxlen=queue_size))
+        self._messages = OrderedDict()  # in-memory message_id -> (user_id, stored_at)
+        self._waiters = defaultdict(set)
+        self._listener = None
+        self.subscribed = False
+        self.pushed = 0
+        self.delivered = 0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.enabled
+
+    async def _redis(self, operation, action: str):
+        """Run a Redis operation; raises RedisUnavailable (after logging real errors) on failure"""
+        try:
+            return await self.redis.run(operation)
+        except RedisUnavailable:
+            raise
+        except Exception as e:
+            print(f"Relay {action} failed: {e}; using fallback")
+            raise RedisUnavailable(str(e))
+
+    # message_id -> user_id correlation
+    async def remember(self, message_id, user_id: str):
+        if self._use_redis():
+            try:
+                await self._redis(
+                    lambda client: client.set(f"{MESSAGE_KEY_PREFIX}{message_id}", user_id, ex=MESSAGE_MAP_TTL_SECONDS),
+                    "message map write",
+                )
+                return
+            except RedisUnavailable:
+                pass
+        self._messages[message_id] = (user_id, time.monotonic())
+        self._prune_messages()
+
+    async def take(self, message_id):
+        """user_id the message was sent for, removing the mapping (one-shot); None if unknown"""
+        entry = self._messages.pop(message_id, None)
+        if entry is not None and time.monotonic() - entry[1] < MESSAGE_MAP_TTL_SECONDS:
+            return entry[0]
+        if self._use_redis():
+            try:
+                return await self._redis(
+                    lambda client: client.getdel(f"{MESSAGE_KEY_PREFIX}{message_id}"), "message map read"
+                )
+            except RedisUnavailable:
+                pass
+        return None
+
+    def _prune_messages(self):
+        cutoff = time.monotonic() - MESSAGE_MAP_TTL_SECONDS
+        while self._messages:
+            message_id, (_, stored_at) = next(iter(self._messages.items()))
+            if stored_at >= cutoff and len(self._messages) <= MESSAGE_MAP_MAX_ENTRIES:
+                break
+            del self._messages[message_id]
+
+    # Reply queues
+    async def push(self, user_id: str, item: dict):
+        """Queue a reply for user_id and wake its waiters on every worker"""
+        self.pushed += 1
+        if self._use_redis():
+            key = f"{REPLY_KEY_PREFIX}{user_id}"
+
+            async def _push(client):
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.rpush(key, json.dumps(item))
+                    pipe.ltrim(key, -self.queue_size, -1)
+                    pipe.expire(key, REPLY_TTL_SECONDS)
+                    pipe.publish(REPLY_CHANNEL, user_id)
+                    return await pipe.execute()
+
+            try:
+                await self._redis(_push, "reply push")
+                self._wake(user_id)
+                return
+            except RedisUnavailable:
+                pass
+        self.replies[user_id].append(item)
+        self._wake(user_id)
+
+    async def pop(self, user_id: str):
+        """Oldest queued reply for user_id, or None"""
+        item = None
+        queue = self.replies.get(user_id)
+        if queue:
+            item = queue.popleft()
+            if not queue:
+                del self.replies[user_id]
+        elif self._use_redis():
+            try:
+                raw = await self._redis(lambda client: client.lpop(f"{REPLY_KEY_PREFIX}{user_id}"), "reply read")
+                item = json.loads(raw) if raw else None
+            except RedisUnavailable:
+                pass
+        if item is not None:
+            self.delivered += 1
+        return item
+
+    async def requeue(self, user_id: str, item: dict):
+        """Put back a reply that could not be delivered, ahead of newer ones"""
+        self.delivered -= 1
+        if self._use_redis():
+            try:
+                await self._redis(lambda client: client.lpush(f"{REPLY_KEY_PREFIX}{user_id}", json.dumps(item)), "reply requeue")
+                return
+            except RedisUnavailable:
+                pass
+        self.replies[user_id].appendleft(item)
+
+    async def peek(self, user_id: str):
+        """Queued replies for user_id without removing them"""
+        items = list(self.replies.get(user_id, ()))
+        if self._use_redis():
+            try:
+                raw = await self._redis(lambda client: client.lrange(f"{REPLY_KEY_PREFIX}{user_id}", 0, -1), "reply read")
+                items.extend(json.loads(x) for x in raw)
+            except RedisUnavailable:
+                pass
+        return items
+
+    def _wake(self, user_id: str):
+        for event in self._waiters.get(user_id, ()):
+            event.set()
+
+    async def wait(self, user_id: str, timeout: float):
+        """Next reply for user_id, waiting up to timeout seconds; None on timeout"""
+        item = await self.pop(user_id)
+        if item is not None or timeout <= 0:
+            return item
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event = asyncio.Event()
+        self._waiters[user_id].add(event)
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                # Without a live subscription, pushes from other workers are only seen by polling
+                if self._use_redis() and not self.subscribed:
+                    remaining = min(remaining, REPLY_POLL_SECONDS)
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                # Another waiter for the same user may have taken it first
+                item = await self.pop(user_id)
+                if item is not None:
+                    return item
+        finally:
+            waiters = self._waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[user_id]
+
+    # Cross-worker notifications
+    def start(self):
+        """Start the pub/sub subscriber (idempotent; no-op without Redis)"""
+        if not self._use_redis() or (self._listener is not None and not self._listener.done()):
+            return
+        self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        delay = 1.0
+        reported = False
+        while True:
+            if self.redis.breaker.state == "open":
+                await asyncio.sleep(self.redis.breaker.reset_seconds)
+                continue
+            pubsub = self.redis.client.pubsub()
+            try:
+                await pubsub.subscribe(REPLY_CHANNEL)
+                self.subscribed = True
+                delay = 1.0
+                if reported:
+                    print("Relay subscriber reconnected")
+                    reported = False
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._wake(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not reported:
+                    print(f"Relay subscriber disconnected ({e}); polling Redis until it reconnects")
+                    reported = True
+            finally:
+                self.subscribed = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if self._use_redis() else "memory",
+            "subscribed": self.subscribed,
+            "local_users_with_replies": len(self.replies),
+            "local_message_map_size": len(self._messages),
+            "waiting_users": len(self._waiters),
+            "pushed": self.pushed,
+            "delivered": self.delivered,
+        }
+
+
+reply_hub = ReplyHub(redis_store)
@@ -0,0 +1,433 @@
+#Basic Packages
+import os
+import copy
+import json
+import hashlib
+import tempfile
+import threading
+from functools import lru_cache
+import numpy as np
+from scipy.sparse import vstack
+from sklearn.feature_extraction.text import CountVectorizer
+
+#Calling Functions from other py files
+from faq_store import faq_store
+
+# Hybrid retrieval: BM25 over the FAQ text fused with dense sentence embeddings through
+# reciprocal-rank fusion. Embeddings live in a flat NumPy index memory-mapped from disk and
+# keyed by FAQ id + content hash, so restarts and retrains only embed new or edited FAQs.
+# Both retrievers only nominate hits above a cosine floor, and metadata["similarity"] is the
+# best cosine of the two (comparable to SimpleFAQDB's); the fused rank score is in "rrf".
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "faq_index")
+RRF_K = 60
+DENSE_MIN_SIMILARITY = float(os.getenv("DENSE_MIN_SIMILARITY", "0.3"))
+BM25_MIN_SIMILARITY = float(os.getenv("BM25_MIN_SIMILARITY", "0.15"))
+CANDIDATES_PER_RETRIEVER = 20
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+
+class FAQDocument:
+    """Lightweight search hit with the same shape as a LangChain Document"""
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+    def __repr__(self):
+        return f"FAQDocument(id={self.metadata.get('id')!r}, similarity={self.metadata.get('similarity', 0):.3f})"
+
+
+def faq_text(prompt, response) -> str:
+    return f"{prompt} {response}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+def embedding_model_available() -> bool:
+    """True if sentence-transformers is installed and the model loads without a download"""
+    if SentenceTransformer is None:
+        return False
+    if os.path.isdir(EMBEDDING_MODEL_NAME):
+        return True
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    return isinstance(try_to_load_from_cache(EMBEDDING_MODEL_NAME, "config.json"), str)
+
+
+def get_embedding_model():
+    """The sentence-transformers model, loaded once per process (None if not installed)"""
+    global _embedding_model
+    if SentenceTransformer is None:
+        return None
+    with _embedding_model_lock:
+        if _embedding_model is None:
+            _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _embedding_model
+
+
+def embed_texts(texts):
+    return get_embedding_model().encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+@lru_cache(maxsize=2048)
+def embed_query(query: str):
+    return embed_texts([query])[0]
+
+
+class BM25Index:
+    """Okapi BM25 with document-side weights precomputed into a sparse matrix"""
+
+    def __init__(self, texts=None, k1: float = 1.5, b: float = 0.75, vectorizer=None, tf=None):
+        self.k1 = k1
+        self.b = b
+        if vectorizer is None:
+            vectorizer = CountVectorizer(stop_words="english")
+            tf = vectorizer.fit_transform(texts)
+        self.vectorizer = vectorizer
+        self.tf = tf.tocsr().astype(np.float32)
+        self.weights = self._weigh(self.tf)
+        # Row-normalized weights, for a cosine score that is comparable across queries
+        norms = np.sqrt(np.asarray(self.weights.multiply(self.weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.unit_weights = self.weights.multiply(1 / norms[:, None]).tocsr()
+
+    def _weigh(self, tf):
+        n_docs = tf.shape[0]
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if n_docs else 1.0
+        avg_len = avg_len or 1.0
+        doc_freq = np.bincount(tf.indices, minlength=tf.shape[1])
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        weights = tf.copy()
+        rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        saturation = tf.data + self.k1 * (1 - self.b + self.b * doc_len[rows] / avg_len)
+        weights.data = tf.data * (self.k1 + 1) / saturation * idf[tf.indices]
+        return weights
+
+    def append(self, texts):
+        """New index with texts added; unseen terms extend the vocabulary, existing rows are not re-tokenized"""
+        vocabulary = self.vectorizer.vocabulary_
+        analyze = self.vectorizer.build_analyzer()
+        unseen = {term for text in texts for term in analyze(text)} - vocabulary.keys()
+        vectorizer = self.vectorizer
+        if unseen:
+            vocabulary = dict(vocabulary)
+            for term in sorted(unseen):
+                vocabulary[term] = len(vocabulary)
+            vectorizer = CountVectorizer(stop_words="english", vocabulary=vocabulary)
+        old = self.tf.copy()
+        old.resize((old.shape[0], len(vocabulary)))
+        tf = vstack([old, vectorizer.transform(texts)])
+        return BM25Index(k1=self.k1, b=self.b, vectorizer=vectorizer, tf=tf)
+
+    def select(self, keep):
+        """New index with only the rows in keep (indices into this one)"""
+        return BM25Index(k1=self.k1, b=self.b, vectorizer=self.vectorizer, tf=self.tf[keep])
+
+    def query_vectors(self, queries):
+        q = self.vectorizer.transform(queries).astype(np.float32)
+        q.data[:] = 1.0  # each query term counts once
+        return q
+
+    def scores(self, queries):
+        """Dense (len(queries), n_docs) score and cosine-similarity matrices"""
+        q = self.query_vectors(queries)
+        norms = np.sqrt(np.asarray(q.sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        unit_q = q.multiply(1 / norms[:, None]).tocsr()
+        return (q @ self.weights.T).toarray(), (unit_q @ self.unit_weights.T).toarray()
+
+
+class FlatEmbeddingIndex:
+    """Normalized float32 vectors in <dir>/vectors.npy (memory-mapped) + a manifest of (id, hash)"""
+
+    def __init__(self, directory: str = EMBEDDING_INDEX_DIR, model_name: str = EMBEDDING_MODEL_NAME):
+        self.directory = directory
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            if manifest.get("model") != self.model_name or len(manifest["rows"]) != len(vectors):
+                return [], None
+            return manifest["rows"], vectors
+        except (FileNotFoundError, ValueError, KeyError):
+            return [], None
+
+    def sync(self, ids, texts):
+        """Vectors aligned with ids, embedding only rows whose (id, hash) isn't on disk yet"""
+        hashes = [content_hash(text) for text in texts]
+        wanted = [[str(faq_id), digest] for faq_id, digest in zip(ids, hashes)]
+        stored_rows, stored = self._load()
+        if stored is not None and stored_rows == wanted:
+            return stored
+
+        lookup = {tuple(row): i for i, row in enumerate(stored_rows)}
+        missing = [j for j, row in enumerate(wanted) if tuple(row) not in lookup]
+        fresh = None
+        if missing:
+            print(f"Embedding {len(missing)} new or changed FAQs ({len(wanted) - len(missing)} reused)")
+            fresh = embed_texts([texts[j] for j in missing])
+
+        dim = fresh.shape[1] if fresh is not None else stored.shape[1]
+        vectors = np.empty((len(wanted), dim), dtype=np.float32)
+        fresh_rows = {j: i for i, j in enumerate(missing)}
+        for j, row in enumerate(wanted):
+            vectors[j] = fresh[fresh_rows[j]] if j in fresh_rows else stored[lookup[tuple(row)]]
+        self.save(wanted, vectors)
+        return np.load(self.vectors_path, mmap_mode="r")
+
+    def save(self, rows, vectors):
+        """Write vectors and manifest through unique temp files + rename, so readers (and other
+        workers writing at the same time) never see a half-written index"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._replace(self.vectors_path, lambda f: np.save(f, vectors))
+        self._replace(
+            self.manifest_path,
+            lambda f: f.write(json.dumps({"model": self.model_name, "dim": int(vectors.shape[1]), "rows": rows}).encode("utf-8")),
+        )
+
+    def _replace(self, path, write):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """Fuse ranked lists of row indices: score(d) = sum(1 / (k + rank))"""
+    fused = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking):
+            fused[idx] = fused.get(idx, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _ranked(scores, minimum, limit):
+    limit = min(limit, len(scores))
+    if limit <= 0:
+        return []
+    top = np.argpartition(scores, -limit)[-limit:]
+    top = top[np.argsort(scores[top])[::-1]]
+    return [int(idx) for idx in top if scores[idx] > minimum]
+
+
+class _HybridState:
+    """Immutable snapshot of the hybrid index"""
+    __slots__ = ("rows", "ids", "keys", "page_contents", "bm25", "embeddings")
+
+    def __init__(self, rows, bm25, embeddings, keys=None):
+        self.rows = rows
+        self.ids = [row["id"] for row in rows]
+        # (id, content hash) per row, as stored in the embedding manifest
+        self.keys = keys if keys is not None else [
+            [str(row["id"]), content_hash(faq_text(row["prompt"], row["response"]))] for row in rows
+        ]
+        self.page_contents = [f"Q: {row['prompt']}\nA: {row['response']}" for row in rows]
+        self.bm25 = bm25
+        self.embeddings = embeddings
+
+
+def _faq_rows(rows):
+    return [{"id": row["id"], "prompt": row["prompt"], "response": row["response"]} for row in rows]
+
+
+class HybridFAQDB:
+    """BM25 + dense retrieval with reciprocal-rank fusion; same interface as SimpleFAQDB"""
+
+    def __init__(self, embedding_index: FlatEmbeddingIndex | None = None, dense: bool | None = None):
+        self.embedding_index = embedding_index or FlatEmbeddingIndex()
+        self.dense_enabled = SentenceTransformer is not None if dense is None else dense
+        if not self.dense_enabled:
+            print("Dense embeddings disabled; hybrid retrieval runs BM25 only")
+        self._state = _HybridState([], None, None)
+        self._write_lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._persisting = [None]  # latest state queued for disk, shared with forks
+        self._persister = None
+        self.load_faqs()
+
+    def fork(self):
+        """New engine on this one's state; edits to either leave the other untouched"""
+        db = copy.copy(self)
+        db._write_lock = threading.Lock()
+        db._persister = None
+        return db
+
+    def _disable_dense(self, e):
+        # Model download/load failed: keep serving BM25 rather than an empty index
+        print(f"Dense embeddings unavailable ({e}); hybrid retrieval runs BM25 only")
+        self.dense_enabled = False
+
+    def _build(self, rows):
+        rows = _faq_rows(rows)
+        if not rows:
+            return _HybridState([], None, None)
+        ids = [row["id"] for row in rows]
+        texts = [faq_text(row["prompt"], row["response"]) for row in rows]
+        try:
+            bm25 = BM25Index(texts)
+        except ValueError:
+            bm25 = None  # every text was stop words
+        embeddings = None
+        if self.dense_enabled:
+            try:
+                embeddings = self.embedding_index.sync(ids, texts)
+            except Exception as e:
+                self._disable_dense(e)
+        return _HybridState(rows, bm25, embeddings)
+
+    def _persist(self, state):
+        """Write state's embeddings to disk in the background; skipped if a newer state replaced it"""
+        self._persisting[0] = state
+
+        def _write():
+            with self._persist_lock:
+                if state is not self._persisting[0]:
+                    return
+                try:
+                    self.embedding_index.save(state.keys, np.asarray(state.embeddings))
+                except Exception as e:
+                    print(f"Error saving embedding index: {e}")
+
+        self._persister = threading.Thread(target=_write, daemon=True)
+        self._persister.start()
+
+    def load_faqs(self):
+        """Load FAQs from the FAQ store, reusing persisted embeddings for unchanged rows"""
+        try:
+            rows = faq_store.all()
+            state = self._build(rows)
+            with self._write_lock:
+                self._state = state
+            print(f"Loaded {len(rows)} FAQs into hybrid retrieval index")
+        except Exception as e:
+            print(f"Error loading FAQs: {e}")
+
+    def add_faqs(self, rows):
+        """Append rows: only they are tokenized and embedded, and the file is rewritten in the background"""
+        rows = _faq_rows(rows)
+        if not rows:
+            return
+        texts = [faq_text(row["prompt"], row["response"]) for row in rows]
+        with self._write_lock:
+            state = self._state
+            if state.bm25 is None:
+                self._state = self._build(state.rows + rows)
+                return
+            bm25 = state.bm25.append(texts)
+            embeddings = None
+            if state.embeddings is not None and self.dense_enabled:
+                try:
+                    embeddings = np.vstack([np.asarray(state.embeddings), embed_texts(texts)])
+                except Exception as e:
+                    self._disable_dense(e)
+            keys = state.keys + [[str(row["id"]), content_hash(text)] for row, text in zip(rows, texts)]
+            self._state = _HybridState(state.rows + rows, bm25, embeddings, keys)
+            if embeddings is not None:
+                self._persist(self._state)
+
+    def remove_faqs(self, faq_ids):
+        removed = {str(faq_id) for faq_id in faq_ids}
+        with self._write_lock:
+            state = self._state
+            keep = [i for i, faq_id in enumerate(state.ids) if str(faq_id) not in removed]
+            if len(keep) == len(state.ids):
+                return 0
+            if not keep:
+                self._state = _HybridState([], None, None)
+            else:
+                bm25 = state.bm25.select(keep) if state.bm25 is not None else None
+                embeddings = np.asarray(state.embeddings)[keep] if state.embeddings is not None else None
+                self._state = _HybridState(
+                    [state.rows[i] for i in keep], bm25, embeddings, [state.keys[i] for i in keep]
+                )
+                if embeddings is not None:
+                    self._persist(self._state)
+        return len(state.ids) - len(keep)
+
+    def clear(self):
+        with self._write_lock:
+            self._state = _HybridState([], None, None)
+
+    @property
+    def doc_count(self):
+        return len(self._state.ids)
+
+    def query_vector(self, query):
+        """L2-normalized BM25 term vector, used for near-duplicate matching"""
+        state = self._state
+        if state.bm25 is None:
+            return None
+        vector = state.bm25.query_vectors([query])
+        norm = np.sqrt(vector.multiply(vector).sum())
+        return vector / norm if norm else vector
+
+    def similarity_search(self, query, k=3):
+        """Search for similar FAQs"""
+        return self.similarity_search_many([query], k)[0]
+
+    def similarity_search_many(self, queries, k=3):
+        state = self._state
+        if not state.ids or not queries:
+            return [[] for _ in queries]
+
+        try:
+            bm25_scores = bm25_similarity = dense_scores = None
+            if state.bm25 is not None:
+                bm25_scores, bm25_similarity = state.bm25.scores(queries)
+            if state.embeddings is not None:
+                query_embeddings = np.stack([embed_query(query) for query in queries])
+                dense_scores = query_embeddings @ np.asarray(state.embeddings).T
+
+            results = []
+            for i in range(len(queries)):
+                rankings = []
+                if bm25_scores is not None:
+                    # Rank by BM25, but only nominate rows whose cosine clears the floor
+                    scores = np.where(bm25_similarity[i] >= BM25_MIN_SIMILARITY, bm25_scores[i], 0.0)
+                    rankings.append(_ranked(scores, 0.0, CANDIDATES_PER_RETRIEVER))
+                if dense_scores is not None:
+                    rankings.append(_ranked(dense_scores[i], DENSE_MIN_SIMILARITY, CANDIDATES_PER_RETRIEVER))
+                docs = []
+                for idx, fused in reciprocal_rank_fusion(rankings)[:k]:
+                    metadata = {"id": state.ids[idx], "rrf": fused}
+                    similarity = 0.0
+                    if bm25_scores is not None:
+                        metadata["bm25"] = float(bm25_scores[i][idx])
+                        similarity = max(similarity, float(bm25_similarity[i][idx]))
+                    if dense_scores is not None:
+                        metadata["dense"] = float(dense_scores[i][idx])
+                        similarity = max(similarity, float(dense_scores[i][idx]))
+                    metadata["similarity"] = similarity
+                    docs.append(FAQDocument(state.page_contents[idx], metadata))
+                results.append(docs)
+            return results
+        except Exception as e:
+            print(f"Error in similarity search: {e}")
+            return [[] for _ in queries]
@@ -0,0 +1,174 @@
+#Basic Packages
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+# Per-user conversation state kept in process: the Redis-fallback history plus the greeting and
+# agent flags. Bounded by SESSION_MAX_ENTRIES (least recently used sessions are evicted first)
+# and SESSION_TTL_SECONDS, which a background sweeper enforces every SESSION_SWEEP_SECONDS.
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_SWEEP_SECONDS = int(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+# Hard cap on stored messages; chat_history normally folds older turns into the summary
+# well before this is reached.
+MAX_HISTORY = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
+
+
+class Session:
+    __slots__ = ("history", "summary", "last_seen", "greeted", "agent_active")
+
+    def __init__(self, history_len: int = MAX_HISTORY):
+        self.history = deque(maxlen=history_len)
+        self.summary = ""
+        self.last_seen = time.monotonic()
+        self.greeted = False
+        self.agent_active = False
+
+
+class SessionStore:
+    """LRU + TTL bounded map of user_id -> Session"""
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 history_len: int = MAX_HISTORY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.history_len = history_len
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, session, now):
+        return now - session.last_seen > self.ttl_seconds
+
+    def get(self, user_id, create: bool = False):
+        """Return the user's live session (refreshing its LRU position), or None"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and self._expired(session, now):
+                del self._sessions[user_id]
+                self.expirations += 1
+                session = None
+            if session is None:
+                if not create:
+                    return None
+                session = Session(self.history_len)
+                self._sessions[user_id] = session
+                while len(self._sessions) > self.max_entries:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._sessions.move_to_end(user_id)
+            session.last_seen = now
+            return session
+
+    def end(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    # History (used while Redis is unavailable)
+    def append_history(self, user_id, *items):
+        self.get(user_id, create=True).history.extend(items)
+
+    def history(self, user_id):
+        session = self.get(user_id)
+        return list(session.history) if session else []
+
+    def clear_history(self, user_id):
+        session = self.get(user_id)
+        if session:
+            session.history.clear()
+            session.summary = ""
+
+    def drop_through(self, user_id, last):
+        """Drop messages from the head up to and including `last` (nothing if it was already trimmed)"""
+        session = self.get(user_id)
+        if session and last in session.history:
+            while session.history.popleft() != last:
+                pass
+
+    def summary(self, user_id) -> str:
+        session = self.get(user_id)
+        return session.summary if session else ""
+
+    def set_summary(self, user_id, summary: str):
+        self.get(user_id, create=True).summary = summary
+
+    # Flags
+    def is_greeted(self, user_id) -> bool:
+        session = self.get(user_id)
+        return bool(session and session.greeted)
+
+    def mark_greeted(self, user_id):
+        self.get(user_id, create=True).greeted = True
+
+    def is_agent_active(self, user_id) -> bool:
+        session = self.get(user_id)
+        return bool(session and session.agent_active)
+
+    def set_agent_active(self, user_id, active: bool = True):
+        if active:
+            self.get(user_id, create=True).agent_active = True
+        else:
+            session = self.get(user_id)
+            if session:
+                session.agent_active = False
+
+    # Expiry
+    def sweep(self) -> int:
+        """Drop every expired session; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [user_id for user_id, session in self._sessions.items() if self._expired(session, now)]
+            for user_id in expired:
+                del self._sessions[user_id]
+            self.expirations += len(expired)
+        return len(expired)
+
+    async def _sweep_forever(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f"Session sweeper expired {removed} sessions")
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
+
+    def start_sweeper(self, interval: int = SESSION_SWEEP_SECONDS):
+        """Start the periodic sweeper on the running event loop (idempotent)"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval))
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "greeted": sum(1 for s in sessions if s.greeted),
+            "agent_active": sum(1 for s in sessions if s.agent_active),
+            "history_messages": sum(len(s.history) for s in sessions),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+session_store = SessionStore()
@@ -0,0 +1,147 @@
+#Basic Packages
+import os
+import time
+import uuid
+import asyncio
+
+#Calling Functions from other py files
+from metrics import singleflight_shared
+
+# Request coalescing: concurrent requests with the same key (normalized query + retrieved FAQs,
+# i.e. the answer cache key) share one generation. In-process followers await the leader's
+# future; with Redis, a SET NX lock elects one leader across workers and the others poll
+# `lookup` (the answer cache) until the leader has published its answer.
+SINGLEFLIGHT_LOCK_SECONDS = int(os.getenv("SINGLEFLIGHT_LOCK_SECONDS", "30"))
+SINGLEFLIGHT_POLL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_SECONDS", "0.2"))
+LOCK_KEY_PREFIX = "singleflight:"
+# Result handed to followers when the leader was cancelled (e.g. its client disconnected);
+# they retry instead of inheriting the cancellation
+_ABANDONED = object()
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _consume_exception(future):
+    # Nobody may be waiting on a failed flight; don't log "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    def __init__(self, redis_client=None, lock_seconds: int = SINGLEFLIGHT_LOCK_SECONDS,
+                 poll_seconds: float = SINGLEFLIGHT_POLL_SECONDS):
+        self.redis = redis_client
+        self.lock_seconds = lock_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight = {}
+
+    # In-process primitives (also used by the streaming endpoint)
+    def join(self, key):
+        """The in-flight future for key, or None"""
+        return self._inflight.get(key)
+
+    async def wait(self, key):
+        """Result of the in-flight generation for key; None if there is none or its leader went away.
+        A generation that failed with an Exception re-raises it here."""
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        result = await asyncio.shield(future)
+        if result is _ABANDONED:
+            return None
+        singleflight_shared.inc(scope="local")
+        return result
+
+    def begin(self, key):
+        """Register the caller as the leader for key; returns None if a flight already exists"""
+        if key in self._inflight:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._inflight[key] = future
+        return future
+
+    def end(self, key, future, result=None, error: BaseException = None):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if future.done():
+            return
+        if error is not None and not isinstance(error, Exception):
+            # Cancellation / disconnect is the leader's own business, not a failed generation
+            future.set_result(_ABANDONED)
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # Cross-worker lock
+    async def _acquire(self, key, token):
+        if self.redis is None or not self.redis.enabled:
+            return True
+        try:
+            acquired = await self.redis.run(
+                lambda client: client.set(f"{LOCK_KEY_PREFIX}{key}", token, nx=True, ex=self.lock_seconds)
+            )
+            return bool(acquired)
+        except Exception:
+            return True  # Redis down: coalesce in-process only
+
+    async def _release(self, key, token):
+        if self.redis is None or not self.redis.enabled:
+            return
+        try:
+            await self.redis.run(lambda client: client.eval(_RELEASE_SCRIPT, 1, f"{LOCK_KEY_PREFIX}{key}", token))
+        except Exception:
+            pass
+
+    async def _wait_for_remote(self, key, lookup):
+        """Poll lookup() while another worker holds the lock; None if it gave up without a result"""
+        deadline = time.monotonic() + self.lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_seconds)
+            result = await lookup()
+            if result is not None:
+                singleflight_shared.inc(scope="remote")
+                return result
+            try:
+                held = await self.redis.run(lambda client: client.exists(f"{LOCK_KEY_PREFIX}{key}"))
+            except Exception:
+                return None
+            if not held:
+                return await lookup()
+        return None
+
+    async def do(self, key, fn, lookup=None):
+        """Run `await fn()` once per key across concurrent callers; returns (result, shared)"""
+        # Follow an in-flight generation; if its leader goes away, the first follower to wake leads
+        while key in self._inflight:
+            result = await self.wait(key)
+            if result is not None:
+                return result, True
+
+        future = self.begin(key)
+        try:
+            token = uuid.uuid4().hex
+            if lookup is not None and not await self._acquire(key, token):
+                result = await self._wait_for_remote(key, lookup)
+                if result is not None:
+                    self.end(key, future, result)
+                    return result, True
+                # The other worker failed or timed out; generate here
+            try:
+                result = await fn()
+            finally:
+                await self._release(key, token)
+        except BaseException as e:
+            self.end(key, future, error=e)
+            raise
+        self.end(key, future, result)
+        return result, False
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight)}
@@ -1,246 +1,274 @@
 #Basic Packages
 import os
-import requests
 import re
 import time
+import json
+import asyncio
 from dotenv import load_dotenv
-from collections import defaultdict, deque
 
 # FastAPI Packages
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, Request, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+#Calling Functions from other py files
+from telegram_client import telegram_client, TelegramAPIError, escape_markdown
+from reply_hub import reply_hub
+from metrics import telegram_webhook_seconds
+from app_logging import get_logger
 
 load_dotenv()
 router = APIRouter()
 
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 AGENT_CHAT_ID = int(-1002796640614)  #Group Chat ID starts with -100, Normal chat ID starts with Normal ID
-TELEGRAM_API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 
-# Temporary in-memory reply store
-user_replies = defaultdict(lambda: deque(maxlen=50))
-pending_requests = {}
+# Per-update logs are sampled (WEBHOOK_LOG_SAMPLE_RATE) and written off the event loop
+webhook_log = get_logger("telegram.webhook", float(os.getenv("WEBHOOK_LOG_SAMPLE_RATE", "0.1")))
+
+# Relay state (message_id -> user_id, per-user reply queues) lives in the reply hub:
+# Redis when configured, so any worker can handle the webhook, otherwise in memory
 last_user_tagged = None
-message_map = {}
 
+@router.on_event("startup")
+async def start_telegram_sender():
+    telegram_client.start()
+    reply_hub.start()
+
+@router.on_event("shutdown")
+async def stop_telegram_sender():
+    await reply_hub.stop()
+    await telegram_client.stop()
 
 # Send message to Telegram agent with user tag
+# Queued for the background sender; returns False only if the queue is full
 def send_to_telegram(message: str, user_id: str = "anonymous") -> bool:
-    try:
-        tag = f"[USER:{user_id}]"
-        full_message = (
-            "👤 New user message\n"
-            f"{tag}\n\n"
-            f"{message}\n\n"
-            f"↩️ Agents: Please REPLY to this message (or include {tag} in your reply)."
-        )
-        payload = {
-            "chat_id": int(AGENT_CHAT_ID),
-            "text": full_message,
-            "disable_web_page_preview": True,
-        }
-        url = f"{TELEGRAM_API_BASE}/sendMessage"
-        resp = requests.post(url, json=payload, timeout=10)
-
-        print("Sending to Telegram group...")
-        print("Payload:", payload)
-        print("Telegram response:", resp.status_code, resp.text)
-
-        if not resp.ok:
-            return False
-
-        # store message_id -> user_id for robust correlation
-        data = resp.json()
-        msg_id = (data.get("result") or {}).get("message_id")
-        if msg_id is not None:
-            message_map[msg_id] = user_id
-        return True
+    tag = f"[USER:{user_id}]"
+    full_message = (
+        "👤 New user message\n"
+        f"{tag}\n\n"
+        f"{message}\n\n"
+        f"↩️ Agents: Please REPLY to this message (or include {tag} in your reply)."
+    )
 
-    except Exception as e:
-        print("Error in send_to_telegram:", str(e))
-        return False
+    # store message_id -> user_id for robust correlation once Telegram accepts it
+    async def remember(msg_id):
+        await reply_hub.remember(msg_id, user_id)
+
+    # Consecutive messages from the same user may be sent as one
+    return telegram_client.enqueue(int(AGENT_CHAT_ID), full_message, group=f"user:{user_id}", on_sent=remember)
 
 # Send callback request notification to Telegram
 def send_callback_to_telegram(callback_data: dict) -> bool:
-    try:
-        # Format the callback request message
-        phone = callback_data.get('phone', 'N/A')
-        # Create clickable phone number if valid
-        phone_display = f"[{phone}](tel:{phone.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')})" if phone != 'N/A' else 'N/A'
-        
-        message = (
-            "📞 *NEW CALLBACK REQUEST*\n"
-            "═══════════════════════\n\n"
-            f"👤 *Name:* {callback_data.get('name', 'N/A')}\n"
-            f"📱 *Phone:* {phone_display}\n"
-            f"⏰ *Preferred Time:* {callback_data.get('preferred_time', 'Any time')}\n"
-            f"💬 *Message:* {callback_data.get('message', 'No message provided')}\n"
-            f"🆔 *Reference ID:* {callback_data.get('reference_id', 'N/A')}\n"
-            f"📅 *Timestamp:* {callback_data.get('timestamp', 'N/A')}\n\n"
-            "🔔 *Please call this customer back as soon as possible!*"
-        )
-        
-        payload = {
-            "chat_id": int(AGENT_CHAT_ID),
-            "text": message,
-            "disable_web_page_preview": True,
-            "parse_mode": "Markdown"  # Enable markdown formatting
-        }
-        
-        url = f"{TELEGRAM_API_BASE}/sendMessage"
-        resp = requests.post(url, json=payload, timeout=10)
-
-        print("Sending callback request to Telegram...")
-        print("Payload:", payload)
-        print("Telegram response:", resp.status_code, resp.text)
-
-        return resp.ok
-
-    except Exception as e:
-        print("Error in send_callback_to_telegram:", str(e))
-        return False
+    # Format the callback request message; user-supplied fields are escaped so they cannot break the Markdown
+    phone = str(callback_data.get('phone', 'N/A'))
+    # Create clickable phone number if valid
+    phone_digits = re.sub(r"[^\d+]", "", phone)
+    phone_display = f"[{escape_markdown(phone)}](tel:{phone_digits})" if phone != 'N/A' and phone_digits else escape_markdown(phone)
+
+    message = (
+        "📞 *NEW CALLBACK REQUEST*\n"
+        "═══════════════════════\n\n"
+        f"👤 *Name:* {escape_markdown(callback_data.get('name', 'N/A'))}\n"
+        f"📱 *Phone:* {phone_display}\n"
+        f"⏰ *Preferred Time:* {escape_markdown(callback_data.get('preferred_time', 'Any time'))}\n"
+        f"💬 *Message:* {escape_markdown(callback_data.get('message', 'No message provided'))}\n"
+        f"🆔 *Reference ID:* {escape_markdown(callback_data.get('reference_id', 'N/A'))}\n"
+        f"📅 *Timestamp:* {escape_markdown(callback_data.get('timestamp', 'N/A'))}\n\n"
+        "🔔 *Please call this customer back as soon as possible!*"
+    )
+
+    # A burst of callback requests is delivered as one Markdown message
+    return telegram_client.enqueue(int(AGENT_CHAT_ID), message, parse_mode="Markdown", group="callbacks")
+
+# Precompiled once; matches the tag and the whitespace after it so one pass extracts and strips it
+USER_TAG_RE = re.compile(r"\[USER:(.+?)\]\s*")
+UPDATE_KINDS = ("message", "edited_message", "channel_post", "edited_channel_post")
 
 def _extract_user_tag(text: str) -> str | None:
     if not text:
         return None
-    m = re.search(r"\[USER:(.+?)\]", text)
+    m = USER_TAG_RE.search(text)
     return m.group(1).strip() if m else None
 
 def _select_update_payload(data: dict) -> dict | None:
-    return (data.get("message")
-            or data.get("edited_message")
-            or data.get("channel_post")
-            or data.get("edited_channel_post"))
+    for kind in UPDATE_KINDS:
+        msg = data.get(kind)
+        if msg:
+            return msg
+    return None
+
+def _sender_name(msg: dict) -> str:
+    sender = msg.get("from") or {}
+    return sender.get("username") or sender.get("first_name") or "agent"
+
+async def _correlate(msg: dict, text: str):
+    """(via, user_id, reply text) for an agent message, or (None, None, None); O(1) lookups only"""
+    rt = msg.get("reply_to_message")
+    if rt:
+        # Reply to the bot's message: message_id -> user_id (one-shot map)
+        user_id = await reply_hub.take(rt.get("message_id"))
+        if user_id:
+            return "reply_to_id", user_id, text.strip()
+        # fallback: the user tag in the original text
+        user_id = _extract_user_tag(rt.get("text") or rt.get("caption"))
+        if user_id:
+            return "reply_to_text", user_id, text.strip()
 
-def _extract_user_tag(text: str):
-    if not text:
-        return None
-    m = re.search(r"\[USER:(.+?)\]", text)
-    return m.group(1).strip() if m else None
+    # Last resort: allow inline [USER:...] in the agent's own message
+    m = USER_TAG_RE.search(text)
+    if m:
+        return "inline_tag", m.group(1).strip(), USER_TAG_RE.sub("", text).strip()
+    return None, None, None
 
 @router.post("/telegram/webhook")
 async def telegram_webhook(request: Request):
+    started = time.perf_counter()
+    via = "error"
     try:
         data = await request.json()
-        msg = (
-            data.get("message")
-            or data.get("edited_message")
-            or data.get("channel_post")
-            or data.get("edited_channel_post")
-        )
+        msg = _select_update_payload(data)
         if not msg:
+            via = "ignored"
             return {"status": "ignored", "reason": "no usable message"}
 
         text = msg.get("text") or msg.get("caption") or ""
-
-        # Debug: print the full incoming Telegram update
-        print("[webhook] Incoming Telegram update:", msg)
-        print("[webhook] Current message_map:", message_map)
-        print("[webhook] Current user_replies:", {k: list(v) for k, v in user_replies.items()})
-
-        from_user = (msg.get("from") or {}).get("username") \
-                    or (msg.get("from") or {}).get("first_name") \
-                    or "agent"
-
-        rt = msg.get("reply_to_message")
-        if rt:
-            print("[webhook] Found reply_to_message:", rt)
-            reply_to_id = rt.get("message_id")
-            print("[webhook] reply_to_id:", reply_to_id)
-            if reply_to_id in message_map:
-                user_id = message_map.pop(reply_to_id)  # one-shot map
-                print(f"[webhook] Matched reply_to_id in message_map: {reply_to_id} -> {user_id}")
-                # QUEUE the reply instead of overwriting
-                user_replies[user_id].append({
-                    "reply": text.strip(),
-                    "from": from_user,
-                    "ts": time.time(),
-                })
-                print(f"[webhook] matched via reply_to_id -> {user_id}")
-                return {"status": "ok", "via": "reply_to_id", "user_id": user_id}
-
-            # fallback: try user tag in the original text
-            orig = rt.get("text") or rt.get("caption") or ""
-            print("[webhook] fallback: original text for user tag:", orig)
-            user_id = _extract_user_tag(orig)
-            if user_id:
-                print(f"[webhook] Matched user tag in reply_to_message text: {user_id}")
-                user_replies[user_id].append({
-                    "reply": text.strip(),
-                    "from": from_user,
-                    "ts": time.time(),
-                })
-                print(f"[webhook] matched via reply_to_text -> {user_id}")
-                return {"status": "ok", "via": "reply_to_text", "user_id": user_id}
-
-        # Last resort: allow inline [USER:...] in the agent's own message
-        user_id = _extract_user_tag(text)
-        if user_id:
-            print(f"[webhook] Matched inline user tag in agent message: {user_id}")
-            clean = re.sub(r"\[USER:.+?\]\s*", "", text).strip()
-            user_replies[user_id].append({
-                "reply": clean,
-                "from": from_user,
-                "ts": time.time(),
-            })
-            print(f"[webhook] matched via inline_tag -> {user_id}")
-            return {"status": "ok", "via": "inline_tag", "user_id": user_id}
-
-        print("[webhook] ignored: no correlation")
-        return {"status": "ignored", "reason": "no correlation"}
+        via, user_id, reply = await _correlate(msg, text)
+        if user_id is None:
+            via = "ignored"
+            webhook_log.info("ignored reason=no_correlation update_id=%s", data.get("update_id"))
+            return {"status": "ignored", "reason": "no correlation"}
+
+        # QUEUE the reply instead of overwriting
+        await reply_hub.push(user_id, {
+            "reply": reply,
+            "from": _sender_name(msg),
+            "ts": time.time(),
+        })
+        webhook_log.info("matched via=%s user_id=%s update_id=%s", via, user_id, data.get("update_id"))
+        return {"status": "ok", "via": via, "user_id": user_id}
 
     except Exception as e:
-        print("Webhook error:", repr(e))
+        via = "error"
+        webhook_log.warning("error=%r", e)
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        telegram_webhook_seconds.observe(time.perf_counter() - started, via=via)
 
 
 
 # Sending message to agent
+REPLY_MAX_WAIT_SECONDS = 30
+STREAM_KEEPALIVE_SECONDS = 15
+
+def _reply_payload(item):
+    if item is None:
+        return {"from_agent": False, "message": None}
+    return {
+        "from_agent": True,
+        "message": item["reply"],
+        "agent": item["from"]
+    }
+
+# With ?wait=N the request is held open (long-poll) until a reply arrives or N seconds pass
 @router.get("/telegram/reply/{user_id}")
-def get_agent_reply(user_id: str):
-    q = user_replies.get(user_id)
-    if q and len(q):
-        item = q.popleft()  # FIFO
-        return {
-            "from_agent": True,
-            "message": item["reply"],
-            "agent": item["from"]
-        }
-    return {"from_agent": False, "message": None}
+async def get_agent_reply(user_id: str, wait: float = Query(0, ge=0, le=REPLY_MAX_WAIT_SECONDS)):
+    return _reply_payload(await reply_hub.wait(user_id, wait))
+
+# Push channel (Server-Sent Events): a "reply" event per agent reply, comments as keep-alives.
+# A reply counts as delivered once the stream resumes after yielding it (the write finished);
+# if the client goes away first it is put back at the front of the queue.
+@router.get("/telegram/stream/{user_id}")
+async def stream_agent_replies(user_id: str, request: Request):
+    async def event_stream():
+        while not await request.is_disconnected():
+            item = await reply_hub.wait(user_id, STREAM_KEEPALIVE_SECONDS)
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            delivered = False
+            try:
+                yield f"event: reply\ndata: {json.dumps(_reply_payload(item), ensure_ascii=False)}\n\n"
+                delivered = True
+            finally:
+                if not delivered:
+                    await asyncio.shield(reply_hub.requeue(user_id, item))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Push channel (WebSocket): each agent reply is sent as a JSON message
+@router.websocket("/telegram/ws/{user_id}")
+async def agent_reply_socket(websocket: WebSocket, user_id: str):
+    await websocket.accept()
+
+    async def _until_disconnected():
+        # The client never needs to send anything; other frames (pings, stray text) are ignored
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    closed = asyncio.ensure_future(_until_disconnected())
+    try:
+        while True:
+            waiter = asyncio.ensure_future(reply_hub.wait(user_id, STREAM_KEEPALIVE_SECONDS))
+            done, _ = await asyncio.wait({waiter, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed in done:
+                waiter.cancel()
+                # A reply popped at the same moment goes back to the front of the queue
+                if not waiter.cancelled() and waiter.done() and waiter.result() is not None:
+                    await reply_hub.requeue(user_id, waiter.result())
+                break
+            item = waiter.result()
+            if item is not None:
+                try:
+                    await websocket.send_json(_reply_payload(item))
+                except Exception:
+                    await reply_hub.requeue(user_id, item)
+                    raise
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
 
 
 # Optional: Ping route to test
 @router.get("/telegram/test")
-def test_send():
+async def test_send():
     payload = {
         "chat_id": AGENT_CHAT_ID,
         "text": "This is a test message from your FastAPI bot"
     }
 
-    url = f"{TELEGRAM_API_BASE}/sendMessage"
-    response = requests.post(url, json=payload)
+    try:
+        response = await telegram_client.call("sendMessage", payload)
+    except TelegramAPIError as e:
+        return JSONResponse(status_code=502, content={"status": "error", "response": str(e)})
 
     print("Payload:", payload)
-    print("Status:", response.status_code)
-    print("Telegram response:", response.text)
+    print("Telegram response:", response)
 
     return JSONResponse(content={
-        "status": response.status_code,
-        "response": response.json()
+        "status": 200,
+        "response": response
     })
 
 @router.get("/telegram/health")
-def telegram_health():
-    return {
-      "getMe": requests.get(f"{TELEGRAM_API_BASE}/getMe", timeout=10).json(),
-      "webhook": requests.get(f"{TELEGRAM_API_BASE}/getWebhookInfo", timeout=10).json()
-    }
+async def telegram_health():
+    async def _get(method):
+        try:
+            return await telegram_client.call(method, http_method="GET")
+        except TelegramAPIError as e:
+            return {"ok": False, "description": str(e)}
+    get_me, webhook = await asyncio.gather(_get("getMe"), _get("getWebhookInfo"))
+    return {"getMe": get_me, "webhook": webhook, "sender": telegram_client.stats()}
 
 @router.get("/telegram/debug/state")
 def tg_state():
-    return {"message_map_size": len(message_map), "user_replies_size": len(user_replies)}
+    return {"relay": reply_hub.stats(), "sender": telegram_client.stats()}
 
 @router.get("/telegram/debug/user/{user_id}")
-def tg_user(user_id: str):
-    return {"stored": user_replies.get(user_id)}
\ No newline at end of file
+async def tg_user(user_id: str):
+    return {"stored": await reply_hub.peek(user_id)}
\ No newline at end of file
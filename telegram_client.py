@@ -0,0 +1,269 @@
+#Basic Packages
+import os
+import time
+import asyncio
+import inspect
+from collections import deque
+import httpx
+from dotenv import load_dotenv
+
+#Calling Functions from other py files
+from metrics import telegram_messages
+
+load_dotenv()
+
+# Async Telegram Bot API client. One pooled httpx.AsyncClient is shared by every call, and
+# outgoing messages go through a queue, so endpoints only enqueue. A dispatcher hands each
+# message to a per-chat sender task, so one chat's rate-limit backoff never holds up another.
+# Senders space messages per chat (Telegram allows ~1/s in a private chat, ~20/min in a group
+# and ~30/s overall), retry 429 and 5xx with backoff, and merge a burst of queued messages for
+# the same chat into one sendMessage while they wait for the next slot. If Telegram rejects a
+# merged message, its parts are sent one by one, and a message whose Markdown does not parse
+# is sent again as plain text.
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+TELEGRAM_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", "10"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "4"))
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+GLOBAL_INTERVAL = 1 / 30
+MAX_MESSAGE_LENGTH = 4096
+BATCH_SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+
+
+class TelegramAPIError(Exception):
+    """Raised when the Bot API rejects a call or keeps failing after retries"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code  # set when Telegram rejected the call (4xx other than 429)
+
+
+def escape_markdown(text) -> str:
+    """Escape user-supplied text for parse_mode="Markdown" (the legacy Markdown entities)"""
+    text = str(text)
+    for char in ("_", "*", "`", "["):
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+class OutgoingMessage:
+    __slots__ = ("chat_id", "text", "parse_mode", "group", "on_sent")
+
+    def __init__(self, chat_id, text: str, parse_mode=None, group=None, on_sent=None):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.group = group  # messages with the same group may be merged into one
+        self.on_sent = on_sent  # called (or awaited) with the Telegram message_id once delivered
+
+    def can_merge(self, other) -> bool:
+        return (
+            self.group is not None
+            and (self.chat_id, self.parse_mode, self.group) == (other.chat_id, other.parse_mode, other.group)
+            and len(self.text) + len(BATCH_SEPARATOR) + len(other.text) <= MAX_MESSAGE_LENGTH
+        )
+
+
+class TelegramClient:
+    def __init__(self, api_base: str = TELEGRAM_API_BASE, timeout: float = TELEGRAM_TIMEOUT_SECONDS,
+                 max_retries: int = TELEGRAM_MAX_RETRIES, queue_size: int = TELEGRAM_QUEUE_SIZE):
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self._http = None
+        self._queue = None
+        self._worker = None
+        self._pending = {}  # chat_id -> deque of messages waiting for that chat's sender
+        self._senders = {}  # chat_id -> sender task
+        self._next_send = {}  # chat_id -> earliest monotonic time for the next message
+        self._next_global = 0.0
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.api_base,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._http
+
+    async def call(self, method: str, payload: dict = None, http_method: str = "POST") -> dict:
+        """Call a Bot API method, retrying 429 (after retry_after) and 5xx/network errors with backoff"""
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            try:
+                if http_method == "GET":
+                    resp = await self._client().get(f"/{method}", params=payload)
+                else:
+                    resp = await self._client().post(f"/{method}", json=payload)
+            except httpx.HTTPError as e:
+                error = TelegramAPIError(f"{method} failed: {e!r}")
+                wait = delay
+            else:
+                try:
+                    data = resp.json()
+                except ValueError:
+                    data = {"ok": False, "description": resp.text}
+                if resp.status_code == 429:
+                    wait = float((data.get("parameters") or {}).get("retry_after", delay))
+                    if payload and "chat_id" in payload:
+                        self._next_send[payload["chat_id"]] = time.monotonic() + wait
+                    error = TelegramAPIError(f"{method} rate limited for {wait}s")
+                elif resp.status_code >= 500:
+                    wait = delay
+                    error = TelegramAPIError(f"{method} failed: {resp.status_code} {data.get('description')}")
+                elif not data.get("ok"):
+                    raise TelegramAPIError(f"{method} rejected: {resp.status_code} {data.get('description')}", resp.status_code)
+                else:
+                    return data
+            if attempt == self.max_retries:
+                raise error
+            print(f"Telegram {error}; retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, 30)
+
+    # Outbound queue
+    def start(self):
+        """Start the send worker (idempotent)"""
+        if self._worker is not None and not self._worker.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Flush queued messages (up to drain_timeout), stop the worker and close the HTTP pool"""
+        if self._worker is not None:
+            if self._queue is not None and not self._queue.empty():
+                try:
+                    await asyncio.wait_for(self._queue.join(), drain_timeout)
+                except asyncio.TimeoutError:
+                    print(f"Telegram queue not drained; {self.stats()['queued']} messages dropped")
+            tasks = [self._worker, *self._senders.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._worker = None
+            self._senders.clear()
+            self._pending.clear()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def enqueue(self, chat_id, text: str, parse_mode=None, group=None, on_sent=None) -> bool:
+        """Queue a message for delivery; returns False if the queue is full"""
+        self.start()
+        try:
+            self._queue.put_nowait(OutgoingMessage(chat_id, text, parse_mode, group, on_sent))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            telegram_messages.inc(status="dropped")
+            print("Telegram queue full; message dropped")
+            return False
+
+    def _interval(self, chat_id) -> float:
+        return GROUP_CHAT_INTERVAL if int(chat_id) < 0 else PRIVATE_CHAT_INTERVAL
+
+    async def _wait_for_slot(self, chat_id):
+        wait = self._next_send.get(chat_id, 0.0) - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        # Reserve the next global slot; no await between reading and advancing it
+        now = time.monotonic()
+        slot = max(now, self._next_global)
+        self._next_global = slot + GLOBAL_INTERVAL
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _run(self):
+        """Dispatch queued messages to their chat's sender, starting one if it is idle"""
+        while True:
+            item = await self._queue.get()
+            self._pending.setdefault(item.chat_id, deque()).append(item)
+            if item.chat_id not in self._senders:
+                self._senders[item.chat_id] = asyncio.get_running_loop().create_task(self._run_chat(item.chat_id))
+
+    async def _run_chat(self, chat_id):
+        pending = self._pending[chat_id]
+        try:
+            while pending:
+                await self._wait_for_slot(chat_id)
+                # Fold the burst that queued up meanwhile into one message, keeping order
+                batch = [pending.popleft()]
+                while pending and batch[-1].can_merge(pending[0]):
+                    batch.append(pending.popleft())
+                try:
+                    await self._send(batch)
+                except Exception as e:
+                    print(f"Telegram worker error: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            # Nothing can be dispatched between the last check and here (no await)
+            if not pending:
+                self._pending.pop(chat_id, None)
+                self._senders.pop(chat_id, None)
+
+    async def _deliver(self, head, text: str, plain_fallback: bool):
+        payload = {"chat_id": head.chat_id, "text": text, "disable_web_page_preview": True}
+        if head.parse_mode:
+            payload["parse_mode"] = head.parse_mode
+        self._next_send[head.chat_id] = time.monotonic() + self._interval(head.chat_id)
+        try:
+            return await self.call("sendMessage", payload)
+        except TelegramAPIError as e:
+            if e.status_code != 400 or not head.parse_mode or not plain_fallback:
+                raise
+            # Usually entities that do not parse: deliver the text as it is rather than lose it
+            print(f"Telegram rejected {head.parse_mode} ({e}); sending as plain text")
+            del payload["parse_mode"]
+            return await self.call("sendMessage", payload)
+
+    async def _send(self, batch):
+        try:
+            # A merged batch is split on rejection (below); only single messages fall back to plain text
+            data = await self._deliver(batch[0], BATCH_SEPARATOR.join(item.text for item in batch), len(batch) == 1)
+        except Exception as e:
+            if isinstance(e, TelegramAPIError) and e.status_code == 400 and len(batch) > 1:
+                # One bad message must not sink the others merged with it
+                print(f"Telegram rejected a merged message ({e}); sending its {len(batch)} parts one by one")
+                for i, item in enumerate(batch):
+                    if i:
+                        await self._wait_for_slot(item.chat_id)
+                    await self._send([item])
+                return
+            self.failed += len(batch)
+            telegram_messages.inc(len(batch), status="failed")
+            print(f"Telegram send failed: {e}")
+            return
+        self.sent += len(batch)
+        self.merged += len(batch) - 1
+        telegram_messages.inc(len(batch), status="sent")
+        message_id = (data.get("result") or {}).get("message_id")
+        for item in batch:
+            if item.on_sent is not None and message_id is not None:
+                result = item.on_sent(message_id)
+                if inspect.isawaitable(result):
+                    await result
+
+    def stats(self) -> dict:
+        return {
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + sum(map(len, self._pending.values())),
+            "active_chats": len(self._senders),
+            "sent": self.sent,
+            "merged": self.merged,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+telegram_client = TelegramClient()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+# Test script for the answer cache (in-memory backend), including near-duplicate matching
+import sys
+import asyncio
+sys.path.append('.')
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from answer_cache import AnswerCache, make_cache_key
+from redis_client import AsyncRedis, CircuitBreaker
+
+QUESTIONS = [
+    "How long does it take to build an e-commerce website?",
+    "how long does it take to build an ecommerce website",
+    "Do you offer SEO services?",
+]
+
+def _vectors(texts, corpus):
+    vectorizer = TfidfVectorizer().fit(corpus)
+    return [vectorizer.transform([text]) for text in texts]
+
+class FakeRedisClient:
+    """Dict-backed stand-in for the redis.asyncio calls the answer cache makes"""
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("down")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+
+    async def scan_iter(self, match=None, count=None):
+        self._check()
+        for key in list(self.data):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+    async def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.data.pop(key, None)
+
+def test_exact_hit_and_invalidate():
+    print("Testing exact hits and invalidation...")
+    cache = AnswerCache()
+    key = make_cache_key("What is SEO?", [1, 2])
+    assert key == make_cache_key("  what is SEO ", [2, 1])
+
+    async def run():
+        assert await cache.get(key, faq_ids=[1, 2]) is None
+        await cache.set(key, "Search engine optimisation.", 1.5, faq_ids=[1, 2])
+        assert await cache.get(key, faq_ids=[1, 2]) == "Search engine optimisation."
+        await cache.invalidate()
+        assert await cache.get(key, faq_ids=[1, 2]) is None
+
+    asyncio.run(run())
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["saved_latency_seconds"] == 1.5
+    print("✅ Exact hit: SUCCESS")
+
+def test_near_duplicate():
+    print("Testing near-duplicate questions...")
+    cache = AnswerCache(near_dup_threshold=0.5)
+    stored, similar, unrelated = _vectors(QUESTIONS, QUESTIONS)
+
+    async def run():
+        await cache.set(make_cache_key(QUESTIONS[0], [7]), "4-8 weeks.", 2.0, faq_ids=[7],
+                        query_vector=stored, index_version=1)
+        near = await cache.get(make_cache_key(QUESTIONS[1], [7]), faq_ids=[7], query_vector=similar, index_version=1)
+        other = await cache.get(make_cache_key(QUESTIONS[2], [7]), faq_ids=[7], query_vector=unrelated, index_version=1)
+        return near, other
+
+    near, other = asyncio.run(run())
+    assert near == "4-8 weeks." and other is None
+    assert cache.stats()["near_duplicate_hits"] == 1
+    print("✅ Near duplicate: SUCCESS")
+
+def test_near_duplicate_after_refit():
+    print("Testing near-duplicate lookups across index versions...")
+    cache = AnswerCache(near_dup_threshold=0.5)
+    (stored,) = _vectors(QUESTIONS[:1], QUESTIONS)
+    # A refit with a different vocabulary produces vectors of another shape
+    (refit,) = _vectors(QUESTIONS[:1], QUESTIONS + ["Brand new FAQ about mobile apps"])
+    assert stored.shape != refit.shape
+
+    async def run():
+        await cache.set(make_cache_key(QUESTIONS[0], [7]), "4-8 weeks.", 2.0, faq_ids=[7],
+                        query_vector=stored, index_version=1)
+        return await cache.get(make_cache_key(QUESTIONS[1], [7]), faq_ids=[7], query_vector=refit, index_version=2)
+
+    assert asyncio.run(run()) is None
+    print("✅ Version mismatch: SUCCESS")
+
+def test_invalidate_while_redis_is_down():
+    print("Testing that an invalidate missed by Redis is flushed on recovery...")
+    client = FakeRedisClient()
+    redis = AsyncRedis(url=None, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.05))
+    redis.client = client
+    cache = AnswerCache(redis)
+    key = make_cache_key("What is SEO?", [1])
+
+    async def run():
+        await cache.set(key, "Old answer.", 1.0, faq_ids=[1])
+        assert len(client.data) == 1
+        client.down = True
+        await cache.invalidate()  # the delete fails and opens the circuit
+        assert redis.breaker.state == "open" and cache.stats()["pending_flush"]
+        assert await cache.get(key, faq_ids=[1]) is None  # served from memory meanwhile
+
+        client.down = False
+        await asyncio.sleep(0.06)
+        assert await cache.get(key, faq_ids=[1]) is None  # flushed before the read
+        assert client.data == {} and not cache.stats()["pending_flush"]
+        await cache.set(key, "New answer.", 1.0, faq_ids=[1])
+        assert await cache.get(key, faq_ids=[1]) == "New answer."
+
+    asyncio.run(run())
+    print("✅ Deferred flush: SUCCESS")
+
+if __name__ == "__main__":
+    test_exact_hit_and_invalidate()
+    test_near_duplicate()
+    test_near_duplicate_after_refit()
+    test_invalidate_while_redis_is_down()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+# Test script for interval merging, slot computation and the per-day freebusy cache
+import sys
+from datetime import date, datetime, timedelta
+sys.path.append('.')
+
+from availability import AvailabilityCache, merge_intervals, free_slots, _tz
+
+def _at(day, hour, minute=0):
+    return _tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+
+class FakeCalendar:
+    """Answers freebusy queries with fixed busy intervals and counts the calls"""
+    def __init__(self, busy):
+        self.busy = busy
+        self.calls = 0
+
+    def execute(self, make_request):
+        self.calls += 1
+        return {"calendars": {"primary": {"busy": [
+            {"start": start.isoformat(), "end": end.isoformat()} for start, end in self.busy
+        ]}}}
+
+def test_merge_intervals():
+    print("Testing interval merging...")
+    assert merge_intervals([(5, 7), (1, 3), (2, 4), (7, 8)]) == [(1, 4), (5, 8)]
+    assert merge_intervals([]) == []
+    print("✅ Interval merging: SUCCESS")
+
+def test_free_slots():
+    print("Testing free slots...")
+    day = date(2030, 1, 6)  # a Sunday, a business day by default
+    busy = merge_intervals([(_at(day, 11), _at(day, 12)), (_at(day, 14, 15), _at(day, 14, 45))])
+    starts = [start.strftime("%H:%M") for start, _ in free_slots(day, busy)]
+    assert "10:00" in starts and "10:30" in starts
+    assert "11:00" not in starts and "11:30" not in starts
+    assert "14:00" not in starts and "14:30" not in starts and "15:00" in starts
+    assert starts[-1] == "17:30"
+    assert free_slots(date(2030, 1, 4), []) == []  # Friday
+    print("✅ Free slots: SUCCESS")
+
+def test_week_is_one_query():
+    print("Testing the per-day cache...")
+    start = date(2030, 1, 6)
+    calendar = FakeCalendar([(_at(start, 17), _at(start + timedelta(days=1), 11))])
+    cache = AvailabilityCache(calendar, ttl_seconds=60)
+
+    week = cache.availability(start, 7)
+    assert calendar.calls == 1 and len(week) == 7
+    monday = [slot["start"][11:16] for slot in week[1]["slots"]]
+    assert monday[0] == "11:00"  # busy from Sunday evening carries over midnight
+
+    cache.availability(start, 7)
+    assert calendar.calls == 1
+    cache.invalidate(start)
+    cache.availability(start, 7)
+    assert calendar.calls == 2
+    print("✅ Freebusy cache: SUCCESS")
+
+def test_invalidate_during_fetch():
+    print("Testing that a fetch racing an invalidate is not cached...")
+    start = date(2030, 1, 6)
+    calendar = FakeCalendar([])
+    cache = AvailabilityCache(calendar, ttl_seconds=60)
+    execute = calendar.execute
+
+    def booked_meanwhile(make_request):
+        cache.invalidate(start)  # a booking lands while the query is in flight
+        return execute(make_request)
+
+    calendar.execute = booked_meanwhile
+    assert cache.busy([start, start + timedelta(days=1)])[start] == []
+    assert start not in cache._days and start + timedelta(days=1) in cache._days
+    calendar.execute = execute
+    cache.busy([start])
+    assert calendar.calls == 2 and start in cache._days
+    print("✅ Invalidate during fetch: SUCCESS")
+
+def test_past_days_are_pruned():
+    print("Testing that past days leave the cache...")
+    today = datetime.now(_tz).date()
+    cache = AvailabilityCache(FakeCalendar([]), ttl_seconds=60)
+    cache._days[today - timedelta(days=3)] = ([], 0)
+    cache.invalidate(today - timedelta(days=2))
+    cache.busy([today - timedelta(days=1), today])
+    assert list(cache._days) == [today] and not cache._generations
+    print("✅ Past day pruning: SUCCESS")
+
+if __name__ == "__main__":
+    test_merge_intervals()
+    test_free_slots()
+    test_week_is_one_query()
+    test_invalidate_during_fetch()
+    test_past_days_are_pruned()
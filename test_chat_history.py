@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# Test script for the prompt history window and summary folding (in-memory backend)
+import sys
+import asyncio
+sys.path.append('.')
+
+import chat_history
+from chat_history import window_history, format_history, conversation_context, update_history, _store_summary
+from session_store import session_store
+
+def _message(role, content):
+    return {"role": role, "content": content}
+
+def test_window_keeps_latest_exchange():
+    print("Testing the history window...")
+    history = [_message("user", "hello"), _message("bot", "hi there"), _message("user", "x" * 2000), _message("bot", "y" * 2000)]
+    older, recent = window_history(history, budget=100)
+    # The latest exchange alone is over budget: it is clipped rather than dropped
+    assert older == history[:2] and [m["role"] for m in recent] == ["user", "bot"]
+    assert all(chat_history._message_tokens(m) <= 50 for m in recent)
+
+    short = [_message("user", "a"), _message("bot", "b"), _message("user", "c"), _message("bot", "d")]
+    assert window_history(short, budget=100) == ([], short)
+    assert window_history([], budget=100) == ([], [])
+    print("✅ History window: SUCCESS")
+
+def test_pending_turns_stay_in_prompt():
+    print("Testing that turns awaiting a summary stay in the prompt...")
+    text = format_history("", [_message("bot", "latest")], [_message("user", "older " * 100)])
+    assert "Earlier messages:" in text and "user: older" in text and text.endswith("bot: latest")
+    assert len(text) < 400
+    print("✅ Pending turns: SUCCESS")
+
+def test_summary_trims_by_marker():
+    print("Testing that a summary drops exactly the messages it covers...")
+    user_id = "history-test"
+    session_store.clear_history(user_id)
+
+    async def run():
+        for i in range(3):
+            await update_history(user_id, ("user", f"q{i}"), ("bot", f"a{i}"))
+        history = session_store.history(user_id)
+        folded = history[:2]
+        # More turns arrive (and the oldest fall off the bounded history) before the summary lands
+        for i in range(3, 12):
+            await update_history(user_id, ("user", f"q{i}"), ("bot", f"a{i}"))
+        before = session_store.history(user_id)
+        await _store_summary(user_id, "greeted", folded[-1])
+        assert session_store.history(user_id) == before  # folded turns were already gone
+        assert session_store.summary(user_id) == "greeted"
+
+        # When the covered turns are still there, only they are dropped
+        history = session_store.history(user_id)
+        await update_history(user_id, ("user", "new"), ("bot", "reply"))
+        await _store_summary(user_id, "more", history[1])
+        remaining = session_store.history(user_id)
+        assert remaining[0] == history[2] and remaining[-1]["content"] == "reply"
+
+        context = await conversation_context(user_id)
+        assert context.startswith("Summary of earlier conversation: more")
+
+    asyncio.run(run())
+    session_store.clear_history(user_id)
+    print("✅ Summary trim: SUCCESS")
+
+if __name__ == "__main__":
+    test_window_keeps_latest_exchange()
+    test_pending_turns_stay_in_prompt()
+    test_summary_trims_by_marker()
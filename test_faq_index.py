@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+# Test script for the incremental TF-IDF index: appends, tombstones, compaction and batch search
+import sys
+import time
+sys.path.append('.')
+
+import faq_services
+from faq_services import SimpleFAQDB, IndexManager
+
+ROWS = [
+    {"id": "1", "prompt": "How long does it take to build a website?", "response": "Most websites take six to eight weeks."},
+    {"id": "2", "prompt": "Do you offer SEO services?", "response": "Yes, we run search engine optimisation campaigns."},
+    {"id": "3", "prompt": "Can you build mobile apps?", "response": "We build iOS and Android apps for clients."},
+    {"id": "4", "prompt": "What does branding include?", "response": "Logo, tone of voice and a visual identity system."},
+]
+
+def _empty_db():
+    db = SimpleFAQDB()
+    db.clear()
+    return db
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_incremental_add_and_search_many():
+    print("Testing incremental adds and batch search...")
+    db = _empty_db()
+    db.add_faqs(ROWS[:2])  # empty index: fitted from these rows
+    vocabulary = db.vectorizer.vocabulary_
+    db.add_faqs(ROWS[2:])  # appended with the same vocabulary
+    assert db.vectorizer.vocabulary_ is vocabulary and db.doc_count == 4
+
+    results = db.similarity_search_many(["seo services", "how long to build a website"], k=1)
+    assert [r[0].metadata["id"] for r in results] == ["2", "1"]
+    assert results[0][0].metadata["similarity"] == db.similarity_search("seo services", k=1)[0].metadata["similarity"]
+    assert db.similarity_search_many([], k=1) == []
+    print("✅ Incremental add: SUCCESS")
+
+def test_tombstones():
+    print("Testing tombstoned rows...")
+    faq_services.TOMBSTONE_THRESHOLD = 1.1  # keep the tombstones in place for this test
+    try:
+        db = _empty_db()
+        db.add_faqs(ROWS)
+        assert db.remove_faqs(["2", "missing"]) == 1
+        assert db.doc_count == 3 and len(db.faq_data) == 4
+        assert all(hit.metadata["id"] != "2" for hit in db.similarity_search("seo services", k=4))
+        assert db.remove_faqs(["2"]) == 0
+    finally:
+        faq_services.TOMBSTONE_THRESHOLD = 0.25
+    print("✅ Tombstones: SUCCESS")
+
+def test_vocab_drift_needs_enough_tokens():
+    print("Testing that one new FAQ does not count as vocabulary drift...")
+    db = _empty_db()
+    db.add_faqs(ROWS[:2])
+    db.add_faqs([{"id": "5", "prompt": "Quokka wallaby kangaroo?", "response": "Marsupials everywhere."}])
+    assert db._state.oov_tokens > 0 and db._state.vocab_drift == 0.0
+    print("✅ Vocab drift minimum: SUCCESS")
+
+def test_compaction():
+    print("Testing background compaction after removals...")
+    db = _empty_db()
+    db.add_faqs(ROWS)
+    db.remove_faqs(["1", "2"])  # half the rows tombstoned: refit in the background
+    _wait_for(lambda: len(db.faq_data) == 2 and not db._compacting)
+    assert db.doc_count == 2 and db._state.alive.all()
+    assert db.similarity_search("mobile apps", k=1)[0].metadata["id"] == "3"
+    print("✅ Compaction: SUCCESS")
+
+def test_compaction_publishes_a_new_version():
+    print("Testing that a compaction goes through the index manager...")
+    def factory():
+        db = _empty_db()
+        db.add_faqs(ROWS)
+        return db
+
+    manager = IndexManager(factory)
+    first = manager.current()
+    manager.apply(lambda db: db.remove_faqs(["1", "2"]))
+    _wait_for(lambda: manager.current().version == first.version + 2)
+    compacted = manager.current()
+    assert len(compacted.db.faq_data) == 2 and compacted.doc_count == 2
+    print("✅ Compaction version bump: SUCCESS")
+
+if __name__ == "__main__":
+    test_incremental_add_and_search_many()
+    test_tombstones()
+    test_vocab_drift_needs_enough_tokens()
+    test_compaction()
+    test_compaction_publishes_a_new_version()
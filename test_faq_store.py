@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# Test script for the SQLite FAQ store and the /get_faqs endpoint (temporary database)
+import io
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import faq_routes
+from faq_store import FAQStore, SQLiteFAQStore, FAQCSVFormatError
+
+def _store(directory):
+    return SQLiteFAQStore(os.path.join(directory, "faqs.db"))
+
+def test_store_is_abstract():
+    print("Testing the FAQStore interface...")
+    try:
+        FAQStore()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("FAQStore should not be instantiable")
+    print("✅ Abstract store: SUCCESS")
+
+def test_sqlite_store():
+    print("Testing the SQLite FAQ store...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        assert store.count() == 0 and store.version() == 0
+
+        row = store.add("What is SEO?", "Search engine optimisation.")
+        assert store.get(row["id"]) == row and store.version() == 1
+        assert store.add("What is SEO?", "Search engine optimisation.") is None  # duplicate pair
+        assert store.version() == 1
+
+        new_rows, duplicates = store.add_many([("Do you build apps?", "Yes."), ("What is SEO?", "Search engine optimisation.")])
+        assert len(new_rows) == 1 and duplicates == 1 and store.version() == 2
+
+        assert store.delete_by_content("Do you build apps?", "Yes.") == [new_rows[0]["id"]]
+        assert store.delete(row["id"]) and not store.delete(row["id"])
+        assert store.count() == 0 and store.version() == 4
+
+        csv = io.StringIO("question,answer\nWhat is UX?,User experience.\n , \nWhat is UX?,User experience.\n")
+        imported, counts = store.import_csv(csv)
+        assert counts == {"accepted": 1, "duplicate": 1, "invalid": 1} and len(imported) == 1
+        try:
+            store.import_csv(io.StringIO("prompt,response\na,b\n"))
+        except FAQCSVFormatError:
+            pass
+        else:
+            raise AssertionError("CSV without question/answer columns should be rejected")
+    print("✅ SQLite store: SUCCESS")
+
+def test_store_pages():
+    print("Testing cursor pagination and text filters...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        store.add_many([(f"Question {i}", f"Answer {i}") for i in range(5)] + [("100% satisfaction?", "Yes.")])
+        first, cursor = store.page(limit=4)
+        second, last = store.page(limit=4, after=cursor)
+        assert len(first) == 4 and len(second) == 2 and last is None
+        assert [r["prompt"] for r in first + second] == [r["prompt"] for r in store.all()]
+        # LIKE wildcards in the filter are matched literally
+        assert [r["prompt"] for r in store.page(text_filter="100%")[0]] == ["100% satisfaction?"]
+        assert len(store.page(text_filter="_")[0]) == 0
+    print("✅ Pagination: SUCCESS")
+
+def test_get_faqs_endpoint():
+    print("Testing /get_faqs pagination, projection and ETags...")
+    original = faq_routes.faq_store
+    with tempfile.TemporaryDirectory() as directory:
+        faq_routes.faq_store = _store(directory)
+        try:
+            faq_routes.faq_store.add_many([(f"Question {i}", f"Answer {i}") for i in range(3)])
+            app = FastAPI()
+            app.include_router(faq_routes.router)
+            client = TestClient(app)
+
+            page = client.get("/get_faqs", params={"limit": 2, "fields": "id,question"})
+            assert page.status_code == 200 and len(page.json()) == 2
+            assert set(page.json()[0]) == {"id", "question"}
+            rest = client.get("/get_faqs", params={"limit": 2, "cursor": page.headers["X-Next-Cursor"]})
+            assert [r["question"] for r in rest.json()] == ["Question 2"] and "X-Next-Cursor" not in rest.headers
+
+            everything = client.get("/get_faqs")
+            etag = everything.headers["ETag"]
+            assert client.get("/get_faqs", headers={"If-None-Match": etag}).status_code == 304
+            faq_routes.faq_store.add("Question 3", "Answer 3")  # a change invalidates the ETag
+            changed = client.get("/get_faqs", headers={"If-None-Match": etag})
+            assert changed.status_code == 200 and len(changed.json()) == 4
+
+            assert client.get("/get_faqs", params={"fields": "nope"}).status_code == 400
+            assert client.get("/get_faqs", params={"cursor": "abc"}).status_code == 400
+        finally:
+            faq_routes.faq_store = original
+    print("✅ /get_faqs: SUCCESS")
+
+if __name__ == "__main__":
+    test_store_is_abstract()
+    test_sqlite_store()
+    test_store_pages()
+    test_get_faqs_endpoint()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Test script for IndexManager: immutable snapshots and cross-worker store sync
+import sys
+import asyncio
+sys.path.append('.')
+
+from faq_services import SimpleFAQDB, IndexManager
+from retrieval import HybridFAQDB, FlatEmbeddingIndex
+
+ROWS = [
+    {"id": "1", "prompt": "How long does it take to build a website?", "response": "Most websites take six to eight weeks."},
+    {"id": "2", "prompt": "Do you offer SEO services?", "response": "Yes, we run search engine optimisation campaigns."},
+    {"id": "3", "prompt": "Can you build mobile apps?", "response": "We build iOS and Android apps for clients."},
+]
+
+class CountingStore:
+    """Stands in for the FAQ store's version counter (what another worker would bump)"""
+
+    def __init__(self):
+        self.value = 0
+
+    def version(self):
+        return self.value
+
+def _factory(engine):
+    def build():
+        db = engine()
+        db.clear()
+        db.add_faqs(ROWS)
+        return db
+    return build
+
+def _check_snapshots_are_immutable(engine):
+    manager = IndexManager(_factory(engine))
+    first = manager.current()
+    removed = manager.apply(lambda db: db.remove_faqs(["2"]))
+    second = manager.current()
+    assert removed == 1 and second.version == first.version + 1
+    assert second.db is not first.db
+    # The published snapshot still answers from the version it was built as
+    assert first.db.doc_count == 3 and first.doc_count == 3 and second.doc_count == 2
+    assert first.db.similarity_search("seo services", k=1)[0].metadata["id"] == "2"
+    assert all(hit.metadata["id"] != "2" for hit in second.db.similarity_search("seo services", k=3))
+
+def test_apply_leaves_published_snapshots_alone():
+    print("Testing that edits never change a published snapshot...")
+    _check_snapshots_are_immutable(SimpleFAQDB)
+    _check_snapshots_are_immutable(lambda: HybridFAQDB(FlatEmbeddingIndex("/nonexistent", "none"), dense=False))
+    print("✅ Immutable snapshots: SUCCESS")
+
+def test_store_version_sync():
+    print("Testing that a worker catches up with edits made elsewhere...")
+    store = CountingStore()
+    manager = IndexManager(_factory(SimpleFAQDB), store)
+    assert manager.current().store_version == 0
+
+    async def run():
+        assert await manager.sync() is False
+
+        # A local edit: one store write, then the incremental update
+        store.value = 1
+        manager.apply(lambda db: db.add_faqs([{"id": "4", "prompt": "Do you design logos?", "response": "Yes."}]))
+        assert manager.current().store_version == 1
+        assert await manager.sync() is False
+
+        # Another worker wrote to the store: the next sync rebuilds from it
+        store.value = 3
+        manager.apply(lambda db: db.add_faqs([{"id": "5", "prompt": "Do you shoot video?", "response": "Yes."}]))
+        assert manager.current().store_version == 1
+        version = manager.current().version
+        assert await manager.sync() is True
+        assert manager.current().store_version == 3 and manager.current().version == version + 1
+
+    asyncio.run(run())
+    print("✅ Store sync: SUCCESS")
+
+def test_sync_loop_starts_once():
+    print("Testing the sync loop lifecycle...")
+    manager = IndexManager(_factory(SimpleFAQDB), CountingStore(), sync_seconds=0.01)
+
+    async def run():
+        manager.start()
+        task = manager._syncer
+        manager.start()
+        assert manager._syncer is task
+        await asyncio.sleep(0.05)
+        await manager.stop()
+        assert manager._syncer is None and task.cancelled()
+
+    asyncio.run(run())
+    print("✅ Sync loop: SUCCESS")
+
+if __name__ == "__main__":
+    test_apply_leaves_published_snapshots_alone()
+    test_store_version_sync()
+    test_sync_loop_starts_once()
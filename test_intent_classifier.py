@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+# Test harness for the local intent classifier: cross-validated accuracy on the labelled
+# examples, accuracy on unseen phrasings, and per-message prediction latency
+import sys
+import time
+sys.path.append('.')
+
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from intent_classifier import (
+    IntentClassifier, build_intent_pipeline, load_intent_examples, INTENT_CONFIDENCE_THRESHOLD,
+)
+
+UNSEEN_MESSAGES = [
+    ("Could we jump on a call sometime Wednesday to go over the scope?", "schedule"),
+    ("Is there any chance to catch up with your designers next week?", "schedule"),
+    ("I'd prefer chatting with an actual human if that's ok?", "agent"),
+    ("How do I get your phone number?", "contact"),
+    ("What sort of things does your agency do?", "services"),
+    ("Can you build an iOS app for my restaurant?", "specific_service"),
+    ("How much would a small business website cost?", "other"),
+]
+
+def test_cross_validated_accuracy():
+    print("Testing intent classifier (5-fold cross-validation)...")
+    texts, labels = load_intent_examples()
+    folds = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    predicted = cross_val_predict(build_intent_pipeline(), texts, labels, cv=folds)
+    accuracy = sum(p == l for p, l in zip(predicted, labels)) / len(labels)
+    print(f"  Cross-validated accuracy: {accuracy:.1%} on {len(labels)} examples")
+    assert accuracy >= 0.8
+
+def test_unseen_messages_and_latency():
+    print("Testing unseen phrasings and latency...")
+    classifier = IntentClassifier()
+    correct = confident = 0
+    started = time.perf_counter()
+    for message, expected in UNSEEN_MESSAGES:
+        intent, confidence = classifier.predict(message)
+        correct += intent == expected
+        confident += confidence >= INTENT_CONFIDENCE_THRESHOLD
+        status = "✅" if intent == expected else "❌"
+        print(f"  {status} '{message}' -> {intent} ({confidence:.2f}), expected {expected}")
+    elapsed = time.perf_counter() - started
+
+    print(f"  Accuracy: {correct}/{len(UNSEEN_MESSAGES)}")
+    print(f"  Confident (>= {INTENT_CONFIDENCE_THRESHOLD}): {confident}/{len(UNSEEN_MESSAGES)} (the rest fall back to Gemini)")
+    print(f"  Latency: {elapsed / len(UNSEEN_MESSAGES) * 1000:.2f} ms/message (vs. a full Gemini round-trip)")
+    assert correct >= len(UNSEEN_MESSAGES) - 2
+
+if __name__ == "__main__":
+    test_cross_validated_accuracy()
+    test_unseen_messages_and_latency()
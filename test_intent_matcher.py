@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# Test script for the precompiled intent matcher, plus a micro-benchmark against
+# the old per-detector substring scans
+import sys
+import time
+sys.path.append('.')
+
+from chatbot_prompt import (
+    intent_matcher, classify_intents, SCHEDULE_KEYWORDS, AGENT_KEYWORDS, CONTACT_KEYWORDS,
+    GENERAL_SERVICE_KEYWORDS, SPECIFIC_SERVICES, detect_specific_service_inquiry, detect_services_intent,
+    detect_contact_intent,
+)
+
+def test_word_boundaries():
+    print("Testing word-boundary matching...")
+    # "ai" inside "email"/"available" and "ml" inside "html" used to trigger AI Solutions
+    for query in ["What is your email?", "What services are available?", "Can you fix my html page?"]:
+        is_specific, _, service = detect_specific_service_inquiry(query)
+        print(f"  '{query}' -> specific: {is_specific} ({service})")
+        assert service != "AI Solutions"
+
+    assert detect_specific_service_inquiry("Do you build AI chatbots?")[2] == "AI Solutions"
+    assert detect_specific_service_inquiry("Any ML experts?")[2] == "AI Solutions"
+    assert detect_services_intent("What services are available?")
+    print("✅ Word boundaries: SUCCESS")
+
+def test_overlapping_and_inflected_keywords():
+    print("Testing overlapping and inflected keywords...")
+    intents = classify_intents("Can you call me to schedule a call?")
+    print(f"  {intents}")
+    assert "call me" in intents["contact"] and "call" in intents["contact"]
+    assert {"schedule a call", "schedule", "call"} <= set(intents["schedule"])
+
+    assert "schedule" in classify_intents("I'd like to book a meeting")
+    assert "schedule" in classify_intents("Booking for next week")
+    assert "schedule" in classify_intents("Meetings on Friday?")
+    assert detect_contact_intent("How can I contact you?")
+    print("✅ Overlapping/inflected keywords: SUCCESS")
+
+def test_specific_service_priority():
+    print("Testing specific service priority...")
+    # Earlier dictionary entries win, as with the old ordered scan
+    assert detect_specific_service_inquiry("I need UI design services")[2] == "User Experience Design"
+    assert detect_specific_service_inquiry("Tell me about web design")[2] == "Web & App Development"
+    assert detect_specific_service_inquiry("logo design please")[2] == "User Experience Design"
+    print("✅ Specific service priority: SUCCESS")
+
+def _legacy_classify(user_input: str):
+    # The pre-matcher behaviour: one lowercase + substring scan per detector
+    found = {}
+    for intent, keywords in [("schedule", SCHEDULE_KEYWORDS), ("agent", AGENT_KEYWORDS),
+                             ("contact", CONTACT_KEYWORDS), ("services", GENERAL_SERVICE_KEYWORDS),
+                             ("specific_service", list(SPECIFIC_SERVICES))]:
+        input_lower = user_input.lower().strip()
+        if any(keyword in input_lower for keyword in keywords):
+            found[intent] = True
+    return found
+
+def benchmark(iterations: int = 20000):
+    messages = [
+        "Hi there, what services do you offer for mobile app development?",
+        "How much does it cost to build an e-commerce website with a custom CMS?",
+        "Please send me an email with your pricing",
+        "I'd like to schedule a call with your team next week",
+        "Tell me about your AI solutions and machine learning work",
+    ]
+    print(f"\nMicro-benchmark ({iterations} classifications per variant):")
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        _legacy_classify(messages[i % len(messages)])
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        intent_matcher.match(messages[i % len(messages)])
+    matcher = time.perf_counter() - started
+
+    print(f"  legacy substring scans: {legacy / iterations * 1e6:.1f} µs/message")
+    print(f"  precompiled matcher:    {matcher / iterations * 1e6:.1f} µs/message (uncached, all intents + keywords)")
+    print("  classify_intents() additionally memoizes, so the five detectors in /ask share one pass")
+
+if __name__ == "__main__":
+    test_word_boundaries()
+    test_overlapping_and_inflected_keywords()
+    test_specific_service_priority()
+    benchmark()
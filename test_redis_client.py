@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Test script for the Redis circuit breaker
+import sys
+import time
+import asyncio
+sys.path.append('.')
+
+from redis_client import AsyncRedis, CircuitBreaker, RedisUnavailable
+
+def _redis(breaker):
+    redis = AsyncRedis(url=None, breaker=breaker)
+    redis.client = object()  # operations below never touch the client
+    return redis
+
+async def _ok(client):
+    return "ok"
+
+async def _fail(client):
+    raise ConnectionError("down")
+
+def test_open_half_open_closed():
+    print("Testing open -> half-open -> closed...")
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    redis = _redis(breaker)
+
+    async def run():
+        for _ in range(2):
+            try:
+                await redis.run(_fail)
+            except ConnectionError:
+                pass
+        assert breaker.state == "open"
+        try:
+            await redis.run(_ok)
+            assert False, "call allowed while open"
+        except RedisUnavailable:
+            pass
+        time.sleep(0.06)
+        assert breaker.state == "half-open"
+        assert await redis.run(_ok) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+    print("✅ Breaker cycle: SUCCESS")
+
+def test_failed_probe_reopens():
+    print("Testing a failed half-open probe...")
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.trip()
+    time.sleep(0.06)
+    redis = _redis(breaker)
+
+    async def run():
+        try:
+            await redis.run(_fail)
+        except ConnectionError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+    print("✅ Failed probe: SUCCESS")
+
+def test_cancelled_probe_does_not_wedge():
+    print("Testing a cancelled half-open probe...")
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.trip()
+    time.sleep(0.06)
+    redis = _redis(breaker)
+
+    async def slow(client):
+        await asyncio.sleep(10)
+
+    async def run():
+        probe = asyncio.ensure_future(redis.run(slow))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+        assert not breaker._probing
+        await asyncio.sleep(0.06)
+        # The next probe is let through and closes the circuit
+        assert await redis.run(_ok) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+    print("✅ Cancelled probe: SUCCESS")
+
+def test_cancellation_is_not_a_failure():
+    print("Testing cancelled calls against a healthy Redis...")
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    redis = _redis(breaker)
+
+    async def slow(client):
+        await asyncio.sleep(10)
+
+    async def run():
+        for _ in range(5):
+            call = asyncio.ensure_future(redis.run(slow))
+            await asyncio.sleep(0.01)
+            call.cancel()
+            try:
+                await call
+            except asyncio.CancelledError:
+                pass
+        assert breaker.state == "closed" and breaker.failures == 0
+        assert await redis.run(_ok) == "ok"
+
+    asyncio.run(run())
+    print("✅ Cancellation: SUCCESS")
+
+if __name__ == "__main__":
+    test_open_half_open_closed()
+    test_failed_probe_reopens()
+    test_cancelled_probe_does_not_wedge()
+    test_cancellation_is_not_a_failure()
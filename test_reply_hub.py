@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Test script for the agent relay state (in-memory backend)
+import sys
+import time
+import asyncio
+sys.path.append('.')
+
+from reply_hub import ReplyHub
+
+def test_waiter_is_woken():
+    print("Testing a waiting client...")
+    hub = ReplyHub()
+
+    async def run():
+        waiter = asyncio.ensure_future(hub.wait("u1", timeout=5))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await hub.push("u1", {"reply": "hello", "from": "agent"})
+        item = await waiter
+        return item, time.perf_counter() - started
+
+    item, latency = asyncio.run(run())
+    assert item["reply"] == "hello"
+    assert latency < 0.1
+    assert hub.stats()["waiting_users"] == 0
+    print("✅ Push delivery: SUCCESS")
+
+def test_timeout_and_order():
+    print("Testing timeout and FIFO order...")
+    hub = ReplyHub()
+
+    async def run():
+        assert await hub.wait("u1", timeout=0.05) is None
+        for text in ["first", "second"]:
+            await hub.push("u1", {"reply": text, "from": "agent"})
+        assert (await hub.pop("u1"))["reply"] == "first"
+        assert (await hub.wait("u1", timeout=1))["reply"] == "second"
+        assert await hub.pop("u1") is None
+
+    asyncio.run(run())
+    print("✅ Timeout and order: SUCCESS")
+
+def test_message_map_is_one_shot():
+    print("Testing message_id correlation...")
+    hub = ReplyHub()
+
+    async def run():
+        await hub.remember(101, "u1")
+        assert await hub.take(101) == "u1"
+        assert await hub.take(101) is None
+
+    asyncio.run(run())
+    print("✅ Message map: SUCCESS")
+
+if __name__ == "__main__":
+    test_waiter_is_woken()
+    test_timeout_and_order()
+    test_message_map_is_one_shot()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+# Test script for hybrid retrieval: BM25, rank fusion, the flat embedding index and HybridFAQDB
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append('.')
+
+import retrieval
+from retrieval import BM25Index, FlatEmbeddingIndex, HybridFAQDB, reciprocal_rank_fusion
+
+ROWS = [
+    {"id": "1", "prompt": "How long does it take to build a website?", "response": "Most websites take six to eight weeks."},
+    {"id": "2", "prompt": "Do you offer SEO services?", "response": "Yes, we run search engine optimisation campaigns."},
+    {"id": "3", "prompt": "Can you build mobile apps?", "response": "We build iOS and Android apps."},
+]
+
+def _texts(rows):
+    return [retrieval.faq_text(row["prompt"], row["response"]) for row in rows]
+
+def _fake_embed(texts):
+    # Deterministic bag-of-words hashing, normalized like the real model's output
+    vectors = np.zeros((len(texts), 32), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[i, sum(map(ord, word.strip("?.,"))) % 32] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+def _hybrid_db(directory, dense=False):
+    db = HybridFAQDB(FlatEmbeddingIndex(directory, model_name="fake"), dense=dense)
+    db.clear()
+    return db
+
+def test_bm25():
+    print("Testing BM25 scores and incremental append...")
+    index = BM25Index(_texts(ROWS))
+    scores, similarity = index.scores(["seo services", "weather on mars"])
+    assert int(np.argmax(scores[0])) == 1 and 0 < similarity[0][1] <= 1
+    assert not scores[1].any() and not similarity[1].any()
+
+    # Appending extends the vocabulary with the new rows' terms
+    appended = BM25Index(_texts(ROWS[:2])).append(_texts(ROWS[2:]))
+    assert appended.weights.shape[0] == 3
+    assert int(np.argmax(appended.scores(["build mobile apps"])[0][0])) == 2
+    assert appended.select([1]).weights.shape[0] == 1
+    print("✅ BM25: SUCCESS")
+
+def test_reciprocal_rank_fusion():
+    print("Testing reciprocal-rank fusion...")
+    fused = reciprocal_rank_fusion([[0, 1, 2], [1, 2]], k=60)
+    assert [idx for idx, _ in fused] == [1, 2, 0]
+    assert abs(fused[0][1] - (1 / 62 + 1 / 61)) < 1e-9
+    assert reciprocal_rank_fusion([]) == []
+    print("✅ Rank fusion: SUCCESS")
+
+def test_flat_embedding_index():
+    print("Testing the flat embedding index...")
+    original = retrieval.embed_texts
+    retrieval.embed_texts = _fake_embed
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            index = FlatEmbeddingIndex(directory, model_name="fake")
+            ids = [row["id"] for row in ROWS]
+            vectors = index.sync(ids, _texts(ROWS))
+            assert vectors.shape == (3, 32)
+
+            # Unchanged rows are reused; only the edited one is embedded again
+            calls = []
+            retrieval.embed_texts = lambda texts: calls.append(texts) or _fake_embed(texts)
+            edited = _texts(ROWS[:2]) + ["Can you build mobile apps? Yes, and web apps."]
+            index.sync(ids, edited)
+            assert calls == [[edited[2]]]
+
+            # No temp files are left behind, and a different model invalidates the index
+            assert sorted(os.listdir(directory)) == ["manifest.json", "vectors.npy"]
+            assert FlatEmbeddingIndex(directory, model_name="other")._load() == ([], None)
+    finally:
+        retrieval.embed_texts = original
+    print("✅ Flat embedding index: SUCCESS")
+
+def test_hybrid_bm25_only():
+    print("Testing HybridFAQDB without dense embeddings...")
+    with tempfile.TemporaryDirectory() as directory:
+        db = _hybrid_db(directory)
+        db.add_faqs(ROWS[:2])
+        db.add_faqs(ROWS[2:])
+        assert db.doc_count == 3
+
+        hits = db.similarity_search("Do you do SEO?", k=3)
+        assert hits[0].metadata["id"] == "2"
+        assert 0 < hits[0].metadata["similarity"] <= 1 and hits[0].metadata["rrf"] > 0
+        # Nothing relevant: no hits rather than the top of an arbitrary ranking
+        assert db.similarity_search("what is the weather like on mars", k=3) == []
+
+        assert db.remove_faqs(["2"]) == 1 and db.doc_count == 2
+        assert all(hit.metadata["id"] != "2" for hit in db.similarity_search("seo services", k=3))
+        assert [len(r) for r in db.similarity_search_many(["mobile apps", "website"], k=1)] == [1, 1]
+    print("✅ Hybrid BM25 only: SUCCESS")
+
+def test_hybrid_dense():
+    print("Testing HybridFAQDB with (fake) dense embeddings...")
+    original = retrieval.embed_texts
+    retrieval.embed_texts = _fake_embed
+    retrieval.embed_query.cache_clear()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db = _hybrid_db(directory, dense=True)
+            db.add_faqs(ROWS[:1])  # empty index: built in full
+            db.add_faqs(ROWS[1:])  # appended in memory
+            assert db._state.embeddings.shape == (3, 32)
+            hit = db.similarity_search("Can you build mobile apps?", k=1)[0]
+            assert hit.metadata["id"] == "3"
+            assert hit.metadata["similarity"] == max(hit.metadata["dense"], hit.metadata["similarity"])
+
+            db.remove_faqs(["1"])
+            assert db._state.embeddings.shape == (2, 32) and db._state.ids == ["2", "3"]
+
+            # The shrunk index is written to disk in the background
+            db._persister.join()
+            rows, vectors = db.embedding_index._load()
+            assert [row[0] for row in rows] == ["2", "3"] and vectors.shape == (2, 32)
+    finally:
+        retrieval.embed_texts = original
+        retrieval.embed_query.cache_clear()
+    print("✅ Hybrid dense: SUCCESS")
+
+if __name__ == "__main__":
+    test_bm25()
+    test_reciprocal_rank_fusion()
+    test_flat_embedding_index()
+    test_hybrid_bm25_only()
+    test_hybrid_dense()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+# Test script for the bounded in-memory session store
+import sys
+import time
+sys.path.append('.')
+
+from session_store import SessionStore
+
+def test_lru_eviction():
+    print("Testing LRU eviction...")
+    store = SessionStore(max_entries=3, ttl_seconds=60)
+    for user_id in ["a", "b", "c"]:
+        store.append_history(user_id, {"role": "user", "content": "hi"})
+    store.get("a")  # touch "a" so "b" is now the least recently used
+    store.mark_greeted("d")
+    assert len(store) == 3
+    assert store.get("b") is None
+    assert store.history("a") and store.is_greeted("d")
+    assert store.evictions == 1
+    print("✅ LRU eviction: SUCCESS")
+
+def test_ttl_sweep():
+    print("Testing TTL expiry...")
+    store = SessionStore(max_entries=100, ttl_seconds=0.05)
+    for i in range(10):
+        store.append_history(f"user_{i}", {"role": "user", "content": "hi"})
+    time.sleep(0.1)
+    assert store.sweep() == 10
+    assert len(store) == 0 and store.history("user_0") == []
+    print("✅ TTL expiry: SUCCESS")
+
+def test_history_is_bounded():
+    print("Testing bounded history...")
+    store = SessionStore(history_len=7)
+    for i in range(20):
+        store.append_history("u", {"role": "user", "content": str(i)})
+    history = store.history("u")
+    assert len(history) == 7 and history[-1]["content"] == "19"
+    print("✅ Bounded history: SUCCESS")
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_ttl_sweep()
+    test_history_is_bounded()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# Test script for request coalescing of identical concurrent questions
+import sys
+import asyncio
+sys.path.append('.')
+
+from singleflight import SingleFlight
+
+def test_burst_shares_one_call():
+    print("Testing a burst of identical requests...")
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def burst():
+        return await asyncio.gather(*[flight.do("key", generate) for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(answer == "answer" for answer, _ in results)
+    assert sum(shared for _, shared in results) == 19
+    assert flight.stats()["in_flight"] == 0
+    print("✅ Burst coalescing: SUCCESS")
+
+def test_failure_reaches_followers():
+    print("Testing a failed generation...")
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("quota exceeded")
+
+    async def burst():
+        return await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+    print("✅ Failure propagation: SUCCESS")
+
+def test_cancelled_leader_hands_over():
+    print("Testing a leader that goes away mid-generation...")
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def burst():
+        leader = asyncio.ensure_future(flight.do("key", generate))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do("key", generate)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()  # e.g. the leader's client closed the tab
+        results = await asyncio.gather(*followers)
+        return leader, results
+
+    leader, results = asyncio.run(burst())
+    assert leader.cancelled()
+    assert [answer for answer, _ in results] == ["answer"] * 3
+    assert len(calls) == 2  # one follower took over, the others shared its generation
+    assert flight.stats()["in_flight"] == 0
+    print("✅ Leader hand-over: SUCCESS")
+
+if __name__ == "__main__":
+    test_burst_shares_one_call()
+    test_failure_reaches_followers()
+    test_cancelled_leader_hands_over()
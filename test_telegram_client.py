@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Test script for the queued Telegram sender (against httpx's mock transport, no network)
+import sys
+import json
+import time
+import asyncio
+import httpx
+sys.path.append('.')
+
+from telegram_client import TelegramClient, escape_markdown
+
+def _client(handler):
+    client = TelegramClient(api_base="https://telegram.test")
+    client._http = httpx.AsyncClient(base_url="https://telegram.test", transport=httpx.MockTransport(handler))
+    return client
+
+def test_burst_is_merged():
+    print("Testing a burst of callback notifications...")
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(sent)}})
+
+    async def run():
+        client = _client(handler)
+        for i in range(5):
+            assert client.enqueue(-100, f"callback {i}", parse_mode="Markdown", group="callbacks")
+        await client.stop()
+        return client.stats()
+
+    stats = asyncio.run(run())
+    assert len(sent) == 1 and sent[0]["parse_mode"] == "Markdown"
+    assert all(f"callback {i}" in sent[0]["text"] for i in range(5))
+    assert stats["sent"] == 5 and stats["merged"] == 4
+    print("✅ Burst merging: SUCCESS")
+
+def test_retry_after_rate_limit():
+    print("Testing 429 and 5xx retries...")
+    responses = [
+        httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.05}}),
+        httpx.Response(200, json={"ok": True, "result": {"message_id": 7}}),
+    ]
+
+    async def run():
+        client = _client(lambda request: responses.pop(0))
+        message_ids = []
+        client.enqueue(-100, "hello", group="user:a", on_sent=message_ids.append)
+        await client.stop()
+        return message_ids
+
+    assert asyncio.run(run()) == [7]
+    print("✅ Rate limit retry: SUCCESS")
+
+def test_rejected_batch_is_split():
+    print("Testing a merged batch that Telegram rejects...")
+    sent = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        sent.append(payload)
+        # Unbalanced Markdown in one message makes the whole merged text unparseable
+        if payload.get("parse_mode") and "bad_name" in payload["text"]:
+            return httpx.Response(400, json={"ok": False, "description": "Bad Request: can't parse entities"})
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(sent)}})
+
+    async def run():
+        client = _client(handler)
+        for text in ["callback a", "callback bad_name", "callback c"]:
+            client.enqueue(100, text, parse_mode="Markdown", group="callbacks")
+        await client.stop()
+        return client.stats()
+
+    stats = asyncio.run(run())
+    assert stats["sent"] == 3 and stats["failed"] == 0 and stats["merged"] == 0
+    plain = [payload for payload in sent if "parse_mode" not in payload]
+    assert [payload["text"] for payload in plain] == ["callback bad_name"]
+    assert escape_markdown("bad_name *[x]*") == "bad\\_name \\*\\[x]\\*"
+    print("✅ Rejected batch split: SUCCESS")
+
+def test_backoff_does_not_block_other_chats():
+    print("Testing that one chat's backoff does not hold up another...")
+    delivered = {}
+    attempts = {"slow": 0}
+
+    def handler(request):
+        payload = json.loads(request.content)
+        if payload["chat_id"] == 1 and attempts["slow"] == 0:
+            attempts["slow"] += 1
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.5}})
+        delivered[payload["chat_id"]] = time.monotonic()
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+    async def run():
+        client = _client(handler)
+        started = time.monotonic()
+        client.enqueue(1, "rate limited chat")
+        client.enqueue(2, "other chat")
+        await client.stop()
+        return started
+
+    started = asyncio.run(run())
+    assert delivered[2] - started < 0.3 <= delivered[1] - started
+    print("✅ Independent chats: SUCCESS")
+
+if __name__ == "__main__":
+    test_burst_is_merged()
+    test_retry_after_rate_limit()
+    test_rejected_batch_is_split()
+    test_backoff_does_not_block_other_chats()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Test script for correlating agent messages in the Telegram webhook (in-memory relay state)
+import sys
+import asyncio
+sys.path.append('.')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import telegram
+from telegram import _correlate, _extract_user_tag, stream_agent_replies
+
+telegram.reply_hub.redis = None  # keep the relay state in memory for the test
+
+def test_user_tag():
+    print("Testing user tag extraction...")
+    assert _extract_user_tag("👤 New user message\n[USER:user_42]\n\nhi") == "user_42"
+    assert _extract_user_tag("no tag here") is None
+    assert _extract_user_tag(None) is None
+    print("✅ User tag: SUCCESS")
+
+def test_correlation_paths():
+    print("Testing reply correlation...")
+
+    async def run():
+        await telegram.reply_hub.remember(10, "u1")
+        by_id = await _correlate({"reply_to_message": {"message_id": 10}}, " sure ")
+        by_text = await _correlate({"reply_to_message": {"message_id": 11, "text": "[USER:u2] hi"}}, "ok")
+        inline = await _correlate({}, "[USER:u3]  hello")
+        missing = await _correlate({}, "just chatting")
+        return by_id, by_text, inline, missing
+
+    by_id, by_text, inline, missing = asyncio.run(run())
+    assert by_id == ("reply_to_id", "u1", "sure")
+    assert by_text == ("reply_to_text", "u2", "ok")
+    assert inline == ("inline_tag", "u3", "hello")
+    assert missing == (None, None, None)
+    print("✅ Correlation: SUCCESS")
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+def test_sse_requeues_unwritten_reply():
+    print("Testing that an SSE reply is only consumed once written...")
+    hub = telegram.reply_hub
+
+    async def run():
+        await hub.push("sse", {"reply": "first", "from": "agent", "ts": 1})
+        stream = (await stream_agent_replies("sse", _ConnectedRequest())).body_iterator
+        assert "first" in await stream.__anext__()
+        await hub.push("sse", {"reply": "second", "from": "agent", "ts": 2})
+        # Resuming the stream acknowledges "first"; "second" is yielded but never written
+        assert "second" in await stream.__anext__()
+        await stream.aclose()
+        return await hub.peek("sse")
+
+    assert [item["reply"] for item in asyncio.run(run())] == ["second"]
+    print("✅ SSE requeue: SUCCESS")
+
+def test_websocket_ignores_client_frames():
+    print("Testing that client frames do not close the reply socket...")
+    app = FastAPI()
+    app.include_router(telegram.router)
+    with TestClient(app).websocket_connect("/telegram/ws/ws-user") as ws:
+        ws.send_text("ping")
+        ws.portal.call(telegram.reply_hub.push, "ws-user", {"reply": "hello", "from": "agent", "ts": 1})
+        assert ws.receive_json() == {"from_agent": True, "message": "hello", "agent": "agent"}
+    print("✅ WebSocket frames: SUCCESS")
+
+if __name__ == "__main__":
+    test_user_tag()
+    test_correlation_paths()
+    test_sse_requeues_unwritten_reply()
+    test_websocket_ignores_client_frames()